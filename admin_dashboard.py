@@ -1,5 +1,10 @@
+import pandas as pd
 import streamlit as st
-from db_connection import get_db_connection
+import async_db
+from db_connection import add_research_highlight
+from user_session import logout
+from metrics import registry as metrics_registry, METRICS_HOST, METRICS_PORT
+from slow_query_log import slow_log
 
 def show():
     st.title(" Admin Dashboard")
@@ -9,8 +14,45 @@ def show():
         st.error("Unauthorized access. Please log in.")
         return
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    # Platform activity, read from the rollup tables (see rollups.py)
+    st.subheader("📊 Platform Activity")
+    days = st.selectbox("Period", [7, 30, 90], index=1, format_func=lambda d: f"Last {d} days")
+    # The charts and the highlight list below don't depend on each other
+    rollups, highlights = async_db.gather(
+        async_db.get_activity_rollups(days), async_db.get_all_research_highlights()
+    )
+
+    requests = pd.DataFrame(rollups["requests"], columns=["day", "status", "department", "requests"])
+    posts = pd.DataFrame(rollups["posts"], columns=["day", "category", "posts"])
+    active = pd.DataFrame(rollups["active_users"], columns=["day", "users"])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Collaboration requests per day**")
+        if requests.empty:
+            st.info("No requests in this period.")
+        else:
+            st.bar_chart(requests.pivot_table(index="day", columns="status", values="requests", aggfunc="sum"))
+    with col2:
+        st.markdown("**Requests by department**")
+        if not requests.empty:
+            by_department = requests.assign(department=requests["department"].replace("", "Unassigned"))
+            st.bar_chart(by_department.pivot_table(
+                index="department", columns="status", values="requests", aggfunc="sum"))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Forum posts per day**")
+        if posts.empty:
+            st.info("No forum posts in this period.")
+        else:
+            st.bar_chart(posts.pivot_table(index="day", columns="category", values="posts", aggfunc="sum"))
+    with col2:
+        st.markdown("**Active users per day**")
+        if active.empty:
+            st.info("No activity recorded in this period.")
+        else:
+            st.line_chart(active.set_index("day")["users"])
 
     # Add Research Highlights
     st.subheader(" Add Research Highlight")
@@ -19,16 +61,12 @@ def show():
     contributors = st.text_input("Contributors (comma-separated)")
 
     if st.button("Post Highlight"):
-        cursor.execute("INSERT INTO research_highlights (title, summary, contributors, posted_by) VALUES (%s, %s, %s, %s)",
-                       (title, summary, contributors, user["user_id"]))
-        conn.commit()
+        add_research_highlight(title, summary, contributors, user["user_id"])
         st.success("✅ Research Highlight Posted!")
         st.rerun()
 
     # Show Existing Highlights
     st.subheader("📜 College Research Highlights")
-    cursor.execute("SELECT * FROM research_highlights ORDER BY date_posted DESC")
-    highlights = cursor.fetchall()
 
     for highlight in highlights:
         st.markdown(f"### {highlight['title']}")
@@ -36,9 +74,51 @@ def show():
         st.write(f"👥 Contributors: {highlight['contributors']}")
         st.write("---")
 
-    conn.close()
+    # Data layer metrics (this process only; Prometheus scrapes every process)
+    st.subheader("📈 Data Layer Metrics")
+    pages = metrics_registry.pages()
+    selected_page = st.selectbox("Page", ["All pages"] + pages, key="metrics_page")
+    summary = metrics_registry.summary(None if selected_page == "All pages" else selected_page)
+    if summary:
+        st.dataframe(
+            [{
+                "Function": row["function"],
+                "Calls": row["calls"],
+                "Errors": row["errors"],
+                "Total ms": round(row["total_ms"], 1),
+                "Mean ms": round(row["mean_ms"], 2),
+                "p50 ms": round(row["p50_ms"], 2),
+                "p95 ms": round(row["p95_ms"], 2),
+                "Rows": row["rows"],
+                "KB": round(row["bytes"] / 1024, 1),
+                "Acquire ms": round(row["acquire_mean_ms"], 2),
+            } for row in summary],
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("No data-access calls recorded yet.")
+    st.caption(f"Prometheus endpoint: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    # Query shapes over the slow query threshold, most total time first
+    st.subheader("🐢 Slow Queries")
+    slow = slow_log.top_fingerprints()
+    if slow:
+        st.dataframe(
+            [{
+                "Fingerprint": row["fingerprint"],
+                "Count": row["count"],
+                "Total ms": round(row["total_ms"], 1),
+                "Max ms": round(row["max_ms"], 1),
+                "Functions": ", ".join(row["functions"]),
+                "Query": row["normalized"][:200],
+            } for row in slow],
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.info(f"No statements slower than {slow_log.threshold_ms:g} ms yet.")
+    st.caption(f"Full entries with EXPLAIN plans: {slow_log.path}")
 
     # Logout
     if st.button(" Logout", key="logout_button"):
-        st.session_state["user"] = None
+        logout()
         st.rerun()
@@ -1,7 +1,17 @@
+import html
+import re
+
 import streamlit as st
-from db_connection import get_user, register_user, get_research_highlights, search_research_highlights
+from db_connection import (
+    get_user, register_user, get_research_highlights, search_research_highlights, parse_search_query,
+    record_user_activity, start_cache_sync
+)
+from pagination import current_page_cursor, page_controls
+from metrics import set_page, start_metrics_server
 
 st.set_page_config(page_title="Collaborative Research Hub", layout="wide")
+start_metrics_server()  # Prometheus endpoint, started once per process
+start_cache_sync()  # evict what other replicas' writes invalidate, once per process
 
 
 if "current_page" not in st.session_state:
@@ -17,6 +27,20 @@ def navigate_to(page):
         st.rerun()
 
 
+# Escape text for the highlight cards and wrap search matches in <mark>.
+# Words are prefix matched, like the full-text query.
+def mark_terms(text, terms):
+    text = html.escape(str(text or ""))
+    if not terms:
+        return text
+    patterns = []
+    for term in sorted(terms, key=len, reverse=True):
+        words = [re.escape(html.escape(word)) for word in term.split()]
+        patterns.append(r"\s+".join(words) + (r"\w*" if len(words) == 1 else ""))
+    regex = re.compile(r"\b(?:%s)" % "|".join(patterns), re.IGNORECASE)
+    return regex.sub(lambda m: f"<mark>{m.group(0)}</mark>", text)
+
+
 
 st.markdown(
     """
@@ -93,6 +117,12 @@ st.markdown(
             margin: 5px 0;
         }
 
+        .highlight-card mark {
+            background-color: #FFE082;
+            padding: 0 2px;
+            border-radius: 3px;
+        }
+
         /* Styled Login/Register Button */
         .login-btn {
             background-color: #2B6CB0;
@@ -124,6 +154,7 @@ st.markdown('<div class="center-content"><h1>Collaborative Research Hub</h1></di
 
 # Handle Page Navigation
 current_page = st.session_state.get("current_page", "home")
+set_page(current_page)  # label for this rerun's data-layer metrics
 
 # Home Page
 if current_page == "home":
@@ -134,21 +165,25 @@ if current_page == "home":
     # Show research highlights (filtered if search term is provided)
     st.subheader(" Research Highlights")
 
+    next_cursor = None
+    terms = []
     if search_term:
         highlights = search_research_highlights(search_term)
+        # Short-word searches fall back to a plain substring match
+        terms = parse_search_query(search_term)[2] or [search_term.strip()]
         if not highlights:
             st.info(f"No research highlights found for '{search_term}'.")
     else:
-        highlights = get_research_highlights()
+        highlights, next_cursor = get_research_highlights(after=current_page_cursor("highlights"))
 
     if highlights:
         for highlight in highlights:
             st.markdown(
                 f"""
                 <div class="highlight-card">
-                    <h3>{highlight['title']}</h3>
-                    <p>{highlight['summary']}</p>
-                    <p><strong> Contributors:</strong> {highlight['contributors']}</p>
+                    <h3>{mark_terms(highlight['title'], terms)}</h3>
+                    <p>{mark_terms(highlight['summary'], terms)}</p>
+                    <p><strong> Contributors:</strong> {mark_terms(highlight['contributors'], terms)}</p>
                     <p><strong>📝 Posted by:</strong> {highlight['posted_by']} | 📅 {highlight['date_posted'].strftime('%d %B %Y')}</p>
                 </div>
                 """,
@@ -157,6 +192,9 @@ if current_page == "home":
     else:
         st.info("No research highlights available yet. Stay tuned!")
 
+    if not search_term:
+        page_controls("highlights", next_cursor)
+
     # Call to action for users to join
     st.markdown("###  Join our Research Community!")
     st.write("Connect with professors and students for collaborative research opportunities.")
@@ -177,7 +215,9 @@ elif current_page == "form":
         if login_button:
             user = get_user(email, password)
             if user:
-                st.session_state["user"] = user  # Store logged-in user details
+                record_user_activity(user["user_id"])
+                st.session_state["user"] = user  # Identity only; the profile is loaded on demand
+                st.session_state["profile"] = None
                 st.success(f"Welcome, {user['name']}! 🎉")
 
                 # Navigate to respective dashboard
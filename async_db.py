@@ -0,0 +1,273 @@
+"""Asyncio versions of the db_connection reads, on aiomysql.
+
+Streamlit runs a page top to bottom in its script thread, so the page's
+queries run one after another and it waits for the sum of their round trips.
+gather() runs independent queries concurrently on one event loop per process
+(a daemon thread with its own aiomysql pool) and returns their results in
+order, so the page waits for the slowest one only:
+
+    snapshot, (inbox, next_cursor) = async_db.gather(
+        async_db.get_dashboard_snapshot(user_id, "professor"),
+        async_db.get_request_inbox(user_id, order="score"),
+    )
+
+The functions below take the same arguments, run the same SQL (the
+db_connection query constants and builders) and share read-through cache
+entries with their db_connection namesakes. Writes stay in db_connection.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+
+import db_connection as db
+import metrics
+from db_connection import DB_CONFIG, FEED_PAGE_SIZE, MATCH_SCORES_TOP_N, cached
+from metrics import instrumented, observe_acquire, registry as metrics_registry
+from slow_query_log import AsyncSlowQueryCursor, caller_site
+
+ASYNC_POOL_MIN_SIZE = int(os.environ.get("RESEARCH_HUB_ASYNC_POOL_MIN", 1))
+ASYNC_POOL_MAX_SIZE = int(os.environ.get("RESEARCH_HUB_ASYNC_POOL_MAX", 10))
+# Seconds gather() waits for all of its queries
+GATHER_TIMEOUT = float(os.environ.get("RESEARCH_HUB_ASYNC_TIMEOUT", 30))
+
+_loop = None
+_pool = None
+_start_lock = threading.Lock()
+
+# Call site in the script thread that submitted the current gather()
+_call_site = contextvars.ContextVar("research_hub_async_call_site", default=None)
+
+
+async def _create_pool():
+    # Read-only, so DB_CONFIG's FOUND_ROWS client flag doesn't matter here
+    return await aiomysql.create_pool(
+        host=DB_CONFIG["host"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        db=DB_CONFIG["database"],
+        minsize=ASYNC_POOL_MIN_SIZE,
+        maxsize=ASYNC_POOL_MAX_SIZE,
+        pool_recycle=db.POOL_MAX_LIFETIME,
+        autocommit=False,
+    )
+
+
+# The event loop thread and its pool, started on first use, once per process
+def _start():
+    global _loop, _pool
+    with _start_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-db", daemon=True).start()
+            try:
+                _pool = asyncio.run_coroutine_threadsafe(_create_pool(), loop).result(db.POOL_CHECKOUT_TIMEOUT)
+            except BaseException:
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+            _loop = loop
+    return _loop
+
+
+def _pool_stats():
+    if _pool is None:
+        return {}
+    return {"size": _pool.size, "idle": _pool.freesize, "max_size": _pool.maxsize}
+
+
+metrics_registry.register_gauges("async_pool", _pool_stats)
+
+
+# Same contract as db_connection.db_session(), for coroutines on the loop:
+# async with db_session() as cursor: await cursor.execute(...)
+@asynccontextmanager
+async def db_session(dictionary=True):
+    started = time.perf_counter()
+    conn = await _pool.acquire()
+    observe_acquire(time.perf_counter() - started)
+    try:
+        cursor = await conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor)
+        try:
+            yield AsyncSlowQueryCursor(cursor, conn, caller=_call_site.get())
+        finally:
+            await cursor.close()
+        await conn.commit()
+    except BaseException:
+        try:
+            await conn.rollback()
+        except Exception:
+            # Broken connection; the pool drops closed connections on release
+            conn.close()
+        raise
+    finally:
+        _pool.release(conn)
+
+
+# aiomysql returns a tuple of rows; the keyset pages and metrics expect a list
+async def _fetchall(cursor, query, params):
+    await cursor.execute(query, params)
+    return list(await cursor.fetchall())
+
+
+async def _run_all(coroutines, page, site):
+    # Tasks inherit the context of the loop thread, not of the script thread;
+    # carry over its page label (metrics) and call site (slow query log)
+    metrics.set_page(page)
+    _call_site.set(site)
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def gather(*coroutines, timeout=GATHER_TIMEOUT):
+    """Run ``coroutines`` (calls of the functions below) concurrently; their results, in order."""
+    try:
+        loop = _start()
+    except BaseException:
+        for coroutine in coroutines:
+            coroutine.close()
+        raise
+    future = asyncio.run_coroutine_threadsafe(_run_all(coroutines, metrics.current_page(), caller_site()), loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+def run(coroutine, timeout=GATHER_TIMEOUT):
+    return gather(coroutine, timeout=timeout)[0]
+
+
+@instrumented
+async def get_user_profile(user_id):
+    async with db_session() as cursor:
+        await cursor.execute(db.USER_PROFILE_QUERY, (user_id,))
+        return await cursor.fetchone()
+
+
+@instrumented
+@cached(lambda **_: ["highlights"])
+async def get_research_highlights(limit=FEED_PAGE_SIZE, after=None):
+    async with db_session() as cursor:
+        rows = await _fetchall(cursor, *db._research_highlights_query(limit, after))
+    return db._keyset_page(rows, limit, "date_posted", "highlight_id")
+
+
+@instrumented
+@cached(lambda **_: ["highlights"])
+async def get_all_research_highlights():
+    async with db_session() as cursor:
+        return await _fetchall(cursor, db.ALL_RESEARCH_HIGHLIGHTS_QUERY, None)
+
+
+@instrumented
+@cached(lambda professor_id, **_: ["collaborations:%s" % professor_id] + db.professor_scores_tags(professor_id),
+        lambda page: ["user:%s" % row['student_id'] for row in page[0]])
+async def get_request_inbox(professor_id, order="date", limit=FEED_PAGE_SIZE, after=None):
+    async with db_session() as cursor:
+        rows = await _fetchall(cursor, *db._request_inbox_query(professor_id, order, limit, after))
+    return db._keyset_page(rows, limit, db.INBOX_ORDERS[order][1], "request_id")
+
+
+@instrumented
+@cached(lambda user_id, role: ["collaborations:%s" % user_id],
+        lambda rows: ["user:%s" % row.get('professor_id', row.get('student_id')) for row in rows])
+async def get_active_collaborations(user_id, role):
+    async with db_session() as cursor:
+        return await _fetchall(cursor, *db._active_collaborations_query(user_id, role))
+
+
+@instrumented
+@cached(lambda user_id, role: ["collaborations:%s" % user_id, "projects:%s" % user_id], db._snapshot_user_tags)
+async def get_dashboard_snapshot(user_id, role):
+    async with db_session() as cursor:
+        await cursor.callproc("dashboard_snapshot", (user_id, role))
+        requests = list(await cursor.fetchall())
+        await cursor.nextset()
+        projects = list(await cursor.fetchall())
+    return db._dashboard_snapshot(user_id, requests, projects)
+
+
+@instrumented
+async def search_professors(search_query):
+    async with db_session() as cursor:
+        return await _fetchall(cursor, db.SEARCH_PROFESSORS_QUERY, ('%' + search_query + '%', '%' + search_query + '%'))
+
+
+@instrumented
+async def get_collaboration_statuses(student_id, professor_ids):
+    professor_ids = list(dict.fromkeys(professor_ids))
+    if not professor_ids:
+        return {}
+
+    async with db_session() as cursor:
+        rows = await _fetchall(cursor, *db._collaboration_statuses_query(student_id, professor_ids))
+    return db._collaboration_statuses(rows)
+
+
+@instrumented
+@cached(lambda **_: ["forum"])
+async def get_forum_posts(limit=FEED_PAGE_SIZE, after=None):
+    async with db_session() as cursor:
+        rows = await _fetchall(cursor, *db._forum_posts_query(None, limit, after))
+    return db._keyset_page(rows, limit, "created_at", "post_id")
+
+
+@instrumented
+@cached(lambda category, **_: ["forum:%s" % category])
+async def get_forum_posts_by_category(category, limit=FEED_PAGE_SIZE, after=None):
+    async with db_session() as cursor:
+        rows = await _fetchall(cursor, *db._forum_posts_query(category, limit, after))
+    return db._keyset_page(rows, limit, "created_at", "post_id")
+
+
+@instrumented
+@cached(lambda **_: ["rollups"])
+async def get_activity_rollups(days=30):
+    rollups = {}
+    async with db_session() as cursor:
+        for name, query in db.ACTIVITY_ROLLUP_QUERIES.items():
+            rollups[name] = await _fetchall(cursor, query, (days,))
+    return rollups
+
+
+async def _ensure_match_scores(student_id):
+    async with db_session() as cursor:
+        await cursor.execute(db.MATCH_SCORE_STATE_QUERY, (student_id,))
+        computed = await cursor.fetchone() is not None
+    if not computed:
+        # Scoring is CPU bound and writes through the sync pool; keep it off the loop
+        refresh = functools.partial(contextvars.copy_context().run, db.refresh_match_scores, student_id, False)
+        await asyncio.get_running_loop().run_in_executor(None, refresh)
+
+
+@instrumented
+async def get_top_professor_matches(student_id, limit=MATCH_SCORES_TOP_N):
+    await _ensure_match_scores(student_id)
+    async with db_session() as cursor:
+        return await _fetchall(cursor, db.TOP_PROFESSOR_MATCHES_QUERY, (student_id, limit))
+
+
+@instrumented
+async def get_top_partner_matches(student_id, limit=MATCH_SCORES_TOP_N):
+    await _ensure_match_scores(student_id)
+    async with db_session() as cursor:
+        return await _fetchall(cursor, db.TOP_PARTNER_MATCHES_QUERY, (student_id, limit))
+
+
+@instrumented
+@cached(lambda user_id: ["projects:%s" % user_id])
+async def get_user_projects(user_id):
+    async with db_session() as cursor:
+        return await _fetchall(cursor, db.USER_PROJECTS_QUERY, (user_id,))
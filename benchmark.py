@@ -0,0 +1,371 @@
+"""Synthetic data generator and benchmark runner for the db_connection functions.
+
+Run it against a dedicated database (set RESEARCH_HUB_DB_NAME): the write
+benchmarks add users, requests and posts.
+
+Usage:
+    python migrate.py                                   # schema first (after dbms_final.sql)
+    python benchmark.py generate --scale 100k           # top the database up to 100k users
+    python benchmark.py run                             # writes bench_results/<revision>.json
+    python benchmark.py run --only get_user,get_forum_posts --iterations 500
+    python benchmark.py compare bench_results/a1b2c3d.json bench_results/e4f5a6b.json
+
+Each benchmark reports p50/p95/p99 latency and rows/sec over the calls, with
+the query cache cleared before every call unless --cache is given.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+
+import mysql.connector
+
+import db_connection as db
+from db_connection import DB_CONFIG
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+CHUNK_SIZE = 5000
+ITERATIONS = 100
+WARMUP = 3
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+
+TOPICS = [
+    "machine learning", "deep learning", "computer vision", "natural language processing", "robotics",
+    "databases", "distributed systems", "cloud computing", "computer networks", "security", "cryptography",
+    "bioinformatics", "computational biology", "human computer interaction", "quantum computing",
+    "data mining", "information retrieval", "compilers", "operating systems", "computer architecture",
+    "embedded systems", "signal processing", "control systems", "power systems", "renewable energy",
+    "vlsi design", "wireless communication", "internet of things", "blockchain", "reinforcement learning",
+    "graph theory", "optimization", "statistics", "game theory", "computer graphics", "software engineering",
+    "formal methods", "parallel computing", "edge computing", "speech recognition", "medical imaging",
+    "materials science", "fluid dynamics", "thermodynamics", "structural engineering", "genomics",
+]
+# A few fields are far more popular than the rest, as in real interest lists
+TOPIC_WEIGHTS = [1.0 / (rank + 1) ** 0.8 for rank in range(len(TOPICS))]
+DEPARTMENTS = ["CSE", "ECE", "ME", "EE", "BT", "CE", "CH", "MA", "PH"]
+CATEGORIES = ["General Research", "Funding", "Publication Help", "Research Groups"]
+EXPERIENCE_LEVELS = ["beginner", "intermediate", "advanced"]
+
+
+def _interests(rng):
+    picks = rng.choices(TOPICS, weights=TOPIC_WEIGHTS, k=rng.randint(2, 5))
+    return ", ".join(dict.fromkeys(picks))
+
+
+def _timestamp(rng, now):
+    return now - datetime.timedelta(seconds=rng.randint(0, 2 * 365 * 24 * 3600))
+
+
+def _insert_chunks(conn, cursor, query, rows, chunk_size=CHUNK_SIZE):
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return total
+        cursor.executemany(query, chunk)
+        conn.commit()
+        total += len(chunk)
+
+
+def generate(users, seed=42, chunk_size=CHUNK_SIZE, verbose=True):
+    """Top the database up to ``users`` users, with requests, posts, highlights and projects to match."""
+    rng = random.Random(seed)
+    now = datetime.datetime.now().replace(microsecond=0)
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM users")
+        existing = cursor.fetchone()[0]
+        added = users - existing
+        if added <= 0:
+            if verbose:
+                print("Database already has %d users." % existing)
+            return 0
+
+        def user_rows():
+            for i in range(existing, users):
+                role = "admin" if i % 1000 == 0 else "professor" if i % 10 == 1 else "student"
+                yield ("Bench User %d" % i, "bench_user_%d@example.com" % i, "bench", role,
+                       rng.choice(DEPARTMENTS), _interests(rng), rng.choice(EXPERIENCE_LEVELS))
+
+        started = time.perf_counter()
+        _insert_chunks(conn, cursor, """
+            INSERT INTO users (name, email, password, role, department, research_interests, experience_level)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE email = email
+        """, user_rows(), chunk_size)
+
+        cursor.execute("SELECT user_id, role FROM users")
+        ids = cursor.fetchall()
+        students = [user_id for user_id, role in ids if role == "student"]
+        professors = [user_id for user_id, role in ids if role == "professor"]
+        everyone = [user_id for user_id, _ in ids]
+
+        # About two requests per new user; repeated pairs are absorbed by the unique key
+        requests = _insert_chunks(conn, cursor, """
+            INSERT INTO collaboration_requests (student_id, professor_id, status, request_date)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE status = status
+        """, ((rng.choice(students), rng.choice(professors),
+               rng.choices(["pending", "accepted", "rejected"], weights=[5, 3, 2])[0], _timestamp(rng, now))
+              for _ in range(2 * added)), chunk_size)
+
+        posts = _insert_chunks(conn, cursor, """
+            INSERT INTO forum_posts (title, content, author_id, category, created_at) VALUES (%s, %s, %s, %s, %s)
+        """, (("Looking for collaborators in %s" % rng.choice(TOPICS),
+               "We are working on %s and %s. Anyone interested?" % (rng.choice(TOPICS), rng.choice(TOPICS)),
+               rng.choice(everyone), rng.choice(CATEGORIES), _timestamp(rng, now))
+              for _ in range(added // 2)), chunk_size)
+
+        highlights = _insert_chunks(conn, cursor, """
+            INSERT INTO research_highlights (title, summary, contributors, posted_by, date_posted)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (("Advances in %s" % rng.choice(TOPICS),
+               "New results combining %s with %s." % (rng.choice(TOPICS), rng.choice(TOPICS)),
+               "Bench User %d, Bench User %d" % (rng.randrange(users), rng.randrange(users)),
+               rng.choice(everyone), _timestamp(rng, now))
+              for _ in range(added // 10)), chunk_size)
+
+        projects = _insert_chunks(conn, cursor, """
+            INSERT INTO projects (title, description, status, owner_id) VALUES (%s, %s, %s, %s)
+        """, (("%s project" % rng.choice(TOPICS).capitalize(), "Synthetic benchmark project",
+               rng.choice(["ongoing", "completed"]), rng.choice(everyone))
+              for _ in range(added // 3)), chunk_size)
+
+        # Fresh statistics so the optimizer sees the new cardinalities
+        for table in ("users", "collaboration_requests", "forum_posts", "research_highlights", "projects"):
+            cursor.execute("ANALYZE TABLE %s" % table)
+            cursor.fetchall()
+
+        if verbose:
+            print("Added %d users, %d requests, %d posts, %d highlights, %d projects in %.1fs" % (
+                added, requests, posts, highlights, projects, time.perf_counter() - started))
+        return added
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class Sample:
+    """Random arguments for one benchmark call, drawn from rows that exist."""
+
+    def __init__(self, fixtures, rng):
+        self.student = rng.choice(fixtures["students"])
+        self.professor_id = rng.choice(fixtures["professors"])
+        self.professor_ids = rng.sample(fixtures["professors"], min(20, len(fixtures["professors"])))
+        self.keyword = rng.choice(TOPICS).split()[0]
+        self.category = rng.choice(CATEGORIES)
+
+
+def load_fixtures(count=200):
+    with db.db_session() as cursor:
+        cursor.execute("""
+            SELECT user_id, email, password, department, research_interests FROM users
+            WHERE role = 'student' AND research_interests IS NOT NULL ORDER BY RAND() LIMIT %s
+        """, (count,))
+        students = cursor.fetchall()
+        cursor.execute("SELECT user_id FROM users WHERE role = 'professor' ORDER BY RAND() LIMIT %s", (count,))
+        professors = [row["user_id"] for row in cursor.fetchall()]
+    if not students or not professors:
+        raise SystemExit("No students or professors to benchmark with; run `benchmark.py generate` first.")
+    return {"students": students, "professors": professors}
+
+
+# name -> (call, share of --iterations); writes that rebuild derived data run less often
+BENCHMARKS = {
+    "get_user": (lambda s: db.get_user(s.student["email"], s.student["password"]), 1),
+    "get_user_profile": (lambda s: db.get_user_profile(s.student["user_id"]), 1),
+    "get_research_highlights": (lambda s: db.get_research_highlights(), 1),
+    "search_research_highlights": (lambda s: db.search_research_highlights(s.keyword), 1),
+    "get_forum_posts": (lambda s: db.get_forum_posts(), 1),
+    "get_forum_posts_by_category": (lambda s: db.get_forum_posts_by_category(s.category), 1),
+    "search_professors": (lambda s: db.search_professors(s.keyword), 1),
+    "search_unrequested_students": (lambda s: db.search_unrequested_students(s.professor_id, s.keyword), 1),
+    "recommend_professors": (lambda s: db.recommend_professors(s.student["research_interests"]), 1),
+    "find_research_partners": (lambda s: db.find_research_partners(
+        s.student["user_id"], s.student["department"], s.student["research_interests"], limit=20), 1),
+    "get_top_professor_matches": (lambda s: db.get_top_professor_matches(s.student["user_id"]), 1),
+    "get_top_partner_matches": (lambda s: db.get_top_partner_matches(s.student["user_id"]), 1),
+    "get_collaboration_statuses": (
+        lambda s: db.get_collaboration_statuses(s.student["user_id"], s.professor_ids), 1),
+    "get_active_collaborations": (lambda s: db.get_active_collaborations(s.student["user_id"], "student"), 1),
+    "get_student_pending_requests": (lambda s: db.get_student_pending_requests(s.student["user_id"]), 1),
+    "get_pending_requests_detailed": (lambda s: db.get_pending_requests_detailed(s.professor_id), 1),
+    "get_request_inbox": (lambda s: db.get_request_inbox(s.professor_id, "score"), 1),
+    "get_dashboard_snapshot": (lambda s: db.get_dashboard_snapshot(s.student["user_id"], "student"), 1),
+    "get_user_projects": (lambda s: db.get_user_projects(s.student["user_id"]), 1),
+    "send_collaboration_request": (
+        lambda s: db.send_collaboration_request(s.student["user_id"], s.professor_id), 1),
+    "create_forum_post": (lambda s: db.create_forum_post(
+        "Benchmark post", "Posted by benchmark.py", s.student["user_id"], s.category), 1),
+    "register_user": (lambda s: db.register_user(
+        "Bench Registrant", "bench_reg_%s@example.com" % uuid.uuid4().hex, "bench", "student"), 0.1),
+}
+
+
+def _rows(result):
+    if isinstance(result, tuple):  # keyset pages are (rows, next_cursor)
+        result = result[0]
+    if isinstance(result, dict) and "counts" in result:  # dashboard snapshot
+        return sum(result["counts"].values())
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return 1 if result else 0
+
+
+def _percentile(ordered, percent):
+    # Nearest-rank percentile of an already sorted list
+    return ordered[max(0, math.ceil(percent / 100.0 * len(ordered)) - 1)]
+
+
+def run_benchmark(name, iterations=ITERATIONS, use_cache=False, fixtures=None, seed=42):
+    call, share = BENCHMARKS[name]
+    rng = random.Random(seed)
+    fixtures = fixtures or load_fixtures()
+    iterations = max(1, int(iterations * share))
+
+    # Warm-up calls build the partner index and any lazily computed match scores
+    for _ in range(WARMUP):
+        call(Sample(fixtures, rng))
+
+    timings = []
+    rows = 0
+    for _ in range(iterations):
+        sample = Sample(fixtures, rng)
+        if not use_cache:
+            db.clear_cache()
+        started = time.perf_counter()
+        result = call(sample)
+        timings.append(time.perf_counter() - started)
+        rows += _rows(result)
+
+    ordered = sorted(timings)
+    total = sum(timings)
+    return {
+        "calls": iterations,
+        "p50_ms": _percentile(ordered, 50) * 1000,
+        "p95_ms": _percentile(ordered, 95) * 1000,
+        "p99_ms": _percentile(ordered, 99) * 1000,
+        "mean_ms": total / iterations * 1000,
+        "rows": rows,
+        "rows_per_sec": rows / total if total else 0.0,
+    }
+
+
+def _revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(names=None, iterations=ITERATIONS, use_cache=False, out=None, verbose=True):
+    """Run the benchmarks and write the results as JSON. Returns the results document."""
+    names = names or list(BENCHMARKS)
+    fixtures = load_fixtures()
+    with db.db_session() as cursor:
+        cursor.execute("SELECT COUNT(*) AS users FROM users")
+        users = cursor.fetchone()["users"]
+
+    document = {
+        "revision": _revision(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "users": users,
+        "iterations": iterations,
+        "cache": use_cache,
+        "python": platform.python_version(),
+        "results": {},
+    }
+    if verbose:
+        print("%-32s %8s %9s %9s %9s %11s" % ("function", "calls", "p50 ms", "p95 ms", "p99 ms", "rows/s"))
+    for name in names:
+        result = run_benchmark(name, iterations, use_cache, fixtures)
+        document["results"][name] = result
+        if verbose:
+            print("%-32s %8d %9.2f %9.2f %9.2f %11.0f" % (
+                name, result["calls"], result["p50_ms"], result["p95_ms"], result["p99_ms"],
+                result["rows_per_sec"]))
+
+    out = out or os.path.join(RESULTS_DIR, "%s.json" % document["revision"])
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    if verbose:
+        print("\nResults written to %s" % out)
+    return document
+
+
+def compare(baseline_path, current_path, threshold=0.2):
+    """Print the latency change per function. Returns the names that regressed by more than ``threshold``."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)
+
+    print("%s (%d users) -> %s (%d users)" % (
+        baseline["revision"], baseline["users"], current["revision"], current["users"]))
+    print("%-32s %9s %9s %8s %9s %9s %8s" % ("function", "p50 old", "p50 new", "change",
+                                             "p95 old", "p95 new", "change"))
+    regressions = []
+    for name in sorted(set(baseline["results"]) & set(current["results"])):
+        old, new = baseline["results"][name], current["results"][name]
+        p50_change = new["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        p95_change = new["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        regressed = p95_change > threshold
+        if regressed:
+            regressions.append(name)
+        print("%-32s %9.2f %9.2f %+7.0f%% %9.2f %9.2f %+7.0f%%%s" % (
+            name, old["p50_ms"], new["p50_ms"], p50_change * 100, old["p95_ms"], new["p95_ms"],
+            p95_change * 100, "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic data and benchmark db_connection")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="top the database up with synthetic rows")
+    gen.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--scores", action="store_true", help="rebuild the match score tables afterwards")
+
+    bench = commands.add_parser("run", help="run the benchmarks and save the results")
+    bench.add_argument("--only", help="comma-separated function names")
+    bench.add_argument("--iterations", type=int, default=ITERATIONS)
+    bench.add_argument("--cache", action="store_true", help="keep the query cache between calls")
+    bench.add_argument("--out", help="results file (default bench_results/<revision>.json)")
+
+    cmp = commands.add_parser("compare", help="compare two results files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.2, help="p95 slowdown that counts as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate(SCALES[args.scale], seed=args.seed)
+        if args.scores:
+            db.rebuild_match_scores()
+    elif args.command == "run":
+        names = args.only.split(",") if args.only else None
+        unknown = set(names or ()) - set(BENCHMARKS)
+        if unknown:
+            parser.error("unknown benchmark(s): %s" % ", ".join(sorted(unknown)))
+        run(names, args.iterations, args.cache, args.out)
+    else:
+        return 1 if compare(args.baseline, args.current, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
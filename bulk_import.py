@@ -0,0 +1,361 @@
+"""Bulk loader for users, projects and research highlights.
+
+Streams a CSV file (with a header row) or a JSONL file (one object per line)
+into one table, in chunked transactions with one multi-row INSERT per chunk.
+Rows are validated first; invalid rows and duplicates (an email that is
+already registered, or a title the same owner already has) are skipped and
+reported, everything else is loaded.
+
+Usage:
+    python bulk_import.py users students.csv
+    python bulk_import.py projects projects.jsonl --chunk-size 2000
+    python bulk_import.py highlights highlights.csv --dry-run --report problems.csv
+
+Columns:
+    users       name, email, password, role, [department, research_interests, experience_level]
+    projects    title, [description, status], owner_id or owner_email
+    highlights  title, summary, [contributors], posted_by or posted_by_email
+
+Afterwards the partner index and match scores are brought up to date (see
+--skip-scores). Other running app processes pick the new rows up when their
+cached entries expire.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+from db_connection import (
+    db_session, invalidate_cache, invalidate_partner_index, refresh_match_scores, rebuild_match_scores
+)
+
+CHUNK_SIZE = 5000
+# Above this many new users one batched rebuild is cheaper than per-user refreshes
+INCREMENTAL_SCORE_LIMIT = 500
+MAX_VARCHAR = 255
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+ROLES = ("student", "professor", "admin")
+EXPERIENCE_LEVELS = ("beginner", "intermediate", "advanced")
+PROJECT_STATUSES = ("ongoing", "completed")
+
+
+class ImportReport:
+    def __init__(self, table, dry_run=False):
+        self.table = table
+        self.dry_run = dry_run
+        self.read = 0
+        self.inserted = 0
+        self.invalid = []  # (line, reason)
+        self.duplicates = []  # (line, key)
+        self.user_ids = []  # new users, for the match score refresh
+        self.owner_ids = set()  # owners of new projects, for cache invalidation
+        self.elapsed = 0.0
+
+    def summary(self):
+        rate = self.read / self.elapsed if self.elapsed else 0.0
+        verb = "would insert" if self.dry_run else "inserted"
+        return "%s: read %d rows, %s %d, %d duplicates, %d invalid (%.1fs, %.0f rows/s)" % (
+            self.table, self.read, verb, self.inserted, len(self.duplicates), len(self.invalid),
+            self.elapsed, rate)
+
+    def write_problems(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line", "problem", "detail"])
+            writer.writerows((line, "duplicate", key) for line, key in self.duplicates)
+            writer.writerows((line, "invalid", reason) for line, reason in self.invalid)
+
+
+def read_rows(path):
+    """Yields (line number, row) from a .csv or .jsonl file; row is None for a malformed line."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if extension == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif extension in (".jsonl", ".ndjson"):
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_number, row if isinstance(row, dict) else None
+        else:
+            raise ValueError("Unsupported file type %r (expected .csv or .jsonl)" % extension)
+
+
+def _text(row, key, required=False, max_length=None):
+    value = row.get(key)
+    value = str(value).strip() if value is not None else ""
+    if not value:
+        if required:
+            raise ValueError("missing %s" % key)
+        return None
+    if max_length and len(value) > max_length:
+        raise ValueError("%s is longer than %d characters" % (key, max_length))
+    return value
+
+
+def _choice(row, key, choices, default=None):
+    value = _text(row, key)
+    if value is None:
+        if default is None:
+            raise ValueError("missing %s" % key)
+        return default
+    value = value.lower()
+    if value not in choices:
+        raise ValueError("%s must be one of %s" % (key, ", ".join(choices)))
+    return value
+
+
+def _user_ref(row, id_key, email_key):
+    """(user_id, None) or (None, email) for a column that names a user either way."""
+    user_id = _text(row, id_key)
+    if user_id is not None:
+        if not user_id.isdigit():
+            raise ValueError("%s must be a number" % id_key)
+        return int(user_id), None
+    email = _text(row, email_key)
+    if email is None:
+        raise ValueError("missing %s or %s" % (id_key, email_key))
+    return None, email
+
+
+def clean_user(row):
+    email = _text(row, "email", required=True, max_length=MAX_VARCHAR)
+    if not EMAIL_PATTERN.match(email):
+        raise ValueError("invalid email %r" % email)
+    has_level = _text(row, "experience_level") is not None
+    return {
+        "name": _text(row, "name", required=True, max_length=MAX_VARCHAR),
+        "email": email,
+        "password": _text(row, "password", required=True, max_length=MAX_VARCHAR),
+        "role": _choice(row, "role", ROLES),
+        "department": _text(row, "department", max_length=MAX_VARCHAR),
+        "research_interests": _text(row, "research_interests"),
+        "experience_level": _choice(row, "experience_level", EXPERIENCE_LEVELS) if has_level else None,
+    }
+
+
+def clean_project(row):
+    owner_id, owner_email = _user_ref(row, "owner_id", "owner_email")
+    return {
+        "title": _text(row, "title", required=True, max_length=MAX_VARCHAR),
+        "description": _text(row, "description"),
+        "status": _choice(row, "status", PROJECT_STATUSES, default="ongoing"),
+        "owner_id": owner_id,
+        "owner_email": owner_email,
+    }
+
+
+def clean_highlight(row):
+    posted_by, posted_by_email = _user_ref(row, "posted_by", "posted_by_email")
+    return {
+        "title": _text(row, "title", required=True, max_length=MAX_VARCHAR),
+        "summary": _text(row, "summary", required=True),
+        "contributors": _text(row, "contributors"),
+        "owner_id": posted_by,
+        "owner_email": posted_by_email,
+    }
+
+
+def _in_clause(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _resolve_owners(cursor, chunk, report):
+    """Fill in owner_id from owner_email and drop rows whose owner does not exist."""
+    emails = list({row["owner_email"].lower() for _, row in chunk if row["owner_email"]})
+    ids = list({row["owner_id"] for _, row in chunk if row["owner_id"] is not None})
+    by_email = {}
+    known_ids = set()
+    if emails:
+        cursor.execute("SELECT user_id, email FROM users WHERE email IN (%s)" % _in_clause(emails), emails)
+        by_email = {email.lower(): user_id for user_id, email in cursor.fetchall()}
+    if ids:
+        cursor.execute("SELECT user_id FROM users WHERE user_id IN (%s)" % _in_clause(ids), ids)
+        known_ids = {user_id for (user_id,) in cursor.fetchall()}
+
+    resolved = []
+    for line, row in chunk:
+        if row["owner_email"]:
+            row["owner_id"] = by_email.get(row["owner_email"].lower())
+        if row["owner_id"] is None or (not row["owner_email"] and row["owner_id"] not in known_ids):
+            report.invalid.append((line, "unknown user %s" % (row["owner_email"] or row["owner_id"])))
+        else:
+            resolved.append((line, row))
+    return resolved
+
+
+def load_users(cursor, chunk, seen, report):
+    emails = [row["email"] for _, row in chunk]
+    cursor.execute("SELECT email FROM users WHERE email IN (%s)" % _in_clause(emails), emails)
+    existing = {email.lower() for (email,) in cursor.fetchall()}
+
+    rows = []
+    for line, row in chunk:
+        key = row["email"].lower()
+        if key in existing or key in seen:
+            report.duplicates.append((line, row["email"]))
+            continue
+        seen.add(key)
+        rows.append((row["name"], row["email"], row["password"], row["role"],
+                     row["department"], row["research_interests"], row["experience_level"]))
+    if not rows:
+        return
+    if report.dry_run:
+        report.inserted += len(rows)
+        return
+
+    # Same duplicate-safe insert as register_user, batched into one statement
+    cursor.executemany("""
+        INSERT INTO users (name, email, password, role, department, research_interests, experience_level)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE email = email
+    """, rows)
+    report.inserted += cursor.rowcount
+    new_emails = [row[1] for row in rows]
+    cursor.execute("SELECT user_id FROM users WHERE email IN (%s)" % _in_clause(new_emails), new_emails)
+    report.user_ids.extend(user_id for (user_id,) in cursor.fetchall())
+
+
+def _load_owned(cursor, chunk, seen, report, table, owner_column, insert, values):
+    chunk = _resolve_owners(cursor, chunk, report)
+    if not chunk:
+        return
+    owners = list({row["owner_id"] for _, row in chunk})
+    cursor.execute(
+        "SELECT %s, title FROM %s WHERE %s IN (%s)" % (owner_column, table, owner_column, _in_clause(owners)),
+        owners)
+    existing = {(owner_id, title.lower()) for owner_id, title in cursor.fetchall()}
+
+    rows = []
+    for line, row in chunk:
+        key = (row["owner_id"], row["title"].lower())
+        if key in existing or key in seen:
+            report.duplicates.append((line, "%s (user %s)" % (row["title"], row["owner_id"])))
+            continue
+        seen.add(key)
+        rows.append(values(row))
+        report.owner_ids.add(row["owner_id"])
+    if not rows:
+        return
+    if report.dry_run:
+        report.inserted += len(rows)
+        return
+    cursor.executemany(insert, rows)
+    report.inserted += cursor.rowcount
+
+
+def load_projects(cursor, chunk, seen, report):
+    _load_owned(
+        cursor, chunk, seen, report, "projects", "owner_id",
+        "INSERT INTO projects (title, description, status, owner_id) VALUES (%s, %s, %s, %s)",
+        lambda row: (row["title"], row["description"], row["status"], row["owner_id"]))
+
+
+def load_highlights(cursor, chunk, seen, report):
+    _load_owned(
+        cursor, chunk, seen, report, "research_highlights", "posted_by",
+        "INSERT INTO research_highlights (title, summary, contributors, posted_by) VALUES (%s, %s, %s, %s)",
+        lambda row: (row["title"], row["summary"], row["contributors"], row["owner_id"]))
+
+
+# table -> (row validator, chunk loader)
+TABLES = {
+    "users": (clean_user, load_users),
+    "projects": (clean_project, load_projects),
+    "highlights": (clean_highlight, load_highlights),
+}
+
+
+def after_import(report, update_scores=True):
+    """Bring caches and derived data up to date with what was loaded."""
+    if report.dry_run or not report.inserted:
+        return
+    if report.table == "users":
+        invalidate_partner_index()
+        if update_scores:
+            if len(report.user_ids) > INCREMENTAL_SCORE_LIMIT:
+                rebuild_match_scores()
+            else:
+                for user_id in report.user_ids:
+                    refresh_match_scores(user_id)
+    elif report.table == "projects":
+        invalidate_cache(*("projects:%s" % owner_id for owner_id in report.owner_ids))
+    elif report.table == "highlights":
+        invalidate_cache("highlights")
+
+
+def bulk_import(table, path, chunk_size=CHUNK_SIZE, dry_run=False, update_scores=True):
+    """Load ``path`` into ``table`` ("users", "projects" or "highlights"). Returns an ImportReport."""
+    clean, load = TABLES[table]
+    report = ImportReport(table, dry_run)
+    seen = set()
+    started = time.perf_counter()
+
+    def flush(chunk):
+        # One transaction per chunk: a failure only loses the chunk being loaded
+        with db_session(dictionary=False) as cursor:
+            load(cursor, chunk, seen, report)
+
+    chunk = []
+    for line, row in read_rows(path):
+        report.read += 1
+        if row is None:
+            report.invalid.append((line, "malformed JSON line"))
+            continue
+        try:
+            chunk.append((line, clean(row)))
+        except ValueError as e:
+            report.invalid.append((line, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    report.elapsed = time.perf_counter() - started
+    after_import(report, update_scores)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk load users, projects or research highlights")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help=".csv (with a header row) or .jsonl file")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="validate and check duplicates without inserting")
+    parser.add_argument("--skip-scores", action="store_true",
+                        help="don't update match scores (run match_scores.py later)")
+    parser.add_argument("--report", metavar="CSV", help="write every skipped row to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        report = bulk_import(args.table, args.path, args.chunk_size, args.dry_run, not args.skip_scores)
+    except (OSError, ValueError) as e:
+        print("Import failed: %s" % e, file=sys.stderr)
+        return 1
+
+    print(report.summary())
+    for line, key in report.duplicates[:20]:
+        print("  line %d: duplicate %s" % (line, key))
+    for line, reason in report.invalid[:20]:
+        print("  line %d: %s" % (line, reason))
+    if len(report.duplicates) > 20 or len(report.invalid) > 20:
+        print("  ... (use --report to list every skipped row)")
+    if args.report:
+        report.write_problems(args.report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Throughput and latency benchmark for the message bus.
+
+Run it against a local broker (e.g. `mosquitto -p 1883`): a sender and a
+receiver bus in this process exchange --messages messages of --size random
+bytes on a topic of their own, and the receiver measures the end-to-end
+latency of each one.
+
+Usage:
+    python bus_benchmark.py                              # batched and unbatched, 20000 x 200 bytes
+    python bus_benchmark.py --messages 100000 --size 64 --qos 0
+    python bus_benchmark.py --mode batched --rate 5000   # paced at 5000 messages/sec
+    python bus_benchmark.py --out bench_results/bus.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+
+from message_bus import MessageBus, MQTT_HOST, MQTT_PORT
+
+MESSAGES = 20000
+SIZE = 200
+TIMEOUT = 120
+# Sending one MQTT message per bus message, for comparison
+UNBATCHED = {"batch_delay": 0, "batch_max_messages": 1}
+
+
+def _percentile(ordered, percent):
+    # Nearest-rank percentile of an already sorted list
+    return ordered[max(0, math.ceil(percent / 100.0 * len(ordered)) - 1)]
+
+
+def _wait_connected(bus, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not bus.stats()["connected"]:
+        if time.monotonic() > deadline:
+            raise SystemExit("No broker at %s:%s" % (bus.host, bus.port))
+        time.sleep(0.05)
+
+
+def run_benchmark(mode, host=MQTT_HOST, port=MQTT_PORT, messages=MESSAGES, size=SIZE, qos=1, rate=0,
+                  timeout=TIMEOUT):
+    prefix = "research_hub_bench/%s" % uuid.uuid4().hex[:12]
+    options = UNBATCHED if mode == "unbatched" else {}
+    receiver = MessageBus(host, port, prefix=prefix, qos=qos)
+    sender = MessageBus(host, port, prefix=prefix, qos=qos, **options)
+
+    latencies = []
+    done = threading.Event()
+
+    def on_message(topic, message):
+        latencies.append(time.perf_counter() - message["t"])
+        if len(latencies) >= messages:
+            done.set()
+
+    receiver.subscribe("bench", on_message)
+    sender.start()
+    _wait_connected(receiver)
+    _wait_connected(sender)
+    time.sleep(0.5)  # let the subscription reach the broker
+
+    started = time.perf_counter()
+    for seq in range(messages):
+        if rate:
+            delay = started + seq / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        # Fresh random bytes, so batches don't compress better than real traffic would
+        sender.publish("bench", {"s": seq, "t": time.perf_counter(), "p": os.urandom(size)}, timeout=timeout)
+    sender.flush(timeout)
+    done.wait(timeout)
+    elapsed = time.perf_counter() - started
+
+    sent = sender.stats()
+    received = receiver.stats()
+    sender.close()
+    receiver.close()
+
+    ordered = sorted(latencies)
+    result = {
+        "mode": mode,
+        "messages": messages,
+        "received": len(ordered),
+        "size": size,
+        "qos": qos,
+        "rate": rate,
+        "seconds": elapsed,
+        "msgs_per_sec": len(ordered) / elapsed if elapsed else 0.0,
+        "mqtt_messages": sent.get("batches", 0),
+        "bytes_sent": sent.get("bytes_sent", 0),
+        "dropped": sent.get("dropped", 0) + received.get("dropped_received", 0),
+    }
+    if ordered:
+        result.update({
+            "p50_ms": _percentile(ordered, 50) * 1000,
+            "p95_ms": _percentile(ordered, 95) * 1000,
+            "p99_ms": _percentile(ordered, 99) * 1000,
+            "max_ms": ordered[-1] * 1000,
+        })
+    return result
+
+
+def _print(result):
+    print("%-10s %8d/%-8d recv %10.0f msg/s %8d mqtt msgs %10.1f KiB   p50 %7.2f  p95 %7.2f  p99 %7.2f  max %7.2f ms"
+          % (result["mode"], result["received"], result["messages"], result["msgs_per_sec"],
+             result["mqtt_messages"], result["bytes_sent"] / 1024.0, result.get("p50_ms", 0),
+             result.get("p95_ms", 0), result.get("p99_ms", 0), result.get("max_ms", 0)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the message bus against a local broker")
+    parser.add_argument("--host", default=MQTT_HOST or "127.0.0.1")
+    parser.add_argument("--port", type=int, default=MQTT_PORT)
+    parser.add_argument("--mode", choices=["both", "batched", "unbatched"], default="both")
+    parser.add_argument("--messages", type=int, default=MESSAGES)
+    parser.add_argument("--size", type=int, default=SIZE, help="payload bytes per message")
+    parser.add_argument("--qos", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--rate", type=float, default=0, help="messages/sec to pace at (0 = as fast as possible)")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT)
+    parser.add_argument("--out", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    modes = ["batched", "unbatched"] if args.mode == "both" else [args.mode]
+    results = []
+    for mode in modes:
+        result = run_benchmark(mode, args.host, args.port, args.messages, args.size, args.qos, args.rate,
+                               args.timeout)
+        _print(result)
+        results.append(result)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"host": args.host, "results": results}, f, indent=2)
+    return 0 if all(result["received"] == result["messages"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Cross-replica cache invalidation over the message bus.
+
+Every app process caches reads in its own QueryCache, so a write served by
+one replica would leave the others stale until their TTL. db_connection's
+invalidate_cache() therefore evicts locally and broadcast()s the tags on the
+bus topic cache/invalidate; each process that ran start() evicts the entries
+carrying exactly those tags (its own messages are skipped, they were applied
+before sending). CLIs (bulk_import.py, rollups.py, ...) only broadcast.
+
+Messages are {"o": origin process, "t": [tags]}. Identical invalidations
+still waiting in the bus' batch are coalesced into one.
+"""
+import logging
+import threading
+import uuid
+
+from message_bus import BusFull, get_bus
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_TOPIC = "cache/invalidate"
+ORIGIN = uuid.uuid4().hex[:16]
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def broadcast(tags):
+    """Best effort: a broker outage must not fail the write that was just committed."""
+    bus = get_bus()
+    tags = sorted(set(tags))
+    if not tags or not bus.enabled:
+        return False
+    try:
+        # Never wait for room in the bus queue on the write path
+        return bus.publish(INVALIDATION_TOPIC, {"o": ORIGIN, "t": tags}, key=tuple(tags), timeout=0)
+    except BusFull as e:
+        logger.warning("Cache invalidation of %s not broadcast: %s", ", ".join(tags), e)
+        return False
+
+
+def start(evict, reset):
+    """Call evict(tags) for the invalidations broadcast by other processes, from
+    now on, and reset() after every connect, the first one included, since
+    invalidations sent before then may have been missed."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+
+    def on_invalidate(topic, message):
+        try:
+            origin, tags = message["o"], message["t"]
+        except (KeyError, TypeError):
+            logger.warning("Ignoring message on %s: not a cache invalidation", topic)
+            return
+        if origin != ORIGIN:
+            evict(tags)
+
+    bus = get_bus()
+    bus.on_connect(reset)
+    bus.subscribe(INVALIDATION_TOPIC, on_invalidate)
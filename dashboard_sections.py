@@ -0,0 +1,63 @@
+import streamlit as st
+import async_db
+from db_connection import cache_generation
+
+# st.tabs runs the body of every tab on every rerun, so a dashboard built on it
+# loads all of its data all the time. The dashboards instead render only the
+# selected section, and keep that section's data in the session until a write
+# invalidates one of the cache tags it depends on.
+
+
+def section_selector(dashboard, labels):
+    """Horizontal section picker; returns the label of the active section."""
+    return st.radio(
+        "Section", labels, key=f"{dashboard}_section", horizontal=True, label_visibility="collapsed"
+    )
+
+
+def section_data(name, tags, loader, *args):
+    """loader(*args), reused across reruns of this session until ``tags`` are invalidated."""
+    store = st.session_state.setdefault("section_data", {})
+    key = (name,) + args
+    # Taken before loading, so a write racing with the load forces a reload next time
+    generation = cache_generation(*tags)
+
+    entry = store.get(key)
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+
+    value = loader(*args)
+    store[key] = (generation, value)
+    return value
+
+
+def gather_section_data(*sections):
+    """section_data() for several (name, tags, async_loader, *args) at once.
+
+    The sections that need (re)loading are loaded concurrently with
+    async_db.gather(), so the page waits for the slowest query only. A
+    section with ``tags`` None has no tag to invalidate it and is loaded
+    every time; one given as None is skipped and its value is None.
+    """
+    store = st.session_state.setdefault("section_data", {})
+    values, pending = [], []
+    for index, section in enumerate(sections):
+        values.append(None)
+        if section is None:
+            continue
+        name, tags, loader, *args = section
+        key = (name,) + tuple(args)
+        generation = cache_generation(*tags) if tags is not None else None
+        entry = store.get(key)
+        if entry is not None and generation is not None and entry[0] == generation:
+            values[index] = entry[1]
+        else:
+            pending.append((index, key, generation, loader(*args)))
+
+    if pending:
+        results = async_db.gather(*[coroutine for _, _, _, coroutine in pending])
+        for (index, key, generation, _), value in zip(pending, results):
+            if generation is not None:
+                store[key] = (generation, value)
+            values[index] = value
+    return values
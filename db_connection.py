@@ -1,86 +1,519 @@
 
+import functools
+import inspect
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
+from mysql.connector.constants import ClientFlag
 import streamlit as st
 from datetime import datetime
 
+from db_pool import ConnectionPool
+from photo_store import content_hash, get_photo_store
+from matching import KeywordMatcher, PartnerIndex, split_keywords, join_keywords
+from query_cache import QueryCache
+from metrics import instrumented, observe_acquire, registry as metrics_registry
+from slow_query_log import SlowQueryCursor
+from forum_live import live_feed
+import cache_sync
+
+
+DB_CONFIG = {
+    "host": os.environ.get("RESEARCH_HUB_DB_HOST", "127.0.0.1"),
+    "user": os.environ.get("RESEARCH_HUB_DB_USER", "root"),
+    "password": os.environ.get("RESEARCH_HUB_DB_PASSWORD", "bipul2576"),
+    "database": os.environ.get("RESEARCH_HUB_DB_NAME", "research_hub"),
+    # Report rows actually changed rather than rows matched, so an
+    # INSERT ... ON DUPLICATE KEY UPDATE has rowcount 1 (inserted),
+    # 2 (updated) or 0 (left as it was)
+    "client_flags": [-ClientFlag.FOUND_ROWS],
+}
+
+# Connection pool settings (seconds for the time based ones)
+POOL_MIN_SIZE = int(os.environ.get("RESEARCH_HUB_POOL_MIN", 2))
+POOL_MAX_SIZE = int(os.environ.get("RESEARCH_HUB_POOL_MAX", 10))
+POOL_MAX_LIFETIME = float(os.environ.get("RESEARCH_HUB_POOL_MAX_LIFETIME", 1800))
+POOL_VALIDATE_IDLE = float(os.environ.get("RESEARCH_HUB_POOL_VALIDATE_IDLE", 5))
+POOL_CHECKOUT_TIMEOUT = float(os.environ.get("RESEARCH_HUB_POOL_TIMEOUT", 10))
+# Rows per page for the keyset-paginated feeds (forum, research highlights)
+FEED_PAGE_SIZE = int(os.environ.get("RESEARCH_HUB_FEED_PAGE_SIZE", 20))
+# Maximum number of ranked results returned by search_research_highlights
+SEARCH_RESULT_LIMIT = int(os.environ.get("RESEARCH_HUB_SEARCH_LIMIT", 50))
+# Seconds before the in-memory research partner index is rebuilt from the
+# database; profile writes update their own entry immediately
+PARTNER_INDEX_TTL = float(os.environ.get("RESEARCH_HUB_PARTNER_INDEX_TTL", 300))
+# Pseudo cache tag other processes receive when the partner index is dropped;
+# "partner_index:<user_id>" when only that student's entry changed
+PARTNER_INDEX_TAG = "partner_index"
+# Research partner scores stored per student, and rows shown by the dashboards
+PARTNER_SCORES_KEEP = int(os.environ.get("RESEARCH_HUB_PARTNER_SCORES_KEEP", 100))
+MATCH_SCORES_TOP_N = int(os.environ.get("RESEARCH_HUB_MATCH_TOP_N", 20))
+# Students whose lists rebuild_match_scores() writes per transaction
+MATCH_SCORES_CHUNK = int(os.environ.get("RESEARCH_HUB_MATCH_SCORES_CHUNK", 500))
+# Cache tag of every stored score (bumped by rebuild_match_scores()); a student's
+# own lists and a professor's scores carry their own tags as well
+MATCH_SCORES_TAG = "match_scores"
+# Shared read-through cache for the feed/dashboard reads
+CACHE_TTL = float(os.environ.get("RESEARCH_HUB_CACHE_TTL", 60))
+CACHE_MAX_ENTRIES = int(os.environ.get("RESEARCH_HUB_CACHE_MAX_ENTRIES", 2000))
+# Sessions held longer than this are reported as long-held / possibly leaked
+SESSION_LONG_HELD = float(os.environ.get("RESEARCH_HUB_SESSION_LONG_HELD", 30))
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_partner_index = None
+_partner_index_built = 0.0
+_partner_index_lock = threading.Lock()
+
+_query_cache = QueryCache(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+_cache_epoch = 0
+
+
+# One pool per process, shared by every Streamlit session thread
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_CONFIG,
+                    min_size=POOL_MIN_SIZE,
+                    max_size=POOL_MAX_SIZE,
+                    max_lifetime=POOL_MAX_LIFETIME,
+                    validate_idle=POOL_VALIDATE_IDLE,
+                    checkout_timeout=POOL_CHECKOUT_TIMEOUT,
+                    long_held=SESSION_LONG_HELD,
+                )
+    return _pool
+
+
+# Describe the first caller outside this module, e.g. "student_dashboard.py:112 in show"
+def _caller_site():
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename != __file__ and not filename.endswith("contextlib.py"):
+            return "%s:%s in %s" % (os.path.basename(filename), frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return "unknown"
+
+
+# Returns a pooled connection; conn.close() hands it back to the pool
+def get_db_connection():
+    return get_pool().get_connection(acquired_by=_caller_site())
 
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="127.0.0.1",
-        user="root",
-        password="bipul2576",
-        database="research_hub"
-    )
+# Usage: with db_session() as cursor: cursor.execute(...)
+# Commits when the block finishes, rolls back if it raises, and always returns
+# the connection to the pool (including on st.rerun()).
+# Cursors are buffered, so a statement's time includes fetching its rows, and
+# slow statements end up in the slow query log (see slow_query_log.py).
+@contextmanager
+def db_session(dictionary=True):
+    started = time.perf_counter()
+    conn = get_db_connection()
+    observe_acquire(time.perf_counter() - started)
+    try:
+        cursor = conn.cursor(dictionary=dictionary, buffered=True)
+        try:
+            yield SlowQueryCursor(cursor, conn)
+        finally:
+            cursor.close()
+        conn.commit()
+    except BaseException:
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            # Broken connection, don't hand it out again
+            conn.discard()
+        raise
+    finally:
+        conn.close()
+
+
+# Sessions/connections currently checked out, longest held first
+def get_open_sessions(min_held=0):
+    return get_pool().checked_out(min_held)
+
+
+# Log and return sessions held for longer than SESSION_LONG_HELD seconds
+def report_long_held_sessions(threshold=None):
+    threshold = SESSION_LONG_HELD if threshold is None else threshold
+    long_held = get_open_sessions(threshold)
+    for session in long_held:
+        logger.warning("DB session held for %.1fs, acquired by %s (thread %s)",
+                       session["held_for"], session["acquired_by"], session["thread"])
+    return long_held
+
+
+# Pool size, wait time and saturation counters
+def get_pool_stats():
+    return get_pool().stats()
+
+
+# Cached rows are shared between sessions, so hand every caller its own copies
+def _copy_result(value):
+    if isinstance(value, list):
+        return [dict(row) if isinstance(row, dict) else row for row in value]
+    if isinstance(value, tuple):
+        return tuple(_copy_result(item) for item in value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+# Read-through caching for a data-access function.
+# tags(**arguments) names what the result depends on, e.g. "projects:12";
+# result_tags(result) can add tags derived from the rows themselves; those are
+# only known afterwards, so they are checked against the invalidation sequence
+# taken before the query ran.
+# Writes call invalidate_cache() with the tags they affect.
+# Coroutine functions (async_db) are cached too; an async function with the
+# same name and arguments as a function here shares its cache entries.
+def cached(tags, result_tags=None):
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def lookup(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__name__,) + tuple(bound.arguments.items())
+            hit, value = _query_cache.get(key)
+            entry_tags = None if hit else list(tags(**bound.arguments))
+            return key, hit, value, entry_tags
+
+        def store(key, value, entry_tags, generation, sequence):
+            if result_tags is not None:
+                extra_tags = list(result_tags(value))
+                extra_generation = _query_cache.generation(extra_tags)
+                if any(tag_generation > sequence for tag_generation in extra_generation):
+                    return _copy_result(value)  # a row in the result changed while the query ran
+                entry_tags += extra_tags
+                generation += extra_generation
+            _query_cache.put(key, value, entry_tags, generation)
+            return _copy_result(value)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key, hit, value, entry_tags = lookup(args, kwargs)
+                if hit:
+                    return _copy_result(value)
+                sequence, generation = _query_cache.sequence(), _query_cache.generation(entry_tags)
+                return store(key, await func(*args, **kwargs), entry_tags, generation, sequence)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key, hit, value, entry_tags = lookup(args, kwargs)
+            if hit:
+                return _copy_result(value)
+            sequence, generation = _query_cache.sequence(), _query_cache.generation(entry_tags)
+            return store(key, func(*args, **kwargs), entry_tags, generation, sequence)
+
+        return wrapper
+    return decorator
+
+
+# Evicts here and, through cache_sync, in every other app process
+def invalidate_cache(*tags):
+    evicted = _query_cache.invalidate(*tags)
+    cache_sync.broadcast(tags)
+    return evicted
+
+
+# Cache tags for a student's match lists: the shared tag plus their own one
+def match_scores_tags(student_id):
+    return [MATCH_SCORES_TAG, match_scores_tag(student_id)]
+
+
+def match_scores_tag(student_id):
+    return "%s:%s" % (MATCH_SCORES_TAG, student_id)
+
+
+# Cache tags for the students' scores against one professor (request inbox)
+def professor_scores_tags(professor_id):
+    return [MATCH_SCORES_TAG, professor_scores_tag(professor_id)]
+
+
+def professor_scores_tag(professor_id):
+    return "%s:prof:%s" % (MATCH_SCORES_TAG, professor_id)
+
+
+# Drop every cached result (the benchmarks measure the database, not the cache)
+def clear_cache():
+    global _cache_epoch
+    _cache_epoch += 1
+    _query_cache.clear()
+
+
+# Changes whenever any of ``tags`` is invalidated, or the whole cache is
+# dropped (see dashboard_sections)
+def cache_generation(*tags):
+    return _cache_epoch, _query_cache.generation(tags)
+
+
+# Apply other processes' invalidations (called once per app process, from app.py)
+def start_cache_sync():
+    cache_sync.start(_evict_remote, _reset_local_caches)
+
+
+def _evict_remote(tags):
+    _query_cache.invalidate(*tags)
+    if PARTNER_INDEX_TAG in tags:
+        _drop_partner_index()
+        return
+    for tag in tags:
+        if tag.startswith(PARTNER_INDEX_TAG + ":"):
+            _update_partner_index(int(tag.split(":", 1)[1]))
+
+
+# Invalidations sent before the bus (re)connected may have been missed
+def _reset_local_caches():
+    clear_cache()
+    _drop_partner_index()
+
+
+# Hit, miss, eviction and invalidation counters
+def get_cache_stats():
+    return _query_cache.stats()
+
+
+# Pool and cache counters are exported next to the per-function metrics
+metrics_registry.register_gauges("pool", lambda: _pool.stats() if _pool is not None else {})
+metrics_registry.register_gauges("cache", get_cache_stats)
+
+
+# Tags for the user rows embedded in a result (names, departments, interests)
+def _user_tags(id_key):
+    return lambda rows: ["user:%s" % row[id_key] for row in rows]
+
+
+REQUEST_PARTICIPANTS_QUERY = "SELECT student_id, professor_id FROM collaboration_requests WHERE request_id = %s"
+
 
+# Both participants of a collaboration request, for cache invalidation
+def _request_participants(cursor, request_id):
+    cursor.execute(REQUEST_PARTICIPANTS_QUERY, (request_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return []
+    if isinstance(row, dict):
+        row = (row['student_id'], row['professor_id'])
+    return ["collaborations:%s" % user_id for user_id in row]
 
 
+# SQL lives in *_QUERY constants defined above the function that runs them;
+# the asyncio versions in async_db.py and explain_check.py use the same
+# constants. Statements whose text depends on the arguments (keyset pages,
+# IN lists, optional columns) are built by _*_query() helpers returning
+# (query, params), placed the same way.
+
+# Login only fetches the identity columns; the rest of the profile is
+# loaded on demand with get_user_profile()
+LOGIN_QUERY = "SELECT user_id, name, email, role FROM users WHERE email = %s AND password = %s"
+
+
+@instrumented
 def get_user(email, password):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT * FROM users WHERE email = %s AND password = %s"
-    cursor.execute(query, (email, password))
-    user = cursor.fetchone()
-    conn.close()
-    return user
+    with db_session() as cursor:
+        cursor.execute(LOGIN_QUERY, (email, password))
+        return cursor.fetchone()
 
 
+USER_PROFILE_QUERY = """
+    SELECT user_id, department, research_interests, experience_level, photo_hash
+    FROM users WHERE user_id = %s
+"""
 
-def register_user(name, email, password, role):
-    conn = get_db_connection()
-    cursor = conn.cursor()
 
-    # Check if email is already registered
-    cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-    if cursor.fetchone():
-        conn.close()
-        return False  # Email already exists
+# Function to fetch the profile fields of a user (see user_session.get_profile)
+@instrumented
+def get_user_profile(user_id):
+    with db_session() as cursor:
+        cursor.execute(USER_PROFILE_QUERY, (user_id,))
+        return cursor.fetchone()
+
+
+# One statement, race free: users.email is UNIQUE and the no-op update
+# leaves an existing account untouched (rowcount 0)
+REGISTER_USER_QUERY = """
+    INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE email = email
+"""
 
-    query = "INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)"
-    cursor.execute(query, (name, email, password, role))
-    conn.commit()
-    conn.close()
+
+@instrumented
+def register_user(name, email, password, role):
+    with db_session(dictionary=False) as cursor:
+        cursor.execute(REGISTER_USER_QUERY, (name, email, password, role))
+        if cursor.rowcount != 1:
+            return False  # Email already exists
+        user_id = cursor.lastrowid
+    update_partner_index(user_id)
+    refresh_match_scores(user_id)
     return True  # Registration successful
 
 
-# Function to fetch research highlights
-def get_research_highlights():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT rh.title, rh.summary, rh.contributors, rh.date_posted, u.name AS posted_by
+# Keyset pagination helpers. A page cursor is the (timestamp, id) of the last
+# row on the previous page, so every page is one index range read of
+# limit + 1 rows no matter how deep into the feed it is.
+def _keyset_condition(ts_column, id_column, after):
+    if after is None:
+        return "", ()
+    return (f"({ts_column} < %s OR ({ts_column} = %s AND {id_column} < %s))",
+            (after[0], after[0], after[1]))
+
+
+def _keyset_page(rows, limit, ts_key, id_key):
+    # One extra row was fetched to tell whether an older page exists
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1][ts_key], rows[-1][id_key])
+
+
+def _research_highlights_query(limit, after):
+    condition, params = _keyset_condition("rh.date_posted", "rh.highlight_id", after)
+    query = f"""
+        SELECT rh.highlight_id, rh.title, rh.summary, rh.contributors, rh.date_posted, u.name AS posted_by
         FROM research_highlights rh
         JOIN users u ON rh.posted_by = u.user_id
-        ORDER BY rh.date_posted DESC
+        {"WHERE " + condition if condition else ""}
+        ORDER BY rh.date_posted DESC, rh.highlight_id DESC
+        LIMIT %s
     """
-    cursor.execute(query)
-    highlights = cursor.fetchall()
-    conn.close()
-    return highlights
-
+    return query, params + (limit + 1,)
+
+
+# Function to fetch research highlights, newest first, one page at a time.
+# Returns (highlights, next_cursor); next_cursor is None on the last page.
+@instrumented
+@cached(lambda **_: ["highlights"])
+def get_research_highlights(limit=FEED_PAGE_SIZE, after=None):
+    with db_session() as cursor:
+        cursor.execute(*_research_highlights_query(limit, after))
+        rows = cursor.fetchall()
+    return _keyset_page(rows, limit, "date_posted", "highlight_id")
+
+
+# InnoDB full-text defaults: words shorter than innodb_ft_min_token_size and
+# stopwords are not in ft_highlights_text, and requiring one (+word) would
+# match nothing. Short words are searched in the ngram index instead
+# (ft_highlights_ngram, migration 008); stopwords are dropped.
+FT_MIN_TOKEN_SIZE = 3
+FT_STOPWORDS = {
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for", "from", "how",
+    "i", "in", "is", "it", "la", "of", "on", "or", "that", "the", "this", "to", "was", "what",
+    "when", "where", "who", "will", "with", "und", "www",
+}
+
+
+# Turn free text into boolean-mode full-text queries.
+# Every word (each part of a hyphenated one) is required and prefix matched
+# (+word*), "quoted phrases" must appear as-is. Short words and phrases that
+# contain one go to the ngram query, which matches them anywhere in the text
+# ("ml" also finds "html").
+# Returns (word_query, ngram_query, terms); terms is what the UI highlights.
+def parse_search_query(text):
+    word_clauses = []
+    ngram_clauses = []
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', text):
+        if phrase:
+            words = re.findall(r"\w+", phrase)
+            if all(part.lower() in FT_STOPWORDS for part in words):
+                continue
+            short = any(len(part) < FT_MIN_TOKEN_SIZE and part.lower() not in FT_STOPWORDS for part in words)
+            (ngram_clauses if short else word_clauses).append('+"%s"' % " ".join(words))
+            terms.append(" ".join(words))
+            continue
+
+        # Split where the full-text parser would ("real-time" is indexed as
+        # "real" and "time"); this also drops the boolean-mode operators so
+        # user input can't change the query
+        for piece in re.split(r"\W+", word):
+            if not piece or piece.lower() in FT_STOPWORDS:
+                continue
+            (ngram_clauses if len(piece) < FT_MIN_TOKEN_SIZE else word_clauses).append("+%s*" % piece)
+            terms.append(piece)
+    return " ".join(word_clauses), " ".join(ngram_clauses), terms
+
+
+# None when the text has nothing to search for (only stopwords)
+def _search_highlights_query(keyword, limit):
+    word_query, ngram_query, _ = parse_search_query(keyword)
+    matches = []
+    params = []
+    if word_query:
+        matches.append("MATCH (rh.title, rh.summary, rh.contributors) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(word_query)
+    if ngram_query:
+        matches.append("MATCH (rh.search_text) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(ngram_query)
+    if not matches:
+        return None
 
-# Function to search research highlights by keyword
-def search_research_highlights(keyword):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
     query = """
-        SELECT rh.title, rh.summary, rh.contributors, rh.date_posted, u.name AS posted_by
+        SELECT rh.highlight_id, rh.title, rh.summary, rh.contributors, rh.date_posted, u.name AS posted_by,
+               %s AS relevance
         FROM research_highlights rh
         JOIN users u ON rh.posted_by = u.user_id
-        WHERE rh.title LIKE %s OR rh.summary LIKE %s OR rh.contributors LIKE %s
-        ORDER BY rh.date_posted DESC
-    """
-    search_term = f"%{keyword}%"
-    cursor.execute(query, (search_term, search_term, search_term))
-    highlights = cursor.fetchall()
-    conn.close()
-    return highlights
+        WHERE %s
+        ORDER BY relevance DESC, rh.date_posted DESC
+        LIMIT %%s
+    """ % (" + ".join(matches), " AND ".join(matches))
+    return query, tuple(params + params + [limit])
+
+
+# Function to search research highlights by keyword, best matches first
+@instrumented
+def search_research_highlights(keyword, limit=SEARCH_RESULT_LIMIT):
+    query = _search_highlights_query(keyword, limit)
+    if query is None:
+        return []
+    with db_session() as cursor:
+        cursor.execute(*query)
+        return cursor.fetchall()
+
+
+ADD_RESEARCH_HIGHLIGHT_QUERY = """
+    INSERT INTO research_highlights (title, summary, contributors, posted_by) VALUES (%s, %s, %s, %s)
+"""
+
+
+# Function to add a research highlight (admin dashboard)
+@instrumented
+def add_research_highlight(title, summary, contributors, posted_by):
+    with db_session(dictionary=False) as cursor:
+        cursor.execute(ADD_RESEARCH_HIGHLIGHT_QUERY, (title, summary, contributors, posted_by))
+    invalidate_cache("highlights")
+    return True
 
 
-def update_user_profile(user_id, department, research_interests, experience_level=None, photo_data=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+ALL_RESEARCH_HIGHLIGHTS_QUERY = "SELECT * FROM research_highlights ORDER BY date_posted DESC"
 
+
+# Function to list every research highlight (admin dashboard)
+@instrumented
+@cached(lambda **_: ["highlights"])
+def get_all_research_highlights():
+    with db_session() as cursor:
+        cursor.execute(ALL_RESEARCH_HIGHLIGHTS_QUERY)
+        return cursor.fetchall()
+
+
+def _update_profile_query(user_id, department, research_interests, experience_level, photo_hash):
     # Start building the base parameters that are always included
     params = [department, research_interests]
     query = "UPDATE users SET department=%s, research_interests=%s"
@@ -90,100 +523,201 @@ def update_user_profile(user_id, department, research_interests, experience_leve
         query += ", experience_level=%s"
         params.append(experience_level)
 
-    # Add photo_data if provided
-    if photo_data is not None:
-        query += ", profile_photo=%s"
-        params.append(photo_data)
+    # Add the photo if provided; the row only keeps its content hash
+    if photo_hash is not None:
+        query += ", photo_hash=%s"
+        params.append(photo_hash)
 
     # Add the WHERE clause
     query += " WHERE user_id=%s"
     params.append(user_id)
+    return query, tuple(params)
 
-    # Execute the query
-    cursor.execute(query, tuple(params))
 
-    conn.commit()
-    conn.close()
+@instrumented
+def update_user_profile(user_id, department, research_interests, experience_level=None, photo_data=None):
+    store = get_photo_store()
+    photo_hash = content_hash(photo_data) if photo_data is not None else None
+    new_photo = photo_hash is not None and not store.contains(photo_hash)
+    try:
+        with db_session(dictionary=False) as cursor:
+            cursor.execute(*_update_profile_query(user_id, department, research_interests, experience_level, photo_hash))
+            # The image goes to the photo store only once the UPDATE went
+            # through; an unreadable image raises here and rolls it back
+            if photo_data is not None:
+                store.put(photo_data)
+    except BaseException:
+        # Files this call wrote for a row that was never committed
+        if new_photo:
+            store.delete(photo_hash)
+        raise
+    update_partner_index(user_id)
+    invalidate_cache("user:%s" % user_id)
+    refresh_match_scores(user_id)
     return True
 
 
-# Function to send a collaboration request
+# One upsert on the unique (student_id, professor_id) key: a new pair is
+# inserted, a rejected request is renewed, and a pending or accepted one
+# is left alone (rowcount 0). request_date is assigned first so it still
+# sees the old status.
+SEND_REQUEST_QUERY = """
+    INSERT INTO collaboration_requests (student_id, professor_id, status) VALUES (%s, %s, 'pending')
+    ON DUPLICATE KEY UPDATE
+        request_date = IF(status = 'rejected', CURRENT_TIMESTAMP, request_date),
+        status = IF(status = 'rejected', 'pending', status)
+"""
+
 
+# Function to send a collaboration request
+@instrumented
 def send_collaboration_request(student_id, professor_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # Check if a request already exists with any status (pending, accepted, or rejected)
-    cursor.execute(
-        "SELECT * FROM collaboration_requests WHERE student_id = %s AND professor_id = %s",
-        (student_id, professor_id)
-    )
-
-    # Fetching the result to ensure there are no unread results
-    existing_request = cursor.fetchone()
-
-    # After fetching the result, clear the cursor (optional but good practice)
-    cursor.fetchall()
-
-    if existing_request:
-        # If the request is already accepted, prevent sending a new request
-        if existing_request['status'] == 'accepted':
-            conn.close()
-            return False  # Request already accepted, can't send a new one
-        elif existing_request['status'] == 'rejected':
-            # If the request was rejected, allow sending a new request by updating the existing one
-            cursor.execute(
-                "UPDATE collaboration_requests SET status = 'pending' WHERE student_id = %s AND professor_id = %s",
-                (student_id, professor_id)
-            )
-            conn.commit()
-            conn.close()
-            return True  # Request renewed successfully
-        else:
-            # If status is pending, don't create a duplicate
-            conn.close()
-            return False  # Request already pending
-    else:
-        # Insert new request
-        query = "INSERT INTO collaboration_requests (student_id, professor_id, status) VALUES (%s, %s, 'pending')"
-        cursor.execute(query, (student_id, professor_id))
-        conn.commit()
-        conn.close()
-        return True  # Request sent successfully
+    with db_session(dictionary=False) as cursor:
+        cursor.execute(SEND_REQUEST_QUERY, (student_id, professor_id))
+        if cursor.rowcount == 0:
+            return False  # Request already pending or accepted
+
+    invalidate_cache("collaborations:%s" % student_id, "collaborations:%s" % professor_id, "rollups")
+    return True  # Request sent (or renewed) successfully
+
+
+PENDING_REQUESTS_QUERY = """
+    SELECT cr.request_id, u.name AS student_name, u.email, u.research_interests
+    FROM collaboration_requests cr
+    JOIN users u ON cr.student_id = u.user_id
+    WHERE cr.professor_id = %s AND cr.status = 'pending'
+"""
 
 
 # Function to fetch pending requests for a professor
+@instrumented
 def get_pending_requests(professor_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT cr.request_id, u.name AS student_name, u.email, u.research_interests
-        FROM collaboration_requests cr
-        JOIN users u ON cr.student_id = u.user_id
-        WHERE cr.professor_id = %s AND cr.status = 'pending'
+    with db_session() as cursor:
+        cursor.execute(PENDING_REQUESTS_QUERY, (professor_id,))
+        return cursor.fetchall()
+
+
+PENDING_REQUESTS_DETAILED_QUERY = """
+    SELECT r.request_id, u.user_id AS student_id, u.name AS student_name,
+           u.research_interests, u.department, u.experience_level
+    FROM collaboration_requests r
+    JOIN users u ON r.student_id = u.user_id
+    WHERE r.professor_id = %s AND r.status = 'pending'
+"""
+
+
+# Function to fetch pending requests with the student's profile (professor dashboard)
+@instrumented
+@cached(lambda professor_id: ["collaborations:%s" % professor_id], _user_tags("student_id"))
+def get_pending_requests_detailed(professor_id):
+    with db_session() as cursor:
+        cursor.execute(PENDING_REQUESTS_DETAILED_QUERY, (professor_id,))
+        return cursor.fetchall()
+
+
+STUDENT_PENDING_REQUESTS_QUERY = """
+    SELECT cr.request_id, u.name, u.department, u.research_interests, u.user_id AS professor_id
+    FROM collaboration_requests cr
+    JOIN users u ON cr.professor_id = u.user_id
+    WHERE cr.student_id = %s AND cr.status = 'pending'
+"""
+
+
+# Function to fetch a student's own pending requests (student dashboard)
+@instrumented
+@cached(lambda student_id: ["collaborations:%s" % student_id], _user_tags("professor_id"))
+def get_student_pending_requests(student_id):
+    with db_session() as cursor:
+        cursor.execute(STUDENT_PENDING_REQUESTS_QUERY, (student_id,))
+        return cursor.fetchall()
+
+
+# Function to page through a professor's pending requests (professor inbox),
+# best match first (order="score") or newest first (order="date").
+# Requests from students whose scores were never computed sort with score 0.
+INBOX_ORDERS = {
+    "score": ("COALESCE(s.score, 0)", "score"),
+    "date": ("r.request_date", "request_date"),
+}
+
+
+def _request_inbox_query(professor_id, order, limit, after):
+    sort_column, _ = INBOX_ORDERS[order]
+    condition, params = _keyset_condition(sort_column, "r.request_id", after)
+    query = f"""
+        SELECT r.request_id, r.request_date, COALESCE(s.score, 0) AS score,
+               u.user_id AS student_id, u.name AS student_name,
+               u.research_interests, u.department, u.experience_level
+        FROM collaboration_requests r
+        JOIN users u ON r.student_id = u.user_id
+        LEFT JOIN professor_match_scores s ON s.student_id = r.student_id AND s.professor_id = r.professor_id
+        WHERE r.professor_id = %s AND r.status = 'pending' {"AND " + condition if condition else ""}
+        ORDER BY {sort_column} DESC, r.request_id DESC
+        LIMIT %s
     """
-    cursor.execute(query, (professor_id,))
-    requests = cursor.fetchall()
-    conn.close()
-    return requests
+    return query, (professor_id,) + params + (limit + 1,)
+
+
+@instrumented
+@cached(lambda professor_id, **_: ["collaborations:%s" % professor_id] + professor_scores_tags(professor_id),
+        lambda page: ["user:%s" % row['student_id'] for row in page[0]])
+def get_request_inbox(professor_id, order="date", limit=FEED_PAGE_SIZE, after=None):
+    with db_session() as cursor:
+        cursor.execute(*_request_inbox_query(professor_id, order, limit, after))
+        return _keyset_page(cursor.fetchall(), limit, INBOX_ORDERS[order][1], "request_id")
+
+
+def _request_students_query(professor_id, request_ids):
+    placeholders = ", ".join(["%s"] * len(request_ids))
+    return f"""
+        SELECT student_id FROM collaboration_requests
+        WHERE professor_id = %s AND request_id IN ({placeholders})
+    """, [professor_id] + list(request_ids)
+
+
+DECIDE_REQUEST_QUERY = """
+    UPDATE collaboration_requests SET status = %s
+    WHERE request_id = %s AND professor_id = %s AND status = 'pending'
+"""
+
+
+# Function to accept/reject many of a professor's pending requests at once.
+# decisions is a list of (request_id, status); everything is applied in one
+# transaction, and requests that are not this professor's pending ones are
+# skipped. Returns the number of requests updated.
+@instrumented
+def update_request_statuses(professor_id, decisions):
+    decisions = [(status, request_id, professor_id) for request_id, status in decisions]
+    if not decisions:
+        return 0
+
+    with db_session(dictionary=False) as cursor:
+        cursor.execute(*_request_students_query(professor_id, [request_id for _, request_id, _ in decisions]))
+        affected = ["collaborations:%s" % professor_id]
+        affected += ["collaborations:%s" % row[0] for row in cursor.fetchall()]
+
+        cursor.executemany(DECIDE_REQUEST_QUERY, decisions)
+        updated = cursor.rowcount
+    if updated:
+        affected.append("rollups")
+    invalidate_cache(*affected)
+    return updated
+
+
+UPDATE_REQUEST_STATUS_QUERY = "UPDATE collaboration_requests SET status = %s WHERE request_id = %s"
 
 
 # Function to update request status (accept/reject)
+@instrumented
 def update_request_status(request_id, status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = "UPDATE collaboration_requests SET status = %s WHERE request_id = %s"
-    cursor.execute(query, (status, request_id))
-    conn.commit()
-    conn.close()
+    with db_session(dictionary=False) as cursor:
+        affected = _request_participants(cursor, request_id)
+        cursor.execute(UPDATE_REQUEST_STATUS_QUERY, (status, request_id))
+    invalidate_cache(*affected, "rollups")
     return True
 
 
-# Function to get active collaborations for a user
-def get_active_collaborations(user_id, role):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
+def _active_collaborations_query(user_id, role):
     if role == "student":
         query = """
             SELECT cr.request_id, u.name, u.department, u.research_interests, u.user_id as professor_id
@@ -198,194 +732,684 @@ def get_active_collaborations(user_id, role):
             JOIN users u ON cr.student_id = u.user_id
             WHERE cr.professor_id = %s AND cr.status = 'accepted'
         """
+    return query, (user_id,)
+
+
+# Function to get active collaborations for a user
+@instrumented
+@cached(lambda user_id, role: ["collaborations:%s" % user_id],
+        lambda rows: ["user:%s" % row.get('professor_id', row.get('student_id')) for row in rows])
+def get_active_collaborations(user_id, role):
+    with db_session() as cursor:
+        cursor.execute(*_active_collaborations_query(user_id, role))
+        return cursor.fetchall()
+
+
+# Rows of one result set from callproc() as dicts; depending on the connector
+# version, stored_results() ignores the cursor's dictionary=True
+def _result_rows(result):
+    return [row if isinstance(row, dict) else dict(zip(result.column_names, row)) for row in result.fetchall()]
+
+
+def _snapshot_user_tags(snapshot):
+    return ["user:%s" % row['professor_id' if row['student_id'] == snapshot['user_id'] else 'student_id']
+            for rows in snapshot['requests'].values() for row in rows]
+
+
+# Function to load a dashboard's collaborations and projects in one round trip
+# (the dashboard_snapshot procedure, see migrations/005_dashboard_snapshot.sql).
+# Returns {"requests": {status: rows}, "projects": rows, "counts": {...}}.
+@instrumented
+@cached(lambda user_id, role: ["collaborations:%s" % user_id, "projects:%s" % user_id], _snapshot_user_tags)
+def get_dashboard_snapshot(user_id, role):
+    with db_session() as cursor:
+        cursor.callproc("dashboard_snapshot", (user_id, role))
+        requests, projects = [_result_rows(result) for result in cursor.stored_results()]
+    return _dashboard_snapshot(user_id, requests, projects)
+
+
+def _dashboard_snapshot(user_id, requests, projects):
+    grouped = {"pending": [], "accepted": [], "rejected": []}
+    for row in requests:
+        grouped.setdefault(row['status'], []).append(row)
+
+    counts = {status: len(rows) for status, rows in grouped.items()}
+    counts["projects"] = len(projects)
+    return {"user_id": user_id, "requests": grouped, "projects": projects, "counts": counts}
+
 
-    cursor.execute(query, (user_id,))
-    collaborations = cursor.fetchall()
-    conn.close()
-    return collaborations
+DELETE_COLLABORATION_QUERY = "DELETE FROM collaboration_requests WHERE request_id = %s"
 
 
 # Function to delete a collaboration
+@instrumented
 def delete_collaboration(request_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = "DELETE FROM collaboration_requests WHERE request_id = %s"
-    cursor.execute(query, (request_id,))
-    conn.commit()
-    conn.close()
+    with db_session(dictionary=False) as cursor:
+        affected = _request_participants(cursor, request_id)
+        cursor.execute(DELETE_COLLABORATION_QUERY, (request_id,))
+    invalidate_cache(*affected, "rollups")
     return True
 
 
-# Function to get all forum posts
-def get_forum_posts():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT p.post_id, p.title, p.content, p.category, p.created_at, 
-               u.name AS author_name, u.role AS author_role
-        FROM forum_posts p
-        JOIN users u ON p.author_id = u.user_id
-        ORDER BY p.created_at DESC
-    """
-    cursor.execute(query)
-    posts = cursor.fetchall()
-    conn.close()
-    return posts
+# Only what the results list shows; SELECT * also shipped passwords and photos
+SEARCH_PROFESSORS_QUERY = """
+    SELECT user_id, name, department, research_interests
+    FROM users
+    WHERE role = 'professor' AND (name LIKE %s OR research_interests LIKE %s)
+"""
 
 
-# Function to get forum posts by category
-def get_forum_posts_by_category(category):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
+# Function to search professors by name or research field (student dashboard)
+@instrumented
+def search_professors(search_query):
+    with db_session() as cursor:
+        cursor.execute(SEARCH_PROFESSORS_QUERY, ('%' + search_query + '%', '%' + search_query + '%'))
+        return cursor.fetchall()
+
+
+ACTIVE_COLLABORATION_QUERY = """
+    SELECT * FROM collaboration_requests WHERE student_id = %s AND professor_id = %s AND status = 'accepted'
+"""
+
+
+# Function to check for an accepted collaboration between a student and a professor
+@instrumented
+def has_active_collaboration(student_id, professor_id):
+    with db_session() as cursor:
+        cursor.execute(ACTIVE_COLLABORATION_QUERY, (student_id, professor_id))
+        return cursor.fetchone() is not None
+
+
+# Function to fetch a student's request status ('pending', 'accepted' or
+# 'rejected') for a whole list of professors in one query.
+# Professors the student never contacted are left out of the result.
+REQUEST_STATUS_PRIORITY = {"accepted": 3, "pending": 2, "rejected": 1}
+
+
+def _collaboration_statuses_query(student_id, professor_ids):
+    placeholders = ", ".join(["%s"] * len(professor_ids))
+    return f"""
+        SELECT professor_id, status FROM collaboration_requests
+        WHERE student_id = %s AND professor_id IN ({placeholders})
+    """, [student_id] + professor_ids
+
+
+@instrumented
+def get_collaboration_statuses(student_id, professor_ids):
+    professor_ids = list(dict.fromkeys(professor_ids))
+    if not professor_ids:
+        return {}
+
+    with db_session() as cursor:
+        cursor.execute(*_collaboration_statuses_query(student_id, professor_ids))
+        return _collaboration_statuses(cursor.fetchall())
+
+
+def _collaboration_statuses(rows):
+    statuses = {}
+    for row in rows:
+        # Older data can hold several requests per pair; the most advanced one wins
+        current = statuses.get(row['professor_id'])
+        if current is None or REQUEST_STATUS_PRIORITY.get(row['status'], 0) > REQUEST_STATUS_PRIORITY.get(current, 0):
+            statuses[row['professor_id']] = row['status']
+    return statuses
+
+
+UNREQUESTED_STUDENTS_QUERY = """
+    SELECT u.user_id, u.name, u.department, u.research_interests, u.experience_level
+    FROM users u
+    LEFT JOIN collaboration_requests cr ON cr.student_id = u.user_id AND cr.professor_id = %s
+    WHERE u.role = 'student' AND u.research_interests LIKE %s AND cr.request_id IS NULL
+    ORDER BY u.name
+"""
+
+
+# Function to find students matching an interest who haven't contacted the professor yet
+@instrumented
+def search_unrequested_students(professor_id, search_term):
+    with db_session() as cursor:
+        cursor.execute(UNREQUESTED_STUDENTS_QUERY, (professor_id, f'%{search_term}%'))
+        return cursor.fetchall()
+
+
+# Forum posts newest first, optionally of one category (None for all)
+def _forum_posts_query(category, limit, after):
+    condition, params = _keyset_condition("p.created_at", "p.post_id", after)
+    conditions = [condition] if condition else []
+    if category is not None:
+        conditions.insert(0, "p.category = %s")
+        params = (category,) + params
+    query = f"""
         SELECT p.post_id, p.title, p.content, p.category, p.created_at, 
                u.name AS author_name, u.role AS author_role
         FROM forum_posts p
         JOIN users u ON p.author_id = u.user_id
-        WHERE p.category = %s
-        ORDER BY p.created_at DESC
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY p.created_at DESC, p.post_id DESC
+        LIMIT %s
     """
-    cursor.execute(query, (category,))
-    posts = cursor.fetchall()
-    conn.close()
-    return posts
+    return query, params + (limit + 1,)
+
+
+# Function to get forum posts, newest first, one page at a time.
+# Returns (posts, next_cursor); next_cursor is None on the last page.
+@instrumented
+@cached(lambda **_: ["forum"])
+def get_forum_posts(limit=FEED_PAGE_SIZE, after=None):
+    with db_session() as cursor:
+        cursor.execute(*_forum_posts_query(None, limit, after))
+        rows = cursor.fetchall()
+    return _keyset_page(rows, limit, "created_at", "post_id")
+
+
+# Function to get forum posts by category, paginated like get_forum_posts
+@instrumented
+@cached(lambda category, **_: ["forum:%s" % category])
+def get_forum_posts_by_category(category, limit=FEED_PAGE_SIZE, after=None):
+    with db_session() as cursor:
+        cursor.execute(*_forum_posts_query(category, limit, after))
+        rows = cursor.fetchall()
+    return _keyset_page(rows, limit, "created_at", "post_id")
+
+
+CREATE_FORUM_POST_QUERY = "INSERT INTO forum_posts (title, content, author_id, category) VALUES (%s, %s, %s, %s)"
+# One post as the feed shows it
+FORUM_POST_QUERY = """
+    SELECT p.post_id, p.title, p.content, p.category, p.created_at,
+           u.name AS author_name, u.role AS author_role
+    FROM forum_posts p
+    JOIN users u ON p.author_id = u.user_id
+    WHERE p.post_id = %s
+"""
 
 
 # Function to create a new forum post
+# and announce it to open forum sessions (see forum_live.py)
+@instrumented
 def create_forum_post(title, content, author_id, category):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = "INSERT INTO forum_posts (title, content, author_id, category) VALUES (%s, %s, %s, %s)"
-    cursor.execute(query, (title, content, author_id, category))
-    conn.commit()
-    conn.close()
+    with db_session() as cursor:
+        cursor.execute(CREATE_FORUM_POST_QUERY, (title, content, author_id, category))
+        cursor.execute(FORUM_POST_QUERY, (cursor.lastrowid,))
+        post = cursor.fetchone()
+    invalidate_cache("forum", "forum:%s" % category, "rollups")
+    if post is not None:
+        live_feed.publish(post)
     return True
 
 
+PROFESSORS_QUERY = """
+    SELECT user_id, name, department, research_interests
+    FROM users
+    WHERE role = 'professor' AND research_interests IS NOT NULL
+    ORDER BY user_id
+"""
+
+
 # Function to recommend professors based on student interests
+@instrumented
 def recommend_professors(student_interests):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT user_id, name, department, research_interests
-        FROM users
-        WHERE role = 'professor' AND research_interests IS NOT NULL
-        ORDER BY user_id
-    """
-    cursor.execute(query)
-    professors = cursor.fetchall()
-    conn.close()
+    with db_session() as cursor:
+        cursor.execute(PROFESSORS_QUERY)
+        professors = cursor.fetchall()
+    return _recommend_professors(professors, student_interests)
 
-    # Simple recommendation system based on keyword matching
+
+def _recommend_professors(professors, student_interests):
+    # Simple recommendation system based on keyword matching: a student keyword
+    # matches when it is a substring of one of the professor's keywords.
+    # The student's keywords are compiled once and each professor's interests
+    # are scanned in a single pass.
     recommendations = []
-    interests_lower = student_interests.lower()
+    matcher = KeywordMatcher(split_keywords(student_interests))
 
     for prof in professors:
         # Calculate a simple compatibility score based on keyword matching
         if prof['research_interests']:
-            prof_interests_lower = prof['research_interests'].lower()
-            interests_keywords = [keyword.strip() for keyword in interests_lower.split(',')]
-            prof_keywords = [keyword.strip() for keyword in prof_interests_lower.split(',')]
-
-            # Count matching keywords
-            matches = sum(1 for keyword in interests_keywords if any(keyword in prof_kw for prof_kw in prof_keywords))
+            matches = matcher.count_matches(join_keywords(split_keywords(prof['research_interests'])))
             if matches > 0:
                 # Calculate a simple score from 0-100
-                score = min(int((matches / len(interests_keywords)) * 100), 100)
-                prof['compatibility'] = score
-                recommendations.append(prof)
+                score = min(int((matches / matcher.total) * 100), 100)
+                recommendations.append(dict(prof, compatibility=score))
 
     # Sort by compatibility score
     recommendations.sort(key=lambda x: x['compatibility'], reverse=True)
     return recommendations
 
 
-# Function to find potential student research partners
-def find_research_partners(student_id, department, interests):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT user_id, name, department, research_interests, experience_level
-        FROM users
-        WHERE role = 'student' AND user_id != %s AND research_interests IS NOT NULL
-        ORDER BY user_id
-    """
-    cursor.execute(query, (student_id,))
-    students = cursor.fetchall()
-    conn.close()
-
-    # Simple matching system based on interests and department
-    partners = []
-    interests_lower = interests.lower()
-
-    for student in students:
-        if student['research_interests']:
-            student_interests_lower = student['research_interests'].lower()
-
-            # Calculate match score (department match + interests overlap)
-            dept_match = 30 if student['department'] == department else 0
-
-            # Calculate interests overlap
-            interests_keywords = [keyword.strip() for keyword in interests_lower.split(',')]
-            student_keywords = [keyword.strip() for keyword in student_interests_lower.split(',')]
-
-            # Count matching keywords
-            matches = sum(
-                1 for keyword in interests_keywords if any(keyword in student_kw for student_kw in student_keywords))
-            interest_score = min(int((matches / max(len(interests_keywords), 1)) * 70), 70)
+PARTNER_INDEX_QUERY = """
+    SELECT user_id, name, department, research_interests, experience_level
+    FROM users
+    WHERE role = 'student' AND research_interests IS NOT NULL
+    ORDER BY user_id
+"""
+# One student's entry; no row when the user is not a student
+PARTNER_INDEX_ENTRY_QUERY = """
+    SELECT user_id, name, department, research_interests, experience_level
+    FROM users
+    WHERE user_id = %s AND role = 'student'
+"""
+
+
+# Process-wide index of every student's interests, shared by all sessions
+@instrumented
+def get_partner_index():
+    global _partner_index, _partner_index_built
+    with _partner_index_lock:
+        if _partner_index is None or time.monotonic() - _partner_index_built > PARTNER_INDEX_TTL:
+            with db_session() as cursor:
+                cursor.execute(PARTNER_INDEX_QUERY)
+                students = cursor.fetchall()
+            _partner_index = PartnerIndex(students)
+            _partner_index_built = time.monotonic()
+        return _partner_index
+
+
+# Bring one user's partner index entry (in every app process) up to date
+# after a profile change, without rebuilding the index
+def update_partner_index(user_id):
+    _update_partner_index(user_id)
+    cache_sync.broadcast(["%s:%s" % (PARTNER_INDEX_TAG, user_id)])
+
+
+def _update_partner_index(user_id):
+    global _partner_index
+    with _partner_index_lock:
+        if _partner_index is None:
+            return  # Built with the change on next use
+        with db_session() as cursor:
+            cursor.execute(PARTNER_INDEX_ENTRY_QUERY, (user_id,))
+            student = cursor.fetchone()
+        # Sessions scoring with the old index keep it; the swap is atomic
+        _partner_index = _partner_index.updated(user_id, student)
+
+
+# Drop the partner index (in every app process) so the next search sees bulk changes
+def invalidate_partner_index():
+    _drop_partner_index()
+    cache_sync.broadcast([PARTNER_INDEX_TAG])
+
+
+def _drop_partner_index():
+    global _partner_index
+    with _partner_index_lock:
+        _partner_index = None
 
-            total_score = dept_match + interest_score
-            if total_score > 0:
-                student['compatibility'] = total_score
-                partners.append(student)
 
-    # Sort by compatibility score
-    partners.sort(key=lambda x: x['compatibility'], reverse=True)
-    return partners
+# Function to find potential student research partners
+# Match score = 30 for the same department + up to 70 for overlapping interests,
+# computed for every student at once by the vectorized PartnerIndex.
+@instrumented
+def find_research_partners(student_id, department, interests, limit=None):
+    return get_partner_index().score(student_id, department, interests, limit=limit)
+
+
+# Precomputed match scores.
+# professor_match_scores and partner_match_scores hold what recommend_professors
+# and find_research_partners would return, so the dashboards read their top rows
+# with one indexed query. A profile change only rewrites the changed user's own
+# lists and the pairs that involve them, and only where a score changed. Other
+# students' partner lists are not re-ranked here: a list the user leaves isn't
+# refilled and one they join isn't trimmed, so the periodic
+# rebuild_match_scores() (match_scores.py) brings them back to exactly
+# PARTNER_SCORES_KEEP rows. Only the cache tags of the students and professors
+# whose pairs changed are invalidated.
+MATCH_SCORE_USER_QUERY = "SELECT user_id, role, department, research_interests FROM users WHERE user_id = %s"
+MATCH_SCORES_COMPUTED_QUERY = """
+    INSERT INTO match_score_state (student_id) VALUES (%s) ON DUPLICATE KEY UPDATE computed_at = NOW()
+"""
+# One user's pairs in a score table, {table}/{user_column}/{other_column}
+# filled in by _read_pairs() and _write_pairs()
+PAIRS_QUERY = "SELECT {other_column}, score FROM {table} WHERE {user_column} = %s"
+DELETE_PAIR_QUERY = "DELETE FROM {table} WHERE {user_column} = %s AND {other_column} = %s"
+UPSERT_PAIR_QUERY = """
+    INSERT INTO {table} ({user_column}, {other_column}, score) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE score = VALUES(score)
+"""
+
+
+@instrumented
+def refresh_match_scores(user_id, reverse=True):
+    with db_session() as cursor:
+        cursor.execute(MATCH_SCORE_USER_QUERY, (user_id,))
+        user = cursor.fetchone()
+    if not user or user['role'] == 'admin':
+        return
+
+    index = get_partner_index()
+    interests = user['research_interests']
+
+    if user['role'] == 'professor':
+        # The professor's pair in every student's recommendation list
+        scores = dict(index.reverse_professor_scores(interests))
+        pairs = ("professor_match_scores", "professor_id", "student_id")
+        with db_session(dictionary=False) as cursor:
+            changed = _write_pairs(cursor, *pairs, user_id, _read_pairs(cursor, *pairs, user_id), scores)
+        _invalidate_match_scores(changed, [user_id] if changed else ())
+        return
+
+    # The student's own lists...
+    professor_scores = {}
+    partner_scores = {}
+    if interests:
+        professor_scores = {prof['user_id']: prof['compatibility'] for prof in recommend_professors(interests)}
+        partner_scores = {partner['user_id']: partner['compatibility']
+                          for partner in index.score(user_id, user['department'], interests,
+                                                     limit=PARTNER_SCORES_KEEP)}
+    # ...and the student's pair in the partner lists of the others
+    reverse_scores = dict(index.reverse_partner_scores(user_id, user['department'], interests)) if reverse else {}
+
+    own_professors = ("professor_match_scores", "student_id", "professor_id")
+    own_partners = ("partner_match_scores", "student_id", "partner_id")
+    listed_as_partner = ("partner_match_scores", "partner_id", "student_id")
+    with db_session(dictionary=False) as cursor:
+        changed_professors = _write_pairs(cursor, *own_professors, user_id,
+                                          _read_pairs(cursor, *own_professors, user_id), professor_scores)
+        changed_students = {user_id} if changed_professors else set()
+        if _write_pairs(cursor, *own_partners, user_id, _read_pairs(cursor, *own_partners, user_id), partner_scores):
+            changed_students.add(user_id)
+
+        if reverse:
+            listed = _read_pairs(cursor, *listed_as_partner, user_id)
+            joining = _joining_partner_lists(
+                cursor, {student_id: score for student_id, score in reverse_scores.items() if student_id not in listed})
+            changed_students |= _write_pairs(cursor, *listed_as_partner, user_id, listed,
+                                             {student_id: score for student_id, score in reverse_scores.items()
+                                              if student_id in listed or student_id in joining})
+
+        cursor.execute(MATCH_SCORES_COMPUTED_QUERY, (user_id,))
+    _invalidate_match_scores(changed_students, changed_professors)
+
+
+# Drop the cached reads of the students and professors whose stored scores changed
+def _invalidate_match_scores(student_ids, professor_ids=()):
+    tags = [match_scores_tag(student_id) for student_id in student_ids]
+    tags += [professor_scores_tag(professor_id) for professor_id in professor_ids]
+    if tags:
+        invalidate_cache(*tags)
+
+
+# One user's pairs in a score table as {other user: score}
+def _read_pairs(cursor, table, user_column, other_column, user_id):
+    cursor.execute(PAIRS_QUERY.format(table=table, user_column=user_column, other_column=other_column),
+                   (user_id,))
+    return dict(cursor.fetchall())
+
+
+# Bring one user's pairs in a score table from ``old`` to ``new`` (both
+# {other user: score}), writing only the pairs whose score changed.
+# Returns the other users of those pairs.
+def _write_pairs(cursor, table, user_column, other_column, user_id, old, new):
+    columns = {"table": table, "user_column": user_column, "other_column": other_column}
+    changed = {other for other in old.keys() | new.keys() if old.get(other) != new.get(other)}
+    removed = [(user_id, other) for other in changed if other not in new]
+    upserts = [(user_id, other, new[other]) for other in changed if other in new]
+    if removed:
+        cursor.executemany(DELETE_PAIR_QUERY.format(**columns), removed)
+    if upserts:
+        cursor.executemany(UPSERT_PAIR_QUERY.format(**columns), upserts)
+    return changed
+
+
+def _partner_list_sizes_query(student_ids):
+    placeholders = ", ".join(["%s"] * len(student_ids))
+    return f"""
+        SELECT student_id, COUNT(*), MIN(score) FROM partner_match_scores
+        WHERE student_id IN ({placeholders}) GROUP BY student_id
+    """, list(student_ids)
+
+
+# The students of ``candidates`` ({student_id: the user's score in their
+# list}) whose partner list the user enters: lists still short of
+# PARTNER_SCORES_KEEP rows, or whose lowest score is below the user's
+def _joining_partner_lists(cursor, candidates):
+    joining = set(candidates)
+    student_ids = list(candidates)
+    for start in range(0, len(student_ids), MATCH_SCORES_CHUNK):
+        cursor.execute(*_partner_list_sizes_query(student_ids[start:start + MATCH_SCORES_CHUNK]))
+        for student_id, kept, lowest in cursor.fetchall():
+            if kept >= PARTNER_SCORES_KEEP and candidates[student_id] <= lowest:
+                joining.discard(student_id)
+    return joining
+
+
+MATCH_SCORE_STATE_QUERY = "SELECT 1 FROM match_score_state WHERE student_id = %s"
+
+
+# Compute a student's own lists the first time they are needed
+def _ensure_match_scores(student_id):
+    with db_session() as cursor:
+        cursor.execute(MATCH_SCORE_STATE_QUERY, (student_id,))
+        computed = cursor.fetchone() is not None
+    if not computed:
+        refresh_match_scores(student_id, reverse=False)
+
+
+STUDENTS_QUERY = "SELECT user_id, department, research_interests FROM users WHERE role = 'student' ORDER BY user_id"
+CLEAR_PROFESSOR_SCORES_QUERY = "DELETE FROM professor_match_scores WHERE student_id = %s"
+CLEAR_PARTNER_SCORES_QUERY = "DELETE FROM partner_match_scores WHERE student_id = %s"
+INSERT_PROFESSOR_SCORE_QUERY = "INSERT INTO professor_match_scores (student_id, professor_id, score) VALUES (%s, %s, %s)"
+INSERT_PARTNER_SCORE_QUERY = "INSERT INTO partner_match_scores (student_id, partner_id, score) VALUES (%s, %s, %s)"
+
+
+# Recompute every student's lists (initial load or after a bulk change).
+# Professors and the partner index are loaded once and the lists computed in
+# memory, then written MATCH_SCORES_CHUNK students per transaction.
+@instrumented
+def rebuild_match_scores():
+    invalidate_partner_index()
+    index = get_partner_index()
+    with db_session() as cursor:
+        cursor.execute(PROFESSORS_QUERY)
+        professors = cursor.fetchall()
+        cursor.execute(STUDENTS_QUERY)
+        students = cursor.fetchall()
+
+    for start in range(0, len(students), MATCH_SCORES_CHUNK):
+        chunk = students[start:start + MATCH_SCORES_CHUNK]
+        student_ids = [(student['user_id'],) for student in chunk]
+        professor_rows = []
+        partner_rows = []
+        for student in chunk:
+            user_id, interests = student['user_id'], student['research_interests']
+            if not interests:
+                continue
+            professor_rows.extend((user_id, prof['user_id'], prof['compatibility'])
+                                  for prof in _recommend_professors(professors, interests))
+            partner_rows.extend((user_id, partner['user_id'], partner['compatibility'])
+                                for partner in index.score(user_id, student['department'], interests,
+                                                           limit=PARTNER_SCORES_KEEP))
+
+        with db_session(dictionary=False) as cursor:
+            cursor.executemany(CLEAR_PROFESSOR_SCORES_QUERY, student_ids)
+            cursor.executemany(CLEAR_PARTNER_SCORES_QUERY, student_ids)
+            if professor_rows:
+                cursor.executemany(INSERT_PROFESSOR_SCORE_QUERY, professor_rows)
+            if partner_rows:
+                cursor.executemany(INSERT_PARTNER_SCORE_QUERY, partner_rows)
+            cursor.executemany(MATCH_SCORES_COMPUTED_QUERY, student_ids)
+    invalidate_cache(MATCH_SCORES_TAG)
+    return len(students)
+
+
+# Activity rollups (migration 007). Triggers keep them current; this
+# recomputes them from the base tables to correct drift from cascaded deletes
+# and department changes. Run it periodically with rollups.py.
+REBUILD_ROLLUP_QUERIES = [
+    "DELETE FROM request_daily_rollup",
+    """
+    INSERT INTO request_daily_rollup (day, status, department, requests)
+    SELECT DATE(cr.request_date), cr.status, COALESCE(u.department, ''), COUNT(*)
+    FROM collaboration_requests cr
+    LEFT JOIN users u ON u.user_id = cr.professor_id
+    GROUP BY DATE(cr.request_date), cr.status, COALESCE(u.department, '')
+    """,
+    "DELETE FROM post_daily_rollup",
+    """
+    INSERT INTO post_daily_rollup (day, category, posts)
+    SELECT DATE(created_at), COALESCE(category, ''), COUNT(*)
+    FROM forum_posts
+    GROUP BY DATE(created_at), COALESCE(category, '')
+    """,
+    # Writes count as activity on the day they were made
+    """
+    INSERT IGNORE INTO user_daily_activity (day, user_id)
+    SELECT DISTINCT DATE(created_at), author_id FROM forum_posts WHERE author_id IS NOT NULL
+    """,
+    """
+    INSERT IGNORE INTO user_daily_activity (day, user_id)
+    SELECT DISTINCT DATE(request_date), student_id FROM collaboration_requests WHERE student_id IS NOT NULL
+    """,
+    "DELETE FROM active_users_rollup",
+    """
+    INSERT INTO active_users_rollup (day, users)
+    SELECT day, COUNT(*) FROM user_daily_activity GROUP BY day
+    """,
+]
+
+
+@instrumented
+def rebuild_rollups():
+    with db_session(dictionary=False) as cursor:
+        for query in REBUILD_ROLLUP_QUERIES:
+            cursor.execute(query)
+    invalidate_cache("rollups")
+
+
+RECORD_ACTIVITY_QUERY = "INSERT IGNORE INTO user_daily_activity (day, user_id) VALUES (CURRENT_DATE, %s)"
+
+
+# Count the user as active today (called on login; writes are counted by triggers)
+@instrumented
+def record_user_activity(user_id):
+    with db_session(dictionary=False) as cursor:
+        cursor.execute(RECORD_ACTIVITY_QUERY, (user_id,))
+        counted = cursor.rowcount == 1
+    # Only the first login of the day changes active_users_rollup
+    if counted:
+        invalidate_cache("rollups")
+
+
+# Function to read the admin dashboard's activity charts: primary key range
+# reads of the last ``days`` days, however large the base tables are.
+# Every write that fires a rollup trigger invalidates "rollups".
+ACTIVITY_ROLLUP_QUERIES = {
+    "requests": """
+        SELECT day, status, department, requests FROM request_daily_rollup
+        WHERE day >= CURRENT_DATE - INTERVAL %s DAY ORDER BY day
+    """,
+    "posts": """
+        SELECT day, category, posts FROM post_daily_rollup
+        WHERE day >= CURRENT_DATE - INTERVAL %s DAY ORDER BY day
+    """,
+    "active_users": """
+        SELECT day, users FROM active_users_rollup
+        WHERE day >= CURRENT_DATE - INTERVAL %s DAY ORDER BY day
+    """,
+}
+
+
+@instrumented
+@cached(lambda **_: ["rollups"])
+def get_activity_rollups(days=30):
+    rollups = {}
+    with db_session() as cursor:
+        for name, query in ACTIVITY_ROLLUP_QUERIES.items():
+            cursor.execute(query, (days,))
+            rollups[name] = cursor.fetchall()
+    return rollups
+
+
+TOP_PROFESSOR_MATCHES_QUERY = """
+    SELECT u.user_id, u.name, u.department, u.research_interests, s.score AS compatibility
+    FROM professor_match_scores s
+    JOIN users u ON s.professor_id = u.user_id
+    WHERE s.student_id = %s
+    ORDER BY s.score DESC, s.professor_id
+    LIMIT %s
+"""
+
+
+# Function to read a student's best professor matches from the score table
+@instrumented
+def get_top_professor_matches(student_id, limit=MATCH_SCORES_TOP_N):
+    _ensure_match_scores(student_id)
+    with db_session() as cursor:
+        cursor.execute(TOP_PROFESSOR_MATCHES_QUERY, (student_id, limit))
+        return cursor.fetchall()
+
+
+TOP_PARTNER_MATCHES_QUERY = """
+    SELECT u.user_id, u.name, u.department, u.research_interests, u.experience_level,
+           s.score AS compatibility
+    FROM partner_match_scores s
+    JOIN users u ON s.partner_id = u.user_id
+    WHERE s.student_id = %s
+    ORDER BY s.score DESC, s.partner_id
+    LIMIT %s
+"""
+
+
+# Function to read a student's best research partners from the score table
+@instrumented
+def get_top_partner_matches(student_id, limit=MATCH_SCORES_TOP_N):
+    _ensure_match_scores(student_id)
+    with db_session() as cursor:
+        cursor.execute(TOP_PARTNER_MATCHES_QUERY, (student_id, limit))
+        return cursor.fetchall()
+
+
+USER_PROJECTS_QUERY = "SELECT * FROM projects WHERE owner_id = %s"
 
 
 # Function to get projects by user (user_id)
+@instrumented
+@cached(lambda user_id: ["projects:%s" % user_id])
 def get_user_projects(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT * FROM projects WHERE owner_id = %s"
-    cursor.execute(query, (user_id,))
-    projects = cursor.fetchall()
-    conn.close()
-    return projects
+    with db_session() as cursor:
+        cursor.execute(USER_PROJECTS_QUERY, (user_id,))
+        return cursor.fetchall()
+
+
+ADD_PROJECT_QUERY = "INSERT INTO projects (title, description, status, owner_id) VALUES (%s, %s, %s, %s)"
 
 
 # Function to add a new project
+@instrumented
 def add_new_project(title, description, status, owner_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = "INSERT INTO projects (title, description, status, owner_id) VALUES (%s, %s, %s, %s)"
-    cursor.execute(query, (title, description, status, owner_id))
-    conn.commit()
-    conn.close()
+    with db_session(dictionary=False) as cursor:
+        cursor.execute(ADD_PROJECT_QUERY, (title, description, status, owner_id))
+    invalidate_cache("projects:%s" % owner_id)
     return True
 
 
+PROJECT_OWNER_QUERY = "SELECT owner_id FROM projects WHERE project_id = %s"
+UPDATE_PROJECT_QUERY = "UPDATE projects SET title = %s, description = %s, status = %s WHERE project_id = %s"
+
+
 # Function to update a project
+@instrumented
 def update_project(project_id, title, description, status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = "UPDATE projects SET title = %s, description = %s, status = %s WHERE project_id = %s"
-    cursor.execute(query, (title, description, status, project_id))
-    conn.commit()
-    conn.close()
+    with db_session(dictionary=False) as cursor:
+        cursor.execute(PROJECT_OWNER_QUERY, (project_id,))
+        owner = cursor.fetchone()
+        cursor.execute(UPDATE_PROJECT_QUERY, (title, description, status, project_id))
+    affected = ["project:%s" % project_id]
+    if owner:
+        affected.append("projects:%s" % owner[0])
+    invalidate_cache(*affected)
     return True
 
 
+PROJECT_BY_ID_QUERY = "SELECT * FROM projects WHERE project_id = %s"
+
+
 # Function to get a specific project by ID
+@instrumented
+@cached(lambda project_id: ["project:%s" % project_id])
 def get_project_by_id(project_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT * FROM projects WHERE project_id = %s"
-    cursor.execute(query, (project_id,))
-    project = cursor.fetchone()
-    conn.close()
-    return project
+    with db_session() as cursor:
+        cursor.execute(PROJECT_BY_ID_QUERY, (project_id,))
+        return cursor.fetchone()
 
 
 
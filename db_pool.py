@@ -0,0 +1,290 @@
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+
+import mysql.connector
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(mysql.connector.errors.PoolError):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """Thin proxy around a mysql.connector connection.
+
+    close() hands the connection back to the pool instead of tearing it down,
+    so existing ``conn = get_db_connection() ... conn.close()`` code keeps working.
+    """
+
+    def __init__(self, pool, raw, created_at, acquired_by=None):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._closed = False
+        self.acquired_at = time.monotonic()
+        self.acquired_by = acquired_by or "unknown"
+        self.acquired_thread = threading.current_thread().name
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._release(self, self._raw, self._created_at)
+
+    def discard(self):
+        # Drop a connection that is known to be broken instead of reusing it
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._discard(self, self._raw)
+
+    def __del__(self):
+        # Garbage collected without close(): report the leak and reclaim the slot
+        if not getattr(self, "_closed", True):
+            self._pool._leaked(self)
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Process-wide, thread-safe pool of MySQL connections.
+
+    Idle connections are validated with a ping when they have been idle longer
+    than ``validate_idle`` seconds and are recycled once they are older than
+    ``max_lifetime`` seconds. Wait time and saturation counters are available
+    through stats().
+    """
+
+    def __init__(self, db_config, min_size=2, max_size=10, max_lifetime=1800,
+                 validate_idle=5, checkout_timeout=10, long_held=30):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: min_size=%s max_size=%s" % (min_size, max_size))
+
+        self.db_config = dict(db_config)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.validate_idle = validate_idle
+        self.checkout_timeout = checkout_timeout
+        self.long_held = long_held
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (raw connection, created_at, last_used)
+        self._size = 0  # open connections, idle + checked out
+        self._in_use = 0
+        # Weak so an unclosed connection can still be garbage collected and reported
+        self._checked_out = weakref.WeakValueDictionary()
+
+        self._stats = {
+            "checkouts": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "validation_failures": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "saturated": 0,
+            "timeouts": 0,
+            "peak_in_use": 0,
+            "leaked": 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append(self._open())
+
+    def _open(self):
+        raw = mysql.connector.connect(**self.db_config)
+        now = time.monotonic()
+        self._size += 1
+        self._stats["connections_created"] += 1
+        return raw, now, now
+
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except mysql.connector.Error:
+            pass
+
+    # Called without the lock held: a ping is a round trip
+    def _is_usable(self, raw, created_at, last_used, now):
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            with self._lock:
+                self._stats["connections_recycled"] += 1
+            return False
+        if now - last_used > self.validate_idle:
+            try:
+                raw.ping(reconnect=False)
+            except mysql.connector.Error:
+                with self._lock:
+                    self._stats["validation_failures"] += 1
+                return False
+        return True
+
+    def get_connection(self, acquired_by=None):
+        started = time.monotonic()
+        waited = False
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+
+        while True:
+            candidate = None
+            with self._lock:
+                waited = self._wait_for_slot(started, waited)
+                if self._idle:
+                    # Still counted in _size: the slot stays ours while it is checked
+                    candidate = self._idle.pop()
+                else:
+                    # Reserve the slot so other threads don't overshoot max_size
+                    self._size += 1
+            if candidate is None:
+                break
+
+            # Validate (ping) or close outside the lock, like the connect below
+            raw, created_at, last_used = candidate
+            if self._is_usable(raw, created_at, last_used, time.monotonic()):
+                with self._lock:
+                    return self._checkout(raw, created_at, started, waited, acquired_by)
+            self._close_raw(raw)
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+
+        # Connect outside the lock so a slow handshake doesn't block other threads
+        try:
+            raw = mysql.connector.connect(**self.db_config)
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._stats["connections_created"] += 1
+            return self._checkout(raw, time.monotonic(), started, waited, acquired_by)
+
+    # With the lock held: wait until an idle connection or a free slot exists.
+    # Returns whether the checkout had to wait.
+    def _wait_for_slot(self, started, waited):
+        while not self._idle and self._size >= self.max_size:
+            # Every connection is checked out: wait for one to come back
+            if not waited:
+                waited = True
+                self._stats["saturated"] += 1
+                self._log_long_held()
+            remaining = self.checkout_timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                self._stats["timeouts"] += 1
+                raise PoolTimeoutError(
+                    "No database connection available after %.1fs (max_size=%s)"
+                    % (self.checkout_timeout, self.max_size))
+            self._lock.wait(remaining)
+        return waited
+
+    def _checkout(self, raw, created_at, started, waited, acquired_by):
+        self._in_use += 1
+        self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+        if waited:
+            wait = time.monotonic() - started
+            self._stats["waits"] += 1
+            self._stats["wait_time_total"] += wait
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait)
+        conn = PooledConnection(self, raw, created_at, acquired_by)
+        self._checked_out[id(conn)] = conn
+        return conn
+
+    def _reset(self, raw):
+        # Drop unread results and any open transaction before the next checkout
+        try:
+            if raw.unread_result:
+                raw.consume_results()
+            if raw.in_transaction:
+                raw.rollback()
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _release(self, conn, raw, created_at):
+        usable = self._reset(raw)
+        with self._lock:
+            self._in_use -= 1
+            self._checked_out.pop(id(conn), None)
+            kept = usable and len(self._idle) < self.max_size
+            if kept:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._size -= 1
+            self._lock.notify()
+        if not kept:
+            self._close_raw(raw)
+
+    def _discard(self, conn, raw):
+        with self._lock:
+            self._in_use -= 1
+            self._checked_out.pop(id(conn), None)
+            self._size -= 1
+            self._lock.notify()
+        self._close_raw(raw)
+
+    def _leaked(self, conn):
+        with self._lock:
+            self._stats["leaked"] += 1
+        logger.warning("Connection leaked: acquired by %s in thread %s and never closed",
+                       conn.acquired_by, conn.acquired_thread)
+
+    def _log_long_held(self):
+        for holder in self._holders(self.long_held):
+            logger.warning("Pool saturated; connection held for %.1fs by %s (thread %s)",
+                           holder["held_for"], holder["acquired_by"], holder["thread"])
+
+    def _holders(self, min_held=0):
+        now = time.monotonic()
+        holders = [
+            {
+                "acquired_by": conn.acquired_by,
+                "thread": conn.acquired_thread,
+                "held_for": now - conn.acquired_at,
+            }
+            for conn in list(self._checked_out.values())
+        ]
+        holders = [h for h in holders if h["held_for"] >= min_held]
+        holders.sort(key=lambda h: h["held_for"], reverse=True)
+        return holders
+
+    def checked_out(self, min_held=0):
+        """Connections currently checked out, longest held first."""
+        with self._lock:
+            return self._holders(min_held)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for raw, _, _ in idle:
+            self._close_raw(raw)
@@ -0,0 +1,189 @@
+"""EXPLAIN regression check for the hot queries.
+
+Runs EXPLAIN on every query listed in HOT_QUERIES and fails (exit code 1)
+when a plan falls back to a full table scan on a table that should be
+reached through an index.
+
+Usage:
+    python explain_check.py                 # check against the configured database
+    python explain_check.py --seed 5000     # top the database up with synthetic rows first
+
+Run it against a seeded database: on near-empty tables MySQL prefers full
+scans no matter which indexes exist.
+"""
+import argparse
+import os
+import random
+import sys
+
+import mysql.connector
+
+import db_connection as db
+from db_connection import DB_CONFIG
+from migrate import MIGRATIONS_DIR, split_statements
+
+# name -> (sql, params, allowed full scan reason or None). The SQL is taken
+# from db_connection, so the check always explains what the app runs.
+HOT_QUERIES = {
+    "get_user": (db.LOGIN_QUERY, ("seed_user_1@example.com", "x"), None),
+    "get_user_profile": (db.USER_PROFILE_QUERY, (1,), None),
+    "recommend_professors": (db.PROFESSORS_QUERY, (), None),
+    "get_partner_index": (
+        db.PARTNER_INDEX_QUERY, (), "reads every student; most users are students so the role index is not selective"),
+    "search_professors": (db.SEARCH_PROFESSORS_QUERY, ("%ai%", "%ai%"), None),
+    "search_unrequested_students": (
+        db.UNREQUESTED_STUDENTS_QUERY, (1, "%ai%"), "leading-wildcard LIKE over every student"),
+    "has_active_collaboration": (db.ACTIVE_COLLABORATION_QUERY, (1, 2), None),
+    "get_collaboration_statuses": db._collaboration_statuses_query(1, [2, 3, 4]) + (None,),
+    "get_pending_requests_detailed": (db.PENDING_REQUESTS_DETAILED_QUERY, (2,), None),
+    "get_request_inbox.date": db._request_inbox_query(2, "date", db.FEED_PAGE_SIZE, None) + (None,),
+    "get_request_inbox.score": db._request_inbox_query(2, "score", db.FEED_PAGE_SIZE, None) + (None,),
+    "get_student_pending_requests": (db.STUDENT_PENDING_REQUESTS_QUERY, (1,), None),
+    "get_active_collaborations.student": db._active_collaborations_query(1, "student") + (None,),
+    "get_active_collaborations.professor": db._active_collaborations_query(2, "professor") + (None,),
+    "get_forum_posts": db._forum_posts_query(None, db.FEED_PAGE_SIZE, None) + (None,),
+    "get_forum_posts.next_page": db._forum_posts_query(None, db.FEED_PAGE_SIZE, ("2030-01-01", 1000)) + (None,),
+    "get_forum_posts_by_category": db._forum_posts_query("Funding", db.FEED_PAGE_SIZE, None) + (None,),
+    "get_research_highlights": db._research_highlights_query(db.FEED_PAGE_SIZE, None) + (None,),
+    "get_all_research_highlights": (db.ALL_RESEARCH_HIGHLIGHTS_QUERY, (), "admin list, reads every highlight"),
+    "search_research_highlights": db._search_highlights_query("seed", db.SEARCH_RESULT_LIMIT) + (None,),
+    "search_research_highlights.short_terms": db._search_highlights_query("AI seed", db.SEARCH_RESULT_LIMIT) + (None,),
+    "get_top_professor_matches": (db.TOP_PROFESSOR_MATCHES_QUERY, (1, db.MATCH_SCORES_TOP_N), None),
+    "get_top_partner_matches": (db.TOP_PARTNER_MATCHES_QUERY, (1, db.MATCH_SCORES_TOP_N), None),
+    "match_score_state": (db.MATCH_SCORE_STATE_QUERY, (1,), None),
+    "get_user_projects": (db.USER_PROJECTS_QUERY, (1,), None),
+    "get_project_by_id": (db.PROJECT_BY_ID_QUERY, (1,), None),
+}
+HOT_QUERIES.update({
+    "get_activity_rollups.%s" % name: (query, (30,), None) for name, query in db.ACTIVITY_ROLLUP_QUERIES.items()
+})
+
+
+def procedure_queries(filename, procedure, parameter):
+    """The SELECTs in a stored procedure's body, in order, with ``parameter`` as a %s placeholder.
+
+    EXPLAIN can't look inside a CALL, so the statements are read from the
+    migration that creates the procedure.
+    """
+    with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+        statements = split_statements(f.read())
+    for statement in statements:
+        if statement.upper().startswith("CREATE PROCEDURE %s(" % procedure.upper()):
+            body = statement[statement.upper().index("BEGIN") + 5:statement.upper().rindex("END")]
+            return [part[part.upper().index("SELECT"):].replace(parameter, "%s")
+                    for part in split_statements(body) if "SELECT" in part.upper()]
+    raise ValueError("No procedure %s in %s" % (procedure, filename))
+
+
+SNAPSHOT_STUDENT, SNAPSHOT_PROFESSOR, SNAPSHOT_PROJECTS = procedure_queries(
+    "005_dashboard_snapshot.sql", "dashboard_snapshot", "p_user_id")
+HOT_QUERIES.update({
+    "dashboard_snapshot.student": (SNAPSHOT_STUDENT, (1,), None),
+    "dashboard_snapshot.professor": (SNAPSHOT_PROFESSOR, (2,), None),
+    "dashboard_snapshot.projects": (SNAPSHOT_PROJECTS, (1,), None),
+})
+
+INTERESTS = ["machine learning", "databases", "computer vision", "nlp", "robotics",
+             "distributed systems", "security", "bioinformatics", "hci", "quantum computing"]
+DEPARTMENTS = ["CSE", "ECE", "ME", "EE", "BT"]
+CATEGORIES = ["General Research", "Funding", "Publication Help", "Research Groups"]
+
+
+def seed(conn, users=5000, rng=None):
+    """Top the database up with synthetic rows so the optimizer sees realistic cardinalities."""
+    rng = rng or random.Random(42)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users")
+    existing = cursor.fetchone()[0]
+    missing = users - existing
+    if missing > 0:
+        rows = []
+        for i in range(existing, users):
+            role = "professor" if i % 10 == 0 else "student"
+            rows.append((
+                "Seed User %d" % i, "seed_user_%d@example.com" % i, role, rng.choice(DEPARTMENTS),
+                ", ".join(rng.sample(INTERESTS, 3)), rng.choice(["beginner", "intermediate", "advanced"]), "x",
+            ))
+        cursor.executemany(
+            """INSERT INTO users (name, email, role, department, research_interests, experience_level, password)
+               VALUES (%s, %s, %s, %s, %s, %s, %s)""", rows)
+
+        cursor.execute("SELECT user_id, role FROM users")
+        ids = cursor.fetchall()
+        students = [uid for uid, role in ids if role == "student"]
+        professors = [uid for uid, role in ids if role == "professor"]
+
+        if students and professors:
+            # One request per student/professor pair, like the application enforces
+            pairs = {(rng.choice(students), rng.choice(professors)) for _ in range(missing)}
+            cursor.executemany(
+                "INSERT INTO collaboration_requests (student_id, professor_id, status) VALUES (%s, %s, %s)",
+                [(s, p, rng.choice(["pending", "accepted", "rejected"])) for s, p in sorted(pairs)])
+        cursor.executemany(
+            "INSERT INTO forum_posts (title, content, author_id, category) VALUES (%s, %s, %s, %s)",
+            [("Seed post %d" % i, "Seed content", rng.choice(ids)[0], rng.choice(CATEGORIES))
+             for i in range(missing)])
+        cursor.executemany(
+            "INSERT INTO research_highlights (title, summary, contributors, posted_by) VALUES (%s, %s, %s, %s)",
+            [("Seed highlight %d" % i, "Seed summary", "Seed contributors", rng.choice(ids)[0])
+             for i in range(missing // 10)])
+        cursor.executemany(
+            "INSERT INTO projects (title, description, owner_id) VALUES (%s, %s, %s)",
+            [("Seed project %d" % i, "Seed description", rng.choice(ids)[0]) for i in range(missing // 5)])
+        conn.commit()
+
+    # Fresh statistics so EXPLAIN reflects the seeded data
+    for table in ("users", "collaboration_requests", "forum_posts", "research_highlights", "projects"):
+        cursor.execute("ANALYZE TABLE %s" % table)
+        cursor.fetchall()
+    cursor.close()
+
+
+def full_scans(cursor, sql, params):
+    """Tables the plan for this query reads with a full table scan."""
+    cursor.execute("EXPLAIN " + sql, params)
+    return [row["table"] for row in cursor.fetchall() if row["type"] == "ALL"]
+
+
+def check(conn, queries=None, verbose=True):
+    """Returns a list of (query name, scanned tables) failures."""
+    cursor = conn.cursor(dictionary=True)
+    failures = []
+    for name, (sql, params, allowed) in (queries or HOT_QUERIES).items():
+        scanned = full_scans(cursor, sql, params)
+        if scanned and not allowed:
+            failures.append((name, scanned))
+            status = "FULL SCAN on %s" % ", ".join(scanned)
+        elif scanned:
+            status = "full scan allowed (%s)" % allowed
+        else:
+            status = "ok"
+        if verbose:
+            print("%-40s %s" % (name, status))
+    cursor.close()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when a hot query falls back to a full table scan")
+    parser.add_argument("--seed", type=int, default=0, metavar="USERS",
+                        help="insert synthetic rows until the users table has this many rows")
+    parser.add_argument("--database", default=DB_CONFIG["database"])
+    args = parser.parse_args(argv)
+
+    conn = mysql.connector.connect(**dict(DB_CONFIG, database=args.database))
+    try:
+        if args.seed:
+            seed(conn, args.seed)
+        failures = check(conn)
+    finally:
+        conn.close()
+
+    if failures:
+        print("\n%d hot queries fall back to full scans" % len(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
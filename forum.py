@@ -1,5 +1,35 @@
 import streamlit as st
 from db_connection import get_db_connection, get_forum_posts, get_forum_posts_by_category, create_forum_post
+from pagination import current_page_cursor, page_controls
+from forum_live import live_feed, new_posts, LIVE_POLL_SECONDS
+
+
+def _show_post(post, new=False):
+    with st.expander(f"{'🆕' if new else '📝'} {post['title']} - by {post['author_name']} ({post['author_role']})"):
+        st.write(f"**Category:** {post['category']}")
+        st.write(f"**Posted on:** {post['created_at'].strftime('%d %B %Y, %H:%M')}")
+        st.markdown("---")
+        st.write(post['content'])
+
+
+# Reruns on its own every LIVE_POLL_SECONDS and shows the posts received since
+# the page's query (``position``), newest first, above the queried ones.
+# A full rerun passes a new position, which starts the list over.
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def _live_posts(category, position, shown_ids):
+    live = st.session_state.get("forum_live")
+    if live is None or live["key"] != (category, position):
+        live = {"key": (category, position), "position": position, "posts": [], "ids": set(shown_ids)}
+        st.session_state["forum_live"] = live
+
+    live["position"], received = live_feed.posts_since(live["position"])
+    for post in new_posts(received, category, live["ids"]):
+        live["posts"].insert(0, post)
+
+    for post in live["posts"]:
+        # Once the feed query includes a post it is shown there instead
+        if post["post_id"] not in shown_ids:
+            _show_post(post, new=True)
 
 
 def show():
@@ -20,21 +50,27 @@ def show():
         categories = ["All", "General Research", "Funding", "Publication Help", "Research Groups"]
         selected_category = st.selectbox("Filter by Category", categories)
 
+        after = current_page_cursor("forum_posts", scope=selected_category)
+        # Taken before the query, so a post that arrives meanwhile is appended, not missed
+        live = live_feed.start()
+        position = live_feed.position()
         if selected_category == "All":
-            posts = get_forum_posts()
+            posts, next_cursor = get_forum_posts(after=after)
         else:
-            posts = get_forum_posts_by_category(selected_category)
+            posts, next_cursor = get_forum_posts_by_category(selected_category, after=after)
+
+        # New posts appear live on the first page; with the bus off there is nothing to poll for
+        if live and after is None:
+            _live_posts(selected_category, position, {post['post_id'] for post in posts})
 
         if not posts:
             st.info("No discussions available in this category yet. Be the first to start one!")
 
         # Display posts
         for post in posts:
-            with st.expander(f"📝 {post['title']} - by {post['author_name']} ({post['author_role']})"):
-                st.write(f"**Category:** {post['category']}")
-                st.write(f"**Posted on:** {post['created_at'].strftime('%d %B %Y, %H:%M')}")
-                st.markdown("---")
-                st.write(post['content'])
+            _show_post(post)
+
+        page_controls("forum_posts", next_cursor, scope=selected_category)
 
     with tab2:
         st.subheader("Start a New Discussion")
@@ -0,0 +1,113 @@
+"""Live forum updates over the message bus.
+
+create_forum_post() publishes every new post as a compact event on the bus
+topic forum/posts (see message_bus.py for the broker settings). Each app
+process subscribes once and keeps the posts it receives in a bounded,
+process-wide buffer; open forum sessions poll that buffer from an st.fragment
+(see forum.py) and append the posts they haven't shown yet, without
+re-running the page or the feed query. While the bus is off (no broker
+configured) nothing can arrive, and the forum doesn't poll.
+"""
+import collections
+import logging
+import os
+import threading
+
+from message_bus import BusFull, get_bus
+
+logger = logging.getLogger(__name__)
+
+FORUM_TOPIC = "forum/posts"
+# Posts kept for sessions that poll late, and how often sessions poll (seconds)
+LIVE_BUFFER_SIZE = int(os.environ.get("RESEARCH_HUB_FORUM_LIVE_BUFFER", 200))
+LIVE_POLL_SECONDS = float(os.environ.get("RESEARCH_HUB_FORUM_LIVE_POLL", 3))
+
+# Event field -> feed row column
+_FIELDS = {
+    "i": "post_id", "t": "title", "c": "content", "g": "category",
+    "a": "author_name", "r": "author_role", "d": "created_at",
+}
+
+
+def encode_post(post):
+    """A feed row (see get_forum_posts) as a compact event."""
+    return {short: post[column] for short, column in _FIELDS.items()}
+
+
+def decode_post(event):
+    """The feed row of an event; raises ValueError for anything else."""
+    try:
+        return {column: event[short] for short, column in _FIELDS.items()}
+    except (KeyError, TypeError) as e:
+        raise ValueError("not a forum post event: %s" % e)
+
+
+class LiveFeed:
+    """Publishes new posts and buffers the ones received by this process."""
+
+    def __init__(self, bus=None, topic=FORUM_TOPIC, size=LIVE_BUFFER_SIZE):
+        self._bus = bus
+        self.topic = topic
+        self._lock = threading.Lock()
+        self._posts = collections.deque(maxlen=size)  # (position, post)
+        self._position = 0
+        self._subscribed = False
+
+    @property
+    def bus(self):
+        return self._bus or get_bus()
+
+    def start(self):
+        """Subscribe, once per process. Returns whether posts can arrive (False while the bus is off)."""
+        if not self.bus.enabled:
+            return False
+        with self._lock:
+            if self._subscribed:
+                return True
+            self._subscribed = True
+        self.bus.subscribe(self.topic, self._on_post)
+        return True
+
+    def _on_post(self, topic, event):
+        try:
+            post = decode_post(event)
+        except ValueError as e:
+            logger.warning("Ignoring message on %s: %s", topic, e)
+            return
+        with self._lock:
+            self._position += 1
+            self._posts.append((self._position, post))
+
+    def publish(self, post):
+        """Best effort: a broker outage must not fail the write that was just committed."""
+        try:
+            # Never wait for room in the bus queue on the request path
+            return self.bus.publish(self.topic, encode_post(post), timeout=0)
+        except BusFull as e:
+            logger.warning("Forum post %s not published: %s", post["post_id"], e)
+            return False
+
+    def position(self):
+        """Marker for posts_since(); everything received so far is before it."""
+        with self._lock:
+            return self._position
+
+    def posts_since(self, position):
+        """(new position, posts received after ``position``), oldest first."""
+        with self._lock:
+            return self._position, [post for received, post in self._posts if received > position]
+
+
+def new_posts(received, category, seen_ids):
+    """The posts of ``received`` in ``category`` ("All" for any) whose ids are
+    not in ``seen_ids``, which they are added to."""
+    posts = []
+    for post in received:
+        if post["post_id"] in seen_ids or category not in ("All", post["category"]):
+            continue
+        seen_ids.add(post["post_id"])
+        posts.append(post)
+    return posts
+
+
+live_feed = LiveFeed()
@@ -0,0 +1,23 @@
+"""Rebuild the precomputed match score tables.
+
+Profile edits keep each user's own lists and the pairs involving them up to
+date; other students' partner lists are only patched, not re-ranked. Run this
+once after applying migration 003, after loading users in bulk, and
+periodically (e.g. nightly) to re-rank every list.
+
+Usage:
+    python match_scores.py
+"""
+import time
+
+from db_connection import rebuild_match_scores
+
+
+def main():
+    started = time.perf_counter()
+    count = rebuild_match_scores()
+    print("Rebuilt match scores for %d students in %.1fs" % (count, time.perf_counter() - started))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+from bisect import bisect_right
+from collections import deque
+
+import numpy as np
+
+
+def split_keywords(interests):
+    """Lowercased, stripped comma-separated keywords, exactly as the matchers compare them."""
+    return [keyword.strip() for keyword in interests.lower().split(',')]
+
+
+def keyword_counts(interests):
+    """(keyword -> duplicates, number of keywords) of one student's interests."""
+    keywords = split_keywords(interests)
+    multiplicity = {}
+    for keyword in keywords:
+        multiplicity[keyword] = multiplicity.get(keyword, 0) + 1
+    return multiplicity, len(keywords)
+
+
+def join_keywords(keywords):
+    # Keywords never contain ',' (they come from split(',')), so a pattern can
+    # never match across two keywords of the joined text.
+    return ",".join(keywords)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over one student's interest keywords.
+
+    count_matches(text) returns how many of the keywords (counting duplicates,
+    as the original nested loop did) occur as a substring of at least one
+    keyword in ``text``, where ``text`` is the output of join_keywords().
+    """
+
+    def __init__(self, keywords):
+        self.total = len(keywords)
+        # '' is a substring of every keyword, so empty keywords always match
+        self.always = sum(1 for keyword in keywords if keyword == "")
+
+        weights = {}
+        for keyword in keywords:
+            if keyword:
+                weights[keyword] = weights.get(keyword, 0) + 1
+        self.patterns = list(weights)
+        self.weights = [weights[p] for p in self.patterns]
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] = self._out[node] + (index,)
+
+        # Breadth-first pass to fill in failure links and merged outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matched(self, text):
+        """Indexes (into self.patterns) of every pattern found in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        remaining = len(self.patterns)
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+                if len(found) == remaining:
+                    break
+        return found
+
+    def count_matches(self, text):
+        if not self.patterns:
+            return self.always
+        weights = self.weights
+        return self.always + sum(weights[index] for index in self.matched(text))
+
+
+class PartnerIndex:
+    """Every student's interests as sparse rows over a shared keyword vocabulary.
+
+    Built once from the candidate rows; score() then rates all candidates
+    against one student with a handful of NumPy passes: each vocabulary
+    keyword gets a bitset of the query keywords it contains, a student's
+    bitset is the OR over their keywords, and the popcount (weighted by
+    duplicate query keywords) is the number of matching keywords.
+    """
+
+    SEPARATOR = "\x00"
+
+    def __init__(self, students):
+        # Same filter as the original loop: NULL and '' interests never match
+        self.rows = [student for student in students if student['research_interests']]
+
+        vocabulary = {}
+        indices = []
+        counts = []
+        lengths = []
+        indptr = [0]
+        for student in self.rows:
+            multiplicity, length = keyword_counts(student['research_interests'])
+            for keyword, count in multiplicity.items():
+                indices.append(vocabulary.setdefault(keyword, len(vocabulary)))
+                counts.append(count)
+            lengths.append(length)
+            indptr.append(len(indices))
+
+        self._vocab_ids = vocabulary
+        self.vocabulary = list(vocabulary)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)  # duplicates of each keyword per student
+        self.lengths = np.asarray(lengths, dtype=np.int64)  # keywords per student, duplicates included
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.user_ids = np.asarray([student['user_id'] for student in self.rows], dtype=np.int64)
+        self.departments = np.asarray([student['department'] for student in self.rows], dtype=object)
+
+        # The whole vocabulary as one string so substring lookups run in C (str.find)
+        self._vocab_text = self.SEPARATOR.join(self.vocabulary)
+        starts = [0]
+        for keyword in self.vocabulary:
+            starts.append(starts[-1] + len(keyword) + 1)
+        self._vocab_starts = starts
+
+    def __len__(self):
+        return len(self.rows)
+
+    def updated(self, user_id, student=None):
+        """A copy with ``user_id``'s row replaced by ``student``, or dropped when
+        ``student`` is None or has no interests; the other rows are shared.
+
+        Rows stay in user_id order (as built from the database), so scores
+        and ties come out exactly as from a freshly built index. The
+        vocabulary only grows; keywords nobody has any more never match.
+        """
+        found = np.flatnonzero(self.user_ids == user_id)
+        if len(found):
+            start, end = int(found[0]), int(found[0]) + 1
+        else:
+            start = end = int(np.searchsorted(self.user_ids, user_id))
+        keep = student is not None and bool(student['research_interests'])
+
+        index = object.__new__(PartnerIndex)
+        index._vocab_ids = dict(self._vocab_ids)
+        new_indices, new_counts, new_lengths = [], [], []
+        if keep:
+            multiplicity, length = keyword_counts(student['research_interests'])
+            for keyword, count in multiplicity.items():
+                new_indices.append(index._vocab_ids.setdefault(keyword, len(index._vocab_ids)))
+                new_counts.append(count)
+            new_lengths.append(length)
+        added = list(index._vocab_ids)[len(self.vocabulary):]
+        index.vocabulary = self.vocabulary + added
+
+        lo, hi = self.indptr[start], self.indptr[end]
+        index.rows = self.rows[:start] + ([student] if keep else []) + self.rows[end:]
+        index.indices = np.concatenate([self.indices[:lo], np.asarray(new_indices, dtype=np.int64),
+                                        self.indices[hi:]])
+        index.counts = np.concatenate([self.counts[:lo], np.asarray(new_counts, dtype=np.int64), self.counts[hi:]])
+        index.lengths = np.concatenate([self.lengths[:start], np.asarray(new_lengths, dtype=np.int64),
+                                        self.lengths[end:]])
+        index.indptr = np.concatenate([self.indptr[:start + 1], [lo + len(new_indices)] if keep else [],
+                                       self.indptr[end + 1:] - (hi - lo) + len(new_indices)]).astype(np.int64)
+        index.user_ids = np.concatenate([self.user_ids[:start], [user_id] if keep else [],
+                                         self.user_ids[end:]]).astype(np.int64)
+        index.departments = np.concatenate([self.departments[:start],
+                                            np.asarray([student['department']] if keep else [], dtype=object),
+                                            self.departments[end:]])
+
+        index._vocab_text = self.SEPARATOR.join(([self._vocab_text] if self.vocabulary else []) + added)
+        index._vocab_starts = list(self._vocab_starts)
+        for keyword in added:
+            index._vocab_starts.append(index._vocab_starts[-1] + len(keyword) + 1)
+        return index
+
+    def _keywords_containing(self, keyword):
+        """Vocabulary indexes of every keyword that has ``keyword`` as a substring."""
+        text, starts = self._vocab_text, self._vocab_starts
+        hits = []
+        pos = text.find(keyword)
+        while pos != -1:
+            index = bisect_right(starts, pos) - 1
+            hits.append(index)
+            pos = text.find(keyword, starts[index + 1])
+        return hits
+
+    def match_counts(self, keywords):
+        """Number of ``keywords`` (duplicates included) matching each indexed student."""
+        counts = np.zeros(len(self.rows), dtype=np.int64)
+        if not self.rows:
+            return counts
+
+        # Every student has at least one keyword and '' is a substring of all of them
+        counts += sum(1 for keyword in keywords if keyword == "")
+
+        weights = {}
+        for keyword in keywords:
+            if keyword:
+                weights[keyword] = weights.get(keyword, 0) + 1
+        patterns = list(weights.items())
+
+        # 64 query keywords per uint64 bitset
+        for chunk_start in range(0, len(patterns), 64):
+            chunk = patterns[chunk_start:chunk_start + 64]
+            keyword_bits = np.zeros(len(self.vocabulary), dtype=np.uint64)
+            for bit, (keyword, _) in enumerate(chunk):
+                hits = self._keywords_containing(keyword)
+                if hits:
+                    keyword_bits[hits] |= np.uint64(1 << bit)
+
+            student_bits = np.bitwise_or.reduceat(keyword_bits[self.indices], self.indptr[:-1])
+            for bit, (_, weight) in enumerate(chunk):
+                counts += weight * ((student_bits >> np.uint64(bit)) & np.uint64(1)).astype(np.int64)
+        return counts
+
+    def score(self, student_id, department, interests, limit=None):
+        """Partner rows with 'compatibility', best first (30 for same department + up to 70 for interests)."""
+        keywords = split_keywords(interests)
+        matches = self.match_counts(keywords)
+
+        dept_match = np.where(self.departments == department, 30, 0)
+        interest_score = np.minimum(((matches / max(len(keywords), 1)) * 70).astype(np.int64), 70)
+        total = dept_match + interest_score
+
+        candidates = np.flatnonzero((total > 0) & (self.user_ids != student_id))
+        # Stable, so ties keep user_id order like the original list.sort()
+        order = candidates[np.argsort(-total[candidates], kind="stable")]
+        if limit is not None:
+            order = order[:limit]
+        return [dict(self.rows[i], compatibility=int(total[i])) for i in order]
+
+    def reverse_match_counts(self, target_keywords):
+        """For each indexed student, how many of *their* keywords (duplicates
+        included) are a substring of one of ``target_keywords``.
+
+        This is the match count the student would get when scoring the target,
+        computed for every student at once.
+        """
+        if not self.rows:
+            return np.zeros(0, dtype=np.int64)
+
+        # A vocabulary keyword matches when it is a substring of a target keyword,
+        # so look up every substring of the (few, short) target keywords
+        present = np.zeros(len(self.vocabulary), dtype=bool)
+        ids = self._vocab_ids
+        for target in set(target_keywords):
+            for start in range(len(target) + 1):
+                for end in range(start, len(target) + 1):
+                    index = ids.get(target[start:end])
+                    if index is not None:
+                        present[index] = True
+
+        return np.add.reduceat(present[self.indices] * self.counts, self.indptr[:-1])
+
+    def reverse_partner_scores(self, target_id, target_department, target_interests):
+        """(student_id, score) for every student whose partner list would include the target."""
+        if not target_interests or not self.rows:
+            return []
+        matches = self.reverse_match_counts(split_keywords(target_interests))
+        dept_match = np.where(self.departments == target_department, 30, 0)
+        interest_score = np.minimum(((matches / np.maximum(self.lengths, 1)) * 70).astype(np.int64), 70)
+        total = dept_match + interest_score
+        selected = np.flatnonzero((total > 0) & (self.user_ids != target_id))
+        return [(int(self.user_ids[i]), int(total[i])) for i in selected]
+
+    def reverse_professor_scores(self, professor_interests):
+        """(student_id, compatibility) for every student the professor would be recommended to."""
+        if not professor_interests or not self.rows:
+            return []
+        matches = self.reverse_match_counts(split_keywords(professor_interests))
+        scores = np.minimum(((matches / self.lengths) * 100).astype(np.int64), 100)
+        selected = np.flatnonzero(matches > 0)
+        return [(int(self.user_ids[i]), int(scores[i])) for i in selected]
@@ -0,0 +1,548 @@
+"""Publish/subscribe over MQTT (paho), shared by everything in the process.
+
+    bus = get_bus()
+    bus.subscribe("forum/posts", handler)         # handler(topic, message)
+    bus.publish("forum/posts", {"i": 12, ...})
+    bus.publish("cache/invalidate", tags, key="forum")  # replaces a pending message with the same key
+
+Topics are relative to a namespace (RESEARCH_HUB_MQTT_PREFIX, so several
+deployments can share a broker); namespace("forum") narrows it further.
+Messages are None, bools, ints, floats, strings, bytes, dates/datetimes,
+Decimals and lists/dicts of those, sent in a compact binary encoding.
+
+publish() only queues the message. A background thread sends what was queued
+in the last BATCH_DELAY seconds as one MQTT message per topic (up to
+BATCH_MAX_MESSAGES / BATCH_MAX_BYTES each), so a burst costs a few round trips
+instead of one per message. Queues are bounded: publish() blocks for up to
+PUBLISH_TIMEOUT when MAX_PENDING messages are waiting and then raises
+BusFull; received messages beyond INBOX_SIZE are dropped and counted.
+paho reconnects on its own, and every (re)connect renews the subscriptions.
+
+RESEARCH_HUB_MQTT_HOST / _PORT / _USERNAME / _PASSWORD / _TLS configure the
+broker (e.g. a local mosquitto). The bus is off, and publish() a no-op, until
+a host is set, so the app still runs without a broker.
+"""
+import atexit
+import collections
+import datetime
+import decimal
+import itertools
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+import paho.mqtt.client as mqtt
+
+from metrics import registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+MQTT_HOST = os.environ.get("RESEARCH_HUB_MQTT_HOST", "")
+MQTT_PORT = int(os.environ.get("RESEARCH_HUB_MQTT_PORT", 1883))
+MQTT_USERNAME = os.environ.get("RESEARCH_HUB_MQTT_USERNAME") or None
+MQTT_PASSWORD = os.environ.get("RESEARCH_HUB_MQTT_PASSWORD") or None
+MQTT_TLS = os.environ.get("RESEARCH_HUB_MQTT_TLS", "") not in ("", "0", "false")
+TOPIC_PREFIX = os.environ.get("RESEARCH_HUB_MQTT_PREFIX", "research_hub")
+QOS = int(os.environ.get("RESEARCH_HUB_MQTT_QOS", 1))
+KEEPALIVE = 60
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+# Batching: how long a message may wait for company (seconds), and batch limits
+BATCH_DELAY = float(os.environ.get("RESEARCH_HUB_BUS_BATCH_DELAY", 0.005))
+BATCH_MAX_MESSAGES = int(os.environ.get("RESEARCH_HUB_BUS_BATCH_MAX", 200))
+BATCH_MAX_BYTES = int(os.environ.get("RESEARCH_HUB_BUS_BATCH_BYTES", 64 * 1024))
+# Bounds: messages waiting to be batched, QoS>0 messages unacknowledged by the
+# broker (and queued behind them in paho), received messages not yet handled
+MAX_PENDING = int(os.environ.get("RESEARCH_HUB_BUS_MAX_PENDING", 10000))
+MAX_INFLIGHT = int(os.environ.get("RESEARCH_HUB_BUS_MAX_INFLIGHT", 100))
+MAX_QUEUED = int(os.environ.get("RESEARCH_HUB_BUS_MAX_QUEUED", 10000))
+INBOX_SIZE = int(os.environ.get("RESEARCH_HUB_BUS_INBOX_SIZE", 10000))
+PUBLISH_TIMEOUT = float(os.environ.get("RESEARCH_HUB_BUS_PUBLISH_TIMEOUT", 1))
+# Seconds a batch waits for room in paho's queue before it is dropped
+QUEUE_FULL_WAIT = float(os.environ.get("RESEARCH_HUB_BUS_QUEUE_FULL_WAIT", 5))
+# Batches larger than this are zlib compressed when that makes them smaller
+COMPRESS_MIN_BYTES = 512
+
+
+class BusFull(Exception):
+    """publish() waited PUBLISH_TIMEOUT and MAX_PENDING messages are still queued."""
+
+
+# --- Payload encoding -------------------------------------------------------
+# A frame is a version byte, a flags byte and a list of encoded messages.
+# Values are a one-byte tag followed by the data; integers and lengths are
+# (zigzag) varints, so small numbers and short strings take a byte or two.
+
+FRAME_VERSION = 1
+FLAG_ZLIB = 0x01
+
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_bytes(out, tag, data):
+    out += tag
+    _write_varint(out, len(data))
+    out += data
+
+
+def _encode(value, out):
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        out += b"i"
+        _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+    elif isinstance(value, float):
+        out += b"d" + struct.pack(">d", value)
+    elif isinstance(value, str):
+        _write_bytes(out, b"s", value.encode("utf-8"))
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        _write_bytes(out, b"b", bytes(value))
+    elif isinstance(value, datetime.datetime):
+        _write_bytes(out, b"t", value.isoformat().encode("ascii"))
+    elif isinstance(value, datetime.date):
+        _write_bytes(out, b"D", value.isoformat().encode("ascii"))
+    elif isinstance(value, decimal.Decimal):
+        _write_bytes(out, b"n", str(value).encode("ascii"))
+    elif isinstance(value, (list, tuple)):
+        out += b"l"
+        _write_varint(out, len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += b"m"
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        raise TypeError("cannot encode %s for the message bus" % type(value).__name__)
+    return out
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def take(self, size):
+        if self.pos + size > len(self.data):
+            raise ValueError("truncated message")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def varint(self):
+        n = shift = 0
+        while True:
+            byte = self.take(1)[0]
+            n |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return n
+            shift += 7
+
+    def chunk(self):
+        return self.take(self.varint())
+
+    def value(self):
+        tag = bytes(self.take(1))
+        if tag == b"N":
+            return None
+        if tag == b"T":
+            return True
+        if tag == b"F":
+            return False
+        if tag == b"i":
+            n = self.varint()
+            return n >> 1 if not n & 1 else -((n + 1) >> 1)
+        if tag == b"d":
+            return struct.unpack(">d", self.take(8))[0]
+        if tag == b"s":
+            return str(self.chunk(), "utf-8")
+        if tag == b"b":
+            return bytes(self.chunk())
+        if tag == b"t":
+            return datetime.datetime.fromisoformat(str(self.chunk(), "ascii"))
+        if tag == b"D":
+            return datetime.date.fromisoformat(str(self.chunk(), "ascii"))
+        if tag == b"n":
+            return decimal.Decimal(str(self.chunk(), "ascii"))
+        if tag == b"l":
+            return [self.value() for _ in range(self.varint())]
+        if tag == b"m":
+            return {self.value(): self.value() for _ in range(self.varint())}
+        raise ValueError("unknown type tag %r" % tag)
+
+
+def encode(value):
+    return bytes(_encode(value, bytearray()))
+
+
+def decode(data):
+    reader = _Reader(data)
+    value = reader.value()
+    if reader.pos != len(reader.data):
+        raise ValueError("trailing bytes after message")
+    return value
+
+
+def encode_frame(encoded_messages):
+    """One MQTT payload for already encode()d messages."""
+    body = bytearray(b"l")
+    _write_varint(body, len(encoded_messages))
+    body += b"".join(encoded_messages)
+    flags = 0
+    if len(body) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(body, 1)
+        if len(compressed) < len(body):
+            body, flags = compressed, FLAG_ZLIB
+    return bytes((FRAME_VERSION, flags)) + bytes(body)
+
+
+def decode_frame(payload):
+    """The messages of an MQTT payload; raises ValueError if it isn't a frame."""
+    if len(payload) < 2 or payload[0] != FRAME_VERSION:
+        raise ValueError("not a message bus frame")
+    body = payload[2:]
+    if payload[1] & FLAG_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as e:
+            raise ValueError("corrupt frame: %s" % e)
+    try:
+        messages = decode(body)
+    except (UnicodeDecodeError, struct.error, TypeError, ArithmeticError, RecursionError) as e:
+        raise ValueError("corrupt frame: %s" % e)
+    if not isinstance(messages, list):
+        raise ValueError("not a message bus frame")
+    return messages
+
+
+# --- Bus ----------------------------------------------------------------------
+
+class MessageBus:
+    def __init__(self, host=MQTT_HOST, port=MQTT_PORT, prefix=TOPIC_PREFIX, qos=QOS,
+                 username=MQTT_USERNAME, password=MQTT_PASSWORD, tls=MQTT_TLS, client_id=None,
+                 batch_delay=BATCH_DELAY, batch_max_messages=BATCH_MAX_MESSAGES, batch_max_bytes=BATCH_MAX_BYTES,
+                 max_pending=MAX_PENDING, max_inflight=MAX_INFLIGHT, max_queued=MAX_QUEUED,
+                 inbox_size=INBOX_SIZE):
+        self.host = host
+        self.port = port
+        self.prefix = prefix.strip("/")
+        self.qos = qos
+        self.username = username
+        self.password = password
+        self.tls = tls
+        self.client_id = client_id or "research_hub-%s" % uuid.uuid4().hex[:12]
+        self.batch_delay = batch_delay
+        self.batch_max_messages = batch_max_messages
+        self.batch_max_bytes = batch_max_bytes
+        self.max_pending = max_pending
+        self.max_inflight = max_inflight
+        self.max_queued = max_queued
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)  # pending changed
+        self._pending = collections.OrderedDict()  # (topic, key) -> encoded message
+        self._pending_bytes = 0
+        self._sending = 0
+        self._sequence = itertools.count()
+        self._handlers = {}  # full topic filter -> [handler]
+        self._connect_callbacks = []
+        self._inbox = queue.Queue(maxsize=inbox_size)
+        self._client = None
+        self._closing = False
+        self._threads = []
+        self._stats = collections.Counter()
+
+    @property
+    def enabled(self):
+        return bool(self.host)
+
+    def topic(self, name):
+        return "%s/%s" % (self.prefix, name.strip("/")) if self.prefix else name.strip("/")
+
+    def namespace(self, name):
+        return Namespace(self, name)
+
+    def start(self):
+        """Connect in the background and start the sender and dispatcher threads, once."""
+        with self._lock:
+            if self._client is not None or not self.enabled or self._closing:
+                return
+            client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, self.client_id)
+            if self.username:
+                client.username_pw_set(self.username, self.password)
+            if self.tls:
+                client.tls_set()
+            client.max_inflight_messages_set(self.max_inflight)
+            client.max_queued_messages_set(self.max_queued)
+            client.reconnect_delay_set(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY)
+            client.on_connect = self._on_connect
+            client.on_disconnect = self._on_disconnect
+            client.on_message = self._on_message
+            client.connect_async(self.host, self.port, KEEPALIVE)
+            self._client = client
+            for target, name in ((self._send_loop, "bus-sender"), (self._dispatch_loop, "bus-dispatcher")):
+                thread = threading.Thread(target=target, name=name, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        # Outside the lock: the callbacks take it
+        client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code.is_failure:
+            logger.warning("MQTT connection to %s:%s refused: %s", self.host, self.port, reason_code)
+            return
+        with self._lock:
+            self._stats["connects"] += 1
+            topics = list(self._handlers)
+            callbacks = list(self._connect_callbacks)
+        # Runs after every reconnect too; a clean session has forgotten them
+        if topics:
+            client.subscribe([(topic, self.qos) for topic in topics])
+        for callback in callbacks:
+            self._run_connect_callback(callback)
+
+    def _run_connect_callback(self, callback):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Bus connect callback %r failed", callback)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        self._count("disconnects")
+        if not self._closing:
+            logger.warning("MQTT connection to %s:%s lost (%s); reconnecting", self.host, self.port, reason_code)
+
+    # --- publishing ---
+
+    def publish(self, topic, message, key=None, timeout=PUBLISH_TIMEOUT):
+        """Queue ``message`` for ``topic``. A ``key`` coalesces: a message still
+        waiting with the same topic and key is replaced. Returns False if the bus is off."""
+        if not self.enabled:
+            return False
+        encoded = encode(message)
+        self.start()
+        full_topic = self.topic(topic)
+        slot = (full_topic, key if key is not None else ("#", next(self._sequence)))
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            replaced = self._pending.pop(slot, None)
+            if replaced is not None:
+                self._pending_bytes -= len(replaced)
+                self._stats["coalesced"] += 1
+            while len(self._pending) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closing:
+                    self._stats["rejected"] += 1
+                    raise BusFull("%d messages waiting to be sent" % len(self._pending))
+                self._ready.wait(remaining)
+            self._pending[slot] = encoded
+            self._pending_bytes += len(encoded)
+            self._stats["published"] += 1
+            self._ready.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far has been handed to the MQTT client."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while self._pending or self._sending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._ready.wait(remaining)
+        return True
+
+    def _send_loop(self):
+        while True:
+            with self._ready:
+                while not self._pending and not self._closing:
+                    self._ready.wait()
+                if not self._pending:
+                    return
+                # Linger so a burst leaves as a few batches, unless a batch is already full
+                deadline = time.monotonic() + self.batch_delay
+                full = min(self.batch_max_messages, self.max_pending)
+                while len(self._pending) < full and self._pending_bytes < self.batch_max_bytes and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+                pending, self._pending, self._pending_bytes = self._pending, collections.OrderedDict(), 0
+                self._sending += 1
+                self._ready.notify_all()  # room for blocked publishers
+            try:
+                self._send(pending)
+            except Exception:
+                logger.exception("Sending %d bus messages failed", len(pending))
+                self._count("dropped", len(pending))
+            finally:
+                with self._ready:
+                    self._sending -= 1
+                    self._ready.notify_all()
+
+    def _send(self, pending):
+        by_topic = collections.OrderedDict()
+        for (topic, _), encoded in pending.items():
+            by_topic.setdefault(topic, []).append(encoded)
+        for topic, messages in by_topic.items():
+            batch, size = [], 0
+            for encoded in messages:
+                if batch and (len(batch) >= self.batch_max_messages or size + len(encoded) > self.batch_max_bytes):
+                    self._send_batch(topic, batch)
+                    batch, size = [], 0
+                batch.append(encoded)
+                size += len(encoded)
+            self._send_batch(topic, batch)
+
+    def _send_batch(self, topic, batch):
+        payload = encode_frame(batch)
+        deadline = time.monotonic() + QUEUE_FULL_WAIT
+        while True:
+            info = self._client.publish(topic, payload, self.qos)
+            if info.rc == mqtt.MQTT_ERR_QUEUE_SIZE and not self._closing and time.monotonic() < deadline:
+                # paho's own queue is full (broker slow or away); wait a little, then drop
+                time.sleep(0.01)
+                continue
+            break
+        # While disconnected paho keeps QoS>0 messages and sends them on reconnect
+        if info.rc == mqtt.MQTT_ERR_SUCCESS or (info.rc == mqtt.MQTT_ERR_NO_CONN and self.qos > 0):
+            self._count("batches")
+            self._count("sent", len(batch))
+            self._count("bytes_sent", len(payload))
+        else:
+            self._count("dropped", len(batch))
+            logger.warning("Dropped %d messages for %s: %s", len(batch), topic, mqtt.error_string(info.rc))
+
+    # --- subscribing ---
+
+    def subscribe(self, topic, handler):
+        """Call handler(topic, message) for every message on ``topic`` (MQTT
+        wildcards allowed), on the bus' dispatcher thread. ``topic`` is relative
+        to the namespace, and so is the one handed to the handler."""
+        full_topic = self.topic(topic)
+        with self._lock:
+            handlers = self._handlers.setdefault(full_topic, [])
+            handlers.append(handler)
+            new = len(handlers) == 1
+        self.start()
+        if new and self._client is not None and self._client.is_connected():
+            self._client.subscribe(full_topic, self.qos)
+
+    def on_connect(self, callback):
+        """Call callback() (on paho's thread) after every connect, the first one
+        included: messages sent before then, or while this process was away,
+        were not received. Called right away too if the bus is already connected."""
+        with self._lock:
+            self._connect_callbacks.append(callback)
+        if self._client is not None and self._client.is_connected():
+            self._run_connect_callback(callback)
+
+    def _on_message(self, client, userdata, msg):
+        # Runs on paho's network thread: hand over and return, never block it
+        try:
+            self._inbox.put_nowait((msg.topic, msg.payload))
+        except queue.Full:
+            self._count("dropped_received")
+
+    def _dispatch_loop(self):
+        while True:
+            topic, payload = self._inbox.get()
+            if topic is None:
+                return
+            try:
+                messages = decode_frame(payload)
+            except ValueError as e:
+                self._count("decode_errors")
+                logger.warning("Ignoring payload on %s: %s", topic, e)
+                continue
+            with self._lock:
+                handlers = [handler for topic_filter, handlers in self._handlers.items()
+                            if mqtt.topic_matches_sub(topic_filter, topic) for handler in handlers]
+            relative = topic[len(self.prefix) + 1:] if self.prefix else topic
+            self._count("received", len(messages))
+            for message in messages:
+                for handler in handlers:
+                    try:
+                        handler(relative, message)
+                    except Exception:
+                        logger.exception("Bus handler %r failed on %s", handler, topic)
+
+    # --- lifecycle ---
+
+    def close(self, timeout=5):
+        """Send what is queued (waiting up to ``timeout``), then disconnect."""
+        if self._client is None:
+            return
+        self.flush(timeout)
+        with self._ready:
+            self._closing = True
+            self._ready.notify_all()
+        self._inbox.put((None, None))
+        for thread in self._threads:
+            thread.join(timeout)
+        self._client.disconnect()
+        self._client.loop_stop()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, pending=len(self._pending), pending_bytes=self._pending_bytes)
+        stats["inbox"] = self._inbox.qsize()
+        stats["connected"] = int(self._client is not None and self._client.is_connected())
+        return stats
+
+
+class Namespace:
+    """A bus whose topics are all under ``name``/."""
+
+    def __init__(self, bus, name):
+        self.bus = bus
+        self.name = name.strip("/")
+
+    def topic(self, name):
+        return "%s/%s" % (self.name, name.strip("/"))
+
+    def publish(self, topic, message, **kwargs):
+        return self.bus.publish(self.topic(topic), message, **kwargs)
+
+    def subscribe(self, topic, handler):
+        prefix = self.name + "/"
+        self.bus.subscribe(self.topic(topic), lambda full, message: handler(full[len(prefix):], message))
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """The process-wide bus (not connected until first used)."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = MessageBus()
+                # Don't lose what the process queued just before it exits (CLIs)
+                atexit.register(_bus.close, 2)
+    return _bus
+
+
+metrics_registry.register_gauges("bus", lambda: _bus.stats() if _bus is not None else {})
@@ -0,0 +1,357 @@
+"""In-process metrics for the data layer, exported in Prometheus text format.
+
+Data-access functions in db_connection are wrapped with @instrumented, which
+records, per function and page:
+
+    research_hub_db_call_seconds      histogram of call latency (cache hits included)
+    research_hub_db_acquire_seconds   histogram of connection pool checkout time
+    research_hub_db_rows_total        rows returned
+    research_hub_db_bytes_total       approximate size of the returned column values
+    research_hub_db_errors_total      calls that raised, by exception type
+
+The page label is whatever app.py last passed to set_page() in the current
+script thread. start_metrics_server() serves everything on
+http://RESEARCH_HUB_METRICS_HOST:RESEARCH_HUB_METRICS_PORT/metrics.
+"""
+import contextvars
+import datetime
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.environ.get("RESEARCH_HUB_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("RESEARCH_HUB_METRICS_PORT", 9464))
+PREFIX = "research_hub"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_function = contextvars.ContextVar("research_hub_db_function", default=None)
+_page = contextvars.ContextVar("research_hub_page", default="")
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Estimate, interpolating inside the bucket like Prometheus' histogram_quantile()."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # (function, page) -> Histogram
+        self._acquire = {}  # (function, page) -> Histogram
+        self._rows = {}  # (function, page) -> int
+        self._bytes = {}  # (function, page) -> int
+        self._errors = {}  # (function, page, error type) -> int
+        self._gauges = {}  # name -> callable returning {key: number}
+
+    def observe_call(self, function, page, seconds, rows=0, nbytes=0, error=None):
+        key = (function, page)
+        with self._lock:
+            histogram = self._calls.get(key)
+            if histogram is None:
+                histogram = self._calls[key] = Histogram()
+            histogram.observe(seconds)
+            self._rows[key] = self._rows.get(key, 0) + rows
+            self._bytes[key] = self._bytes.get(key, 0) + nbytes
+            if error is not None:
+                error_key = (function, page, error)
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+
+    def observe_acquire(self, function, page, seconds):
+        key = (function, page)
+        with self._lock:
+            histogram = self._acquire.get(key)
+            if histogram is None:
+                histogram = self._acquire[key] = Histogram()
+            histogram.observe(seconds)
+
+    def register_gauges(self, name, collect):
+        """Export collect()'s numeric values as research_hub_<name>_<key> gauges."""
+        self._gauges[name] = collect
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._acquire.clear()
+            self._rows.clear()
+            self._bytes.clear()
+            self._errors.clear()
+
+    def _snapshot(self):
+        with self._lock:
+            return ({key: _copy_histogram(h) for key, h in self._calls.items()},
+                    {key: _copy_histogram(h) for key, h in self._acquire.items()},
+                    dict(self._rows), dict(self._bytes), dict(self._errors))
+
+    def summary(self, page=None):
+        """One row per function (optionally for one page), most total time first."""
+        calls, acquire, rows, nbytes, errors = self._snapshot()
+        merged = {}
+        for (function, call_page), histogram in calls.items():
+            if page is not None and call_page != page:
+                continue
+            entry = merged.setdefault(function, {
+                "calls": Histogram(), "acquire": Histogram(), "rows": 0, "bytes": 0, "errors": 0})
+            entry["calls"].merge(histogram)
+            if (function, call_page) in acquire:
+                entry["acquire"].merge(acquire[(function, call_page)])
+            entry["rows"] += rows.get((function, call_page), 0)
+            entry["bytes"] += nbytes.get((function, call_page), 0)
+        for (function, call_page, _), count in errors.items():
+            if function in merged and (page is None or call_page == page):
+                merged[function]["errors"] += count
+
+        summary = []
+        for function, entry in merged.items():
+            histogram, acquire_histogram = entry["calls"], entry["acquire"]
+            summary.append({
+                "function": function,
+                "calls": histogram.count,
+                "errors": entry["errors"],
+                "total_ms": histogram.sum * 1000,
+                "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                "p50_ms": histogram.quantile(0.5) * 1000,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "rows": entry["rows"],
+                "bytes": entry["bytes"],
+                "acquire_mean_ms": (acquire_histogram.sum / acquire_histogram.count * 1000
+                                    if acquire_histogram.count else 0.0),
+            })
+        summary.sort(key=lambda row: row["total_ms"], reverse=True)
+        return summary
+
+    def pages(self):
+        with self._lock:
+            return sorted({page for _, page in self._calls})
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        calls, acquire, rows, nbytes, errors = self._snapshot()
+        lines = []
+        _render_histograms(lines, "db_call_seconds", "Data-access call latency.", calls)
+        _render_histograms(lines, "db_acquire_seconds", "Connection pool checkout time.", acquire)
+        _render_counters(lines, "db_rows_total", "Rows returned by data-access calls.", rows)
+        _render_counters(lines, "db_bytes_total", "Approximate bytes returned by data-access calls.", nbytes)
+        _render_counters(lines, "db_errors_total", "Data-access calls that raised.", errors,
+                         ("function", "page", "error"))
+        for name, collect in sorted(self._gauges.items()):
+            try:
+                values = collect()
+            except Exception:
+                logger.exception("Collecting %s gauges failed", name)
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metric = "%s_%s_%s" % (PREFIX, name, key)
+                    lines.append("# TYPE %s gauge" % metric)
+                    lines.append("%s %s" % (metric, _number(value)))
+        return "\n".join(lines) + "\n"
+
+
+def _copy_histogram(histogram):
+    copy = Histogram(histogram.buckets)
+    copy.merge(histogram)
+    return copy
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = ['%s="%s"' % (name, _escape(value)) for name, value in zip(names, values)]
+    if extra:
+        pairs.append('%s="%s"' % extra)
+    return "{%s}" % ",".join(pairs)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_histograms(lines, name, help_text, histograms, label_names=("function", "page")):
+    metric = "%s_%s" % (PREFIX, name)
+    lines.append("# HELP %s %s" % (metric, help_text))
+    lines.append("# TYPE %s histogram" % metric)
+    for key, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append("%s_bucket%s %d" % (metric, _labels(label_names, key, ("le", le)), cumulative))
+        lines.append("%s_sum%s %s" % (metric, _labels(label_names, key), _number(histogram.sum)))
+        lines.append("%s_count%s %d" % (metric, _labels(label_names, key), histogram.count))
+
+
+def _render_counters(lines, name, help_text, counters, label_names=("function", "page")):
+    metric = "%s_%s" % (PREFIX, name)
+    lines.append("# HELP %s %s" % (metric, help_text))
+    lines.append("# TYPE %s counter" % metric)
+    for key, value in sorted(counters.items()):
+        lines.append("%s%s %d" % (metric, _labels(label_names, key), value))
+
+
+registry = MetricsRegistry()
+
+
+def set_page(page):
+    """Label for every call made from this script thread from now on."""
+    _page.set(page or "")
+
+
+def current_function():
+    return _function.get()
+
+
+def current_page():
+    return _page.get()
+
+
+def observe_acquire(seconds):
+    registry.observe_acquire(_function.get() or "other", _page.get(), seconds)
+
+
+def _value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (int, float, datetime.date, datetime.datetime)):
+        return 8
+    return len(str(value))
+
+
+def _row_size(row):
+    values = row.values() if isinstance(row, dict) else row
+    return sum(_value_size(value) for value in values)
+
+
+def result_size(result):
+    """(rows, approximate bytes) of what a data-access function returned."""
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        result = result[0]  # keyset page: (rows, next cursor)
+    if isinstance(result, dict) and "requests" in result and "projects" in result:
+        result = [row for rows in result["requests"].values() for row in rows] + result["projects"]
+    if isinstance(result, list):
+        return len(result), sum(_row_size(row) for row in result if isinstance(row, (dict, tuple, list)))
+    if isinstance(result, dict):
+        return 1, _row_size(result)
+    return 0, 0
+
+
+def instrumented(func):
+    """Record latency, rows, bytes and errors of every call to ``func`` (a function or coroutine function)."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _function.set(func.__name__)
+            started = time.perf_counter()
+            result = None
+            error = None
+            try:
+                result = await func(*args, **kwargs)
+                return result
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                _observe(func.__name__, token, started, result, error)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _function.set(func.__name__)
+        started = time.perf_counter()
+        result = None
+        error = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _observe(func.__name__, token, started, result, error)
+
+    return wrapper
+
+
+def _observe(function, token, started, result, error):
+    elapsed = time.perf_counter() - started
+    _function.reset(token)
+    rows, nbytes = result_size(result)
+    registry.observe_call(function, _page.get(), elapsed, rows, nbytes, error)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes would flood the Streamlit log
+
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics from a daemon thread, once per process. Returns the server or None."""
+    global _server, _server_failed
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                # e.g. a second app process on the same host; it just isn't scraped
+                logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+                _server_failed = True
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
@@ -0,0 +1,184 @@
+"""Versioned schema migrations for research_hub.
+
+dbms_final.sql creates the baseline schema; every later change lives in
+migrations/NNN_description.sql and is applied once, in order, and recorded
+in the schema_migrations table.
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py status     # list applied / pending migrations
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+import mysql.connector
+
+from db_connection import DB_CONFIG
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version in %s" % directory)
+    return migrations
+
+
+def split_statements(sql):
+    """Split a script into statements.
+
+    Understands quoted strings, /* */ and -- comments, and the mysql client's
+    DELIMITER directive (needed for stored procedures and triggers).
+    """
+    statements = []
+    delimiter = ";"
+    current = []
+    i = 0
+    quote = None
+
+    while i < len(sql):
+        # DELIMITER directive at the start of a line
+        if quote is None and (i == 0 or sql[i - 1] == "\n") and sql[i:i + 10].upper() == "DELIMITER ":
+            end = sql.find("\n", i)
+            end = len(sql) if end == -1 else end
+            delimiter = sql[i + 10:end].strip()
+            i = end + 1
+            continue
+
+        ch = sql[i]
+        if quote:
+            current.append(ch)
+            if ch == "\\":
+                current.append(sql[i + 1:i + 2])
+                i += 2
+                continue
+            if ch == quote:
+                quote = None
+            i += 1
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            current.append(ch)
+            i += 1
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end == -1 else end + 2
+        elif sql.startswith("--", i) or ch == "#":
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+        elif sql.startswith(delimiter, i):
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += len(delimiter)
+        else:
+            current.append(ch)
+            i += 1
+
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def ensure_versions_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_migrations(cursor):
+    cursor.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+    return {row[0]: row for row in cursor.fetchall()}
+
+
+def migrate(db_config=None, directory=MIGRATIONS_DIR, verbose=True):
+    """Apply every pending migration. Returns the list of versions applied."""
+    conn = mysql.connector.connect(**(db_config or DB_CONFIG))
+    cursor = conn.cursor()
+    try:
+        ensure_versions_table(cursor)
+        applied = applied_migrations(cursor)
+        done = []
+
+        for version, name, path in list_migrations(directory):
+            with open(path, encoding="utf-8") as f:
+                sql = f.read()
+            checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+            if version in applied:
+                if applied[version][2] != checksum:
+                    print("WARNING: migration %03d_%s changed after it was applied" % (version, name),
+                          file=sys.stderr)
+                continue
+
+            if verbose:
+                print("Applying %03d_%s ..." % (version, name))
+            # DDL commits implicitly in MySQL, so a failed migration has to be
+            # fixed forward; it is only recorded once every statement succeeded.
+            for statement in split_statements(sql):
+                cursor.execute(statement)
+                if cursor.with_rows:
+                    cursor.fetchall()
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (version, name, checksum)
+            )
+            conn.commit()
+            done.append(version)
+
+        if verbose and not done:
+            print("Schema is up to date.")
+        return done
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def status(db_config=None, directory=MIGRATIONS_DIR):
+    conn = mysql.connector.connect(**(db_config or DB_CONFIG))
+    cursor = conn.cursor()
+    try:
+        ensure_versions_table(cursor)
+        applied = applied_migrations(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+    for version, name, _ in list_migrations(directory):
+        if version in applied:
+            print("%03d_%-40s applied %s" % (version, name, applied[version][3]))
+        else:
+            print("%03d_%-40s pending" % (version, name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply research_hub schema migrations")
+    parser.add_argument("command", nargs="?", default="up", choices=["up", "status"])
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        status()
+    else:
+        migrate()
+
+
+if __name__ == "__main__":
+    main()
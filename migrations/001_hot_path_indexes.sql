@@ -0,0 +1,22 @@
+/* Indexes for the hot queries in db_connection.py and the dashboards */
+
+/* recommend_professors, find_research_partners, search_professors: WHERE role = ? ORDER BY user_id */
+CREATE INDEX idx_users_role ON users (role, user_id);
+
+/* get_pending_requests(_detailed), get_active_collaborations (professor side) */
+CREATE INDEX idx_cr_professor_status ON collaboration_requests (professor_id, status, request_date);
+
+/* get_active_collaborations (student side), get_student_pending_requests */
+CREATE INDEX idx_cr_student_status ON collaboration_requests (student_id, status, professor_id);
+
+/* send_collaboration_request, has_active_collaboration, search_unrequested_students pair lookup */
+CREATE INDEX idx_cr_student_professor ON collaboration_requests (student_id, professor_id, status);
+
+/* get_forum_posts: ORDER BY created_at DESC */
+CREATE INDEX idx_posts_created ON forum_posts (created_at, post_id);
+
+/* get_forum_posts_by_category: WHERE category = ? ORDER BY created_at DESC */
+CREATE INDEX idx_posts_category_created ON forum_posts (category, created_at, post_id);
+
+/* get_research_highlights, get_all_research_highlights: ORDER BY date_posted DESC */
+CREATE INDEX idx_highlights_posted ON research_highlights (date_posted, highlight_id);
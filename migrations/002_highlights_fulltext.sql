@@ -0,0 +1,2 @@
+/* search_research_highlights: ranked MATCH ... AGAINST instead of LIKE '%term%' */
+ALTER TABLE research_highlights ADD FULLTEXT INDEX ft_highlights_text (title, summary, contributors);
@@ -0,0 +1,32 @@
+/* Precomputed recommendation scores, maintained by db_connection.refresh_match_scores() */
+
+/* student -> professor compatibility (every positive score) */
+CREATE TABLE professor_match_scores (
+    student_id INT NOT NULL,
+    professor_id INT NOT NULL,
+    score TINYINT UNSIGNED NOT NULL,
+    PRIMARY KEY (student_id, professor_id),
+    KEY idx_pms_student_score (student_id, score DESC, professor_id),
+    KEY idx_pms_professor (professor_id),
+    FOREIGN KEY (student_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (professor_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+/* student -> student research partner score (each student's best PARTNER_SCORES_KEEP) */
+CREATE TABLE partner_match_scores (
+    student_id INT NOT NULL,
+    partner_id INT NOT NULL,
+    score TINYINT UNSIGNED NOT NULL,
+    PRIMARY KEY (student_id, partner_id),
+    KEY idx_ptms_student_score (student_id, score DESC, partner_id),
+    KEY idx_ptms_partner (partner_id),
+    FOREIGN KEY (student_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (partner_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+/* Students whose own score rows have been computed at least once */
+CREATE TABLE match_score_state (
+    student_id INT PRIMARY KEY,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (student_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
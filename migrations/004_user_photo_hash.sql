@@ -0,0 +1,4 @@
+/* Profile photos live in the content-addressed photo store (photo_store.py);
+   the users row only keeps the SHA-256 of the image.
+   Existing users.profile_photo BLOBs are moved with: python photo_store.py migrate-blobs */
+ALTER TABLE users ADD COLUMN photo_hash CHAR(64) NULL;
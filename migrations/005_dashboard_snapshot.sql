@@ -0,0 +1,32 @@
+/* Everything a dashboard's collaboration and project sections show, in one CALL.
+   Read by db_connection.get_dashboard_snapshot(). */
+
+DROP PROCEDURE IF EXISTS dashboard_snapshot;
+
+DELIMITER //
+CREATE PROCEDURE dashboard_snapshot(IN p_user_id INT, IN p_role VARCHAR(20))
+BEGIN
+    /* Result 1: the user's collaboration requests, with the other participant's profile */
+    IF p_role = 'student' THEN
+        SELECT cr.request_id, cr.status, cr.request_date, cr.student_id, cr.professor_id,
+               u.name, u.department, u.research_interests, u.experience_level
+        FROM collaboration_requests cr
+        JOIN users u ON cr.professor_id = u.user_id
+        WHERE cr.student_id = p_user_id
+        ORDER BY cr.request_date DESC, cr.request_id DESC;
+    ELSE
+        SELECT cr.request_id, cr.status, cr.request_date, cr.student_id, cr.professor_id,
+               u.name, u.department, u.research_interests, u.experience_level
+        FROM collaboration_requests cr
+        JOIN users u ON cr.student_id = u.user_id
+        WHERE cr.professor_id = p_user_id
+        ORDER BY cr.request_date DESC, cr.request_id DESC;
+    END IF;
+
+    /* Result 2: the user's projects */
+    SELECT project_id, title, description, owner_id, status
+    FROM projects
+    WHERE owner_id = p_user_id
+    ORDER BY project_id;
+END //
+DELIMITER ;
@@ -0,0 +1,17 @@
+/* One collaboration request per student/professor pair, so
+   send_collaboration_request() can upsert in a single statement. */
+
+/* Drop duplicate pairs first, keeping the most advanced request of each pair
+   (accepted > pending > rejected, then the newest) */
+DELETE cr FROM collaboration_requests cr
+JOIN collaboration_requests keep
+  ON keep.student_id = cr.student_id
+ AND keep.professor_id = cr.professor_id
+ AND (FIELD(keep.status, 'rejected', 'pending', 'accepted') > FIELD(cr.status, 'rejected', 'pending', 'accepted')
+      OR (keep.status = cr.status AND keep.request_id > cr.request_id));
+
+/* The unique key replaces idx_cr_student_professor for pair lookups (in one
+   ALTER, so the student_id foreign key always has an index) */
+ALTER TABLE collaboration_requests
+    ADD UNIQUE KEY uq_cr_student_professor (student_id, professor_id),
+    DROP INDEX idx_cr_student_professor;
@@ -0,0 +1,95 @@
+/* Pre-aggregated activity for the admin dashboard (db_connection.get_activity_rollups).
+   Triggers keep the rollups current on every write; rollups.py rebuild recomputes
+   them from the base tables (run it once after this migration, then periodically:
+   cascaded deletes don't fire triggers). */
+
+/* Requests created per day, by current status and the professor's department */
+CREATE TABLE request_daily_rollup (
+    day DATE NOT NULL,
+    status ENUM('pending', 'accepted', 'rejected') NOT NULL,
+    department VARCHAR(255) NOT NULL DEFAULT '',
+    requests INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status, department)
+);
+
+/* Forum posts per day and category */
+CREATE TABLE post_daily_rollup (
+    day DATE NOT NULL,
+    category VARCHAR(50) NOT NULL DEFAULT '',
+    posts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category)
+);
+
+/* Users who logged in or wrote something, one row per user per day */
+CREATE TABLE user_daily_activity (
+    day DATE NOT NULL,
+    user_id INT NOT NULL,
+    PRIMARY KEY (day, user_id)
+);
+
+CREATE TABLE active_users_rollup (
+    day DATE PRIMARY KEY,
+    users INT NOT NULL DEFAULT 0
+);
+
+DELIMITER //
+
+CREATE TRIGGER trg_activity_insert AFTER INSERT ON user_daily_activity FOR EACH ROW
+BEGIN
+    /* Only fires for a user's first activity of the day (INSERT IGNORE skips the rest) */
+    INSERT INTO active_users_rollup (day, users) VALUES (NEW.day, 1)
+    ON DUPLICATE KEY UPDATE users = users + 1;
+END //
+
+CREATE TRIGGER trg_requests_rollup_insert AFTER INSERT ON collaboration_requests FOR EACH ROW
+BEGIN
+    INSERT INTO request_daily_rollup (day, status, department, requests)
+    VALUES (DATE(NEW.request_date), NEW.status,
+            COALESCE((SELECT department FROM users WHERE user_id = NEW.professor_id), ''), 1)
+    ON DUPLICATE KEY UPDATE requests = requests + 1;
+    INSERT IGNORE INTO user_daily_activity (day, user_id) VALUES (CURRENT_DATE, NEW.student_id);
+END //
+
+CREATE TRIGGER trg_requests_rollup_update AFTER UPDATE ON collaboration_requests FOR EACH ROW
+BEGIN
+    IF NOT (NEW.status <=> OLD.status) OR DATE(NEW.request_date) <> DATE(OLD.request_date)
+       OR NOT (NEW.professor_id <=> OLD.professor_id) THEN
+        UPDATE request_daily_rollup SET requests = GREATEST(requests - 1, 0)
+        WHERE day = DATE(OLD.request_date) AND status = OLD.status
+          AND department = COALESCE((SELECT department FROM users WHERE user_id = OLD.professor_id), '');
+        INSERT INTO request_daily_rollup (day, status, department, requests)
+        VALUES (DATE(NEW.request_date), NEW.status,
+                COALESCE((SELECT department FROM users WHERE user_id = NEW.professor_id), ''), 1)
+        ON DUPLICATE KEY UPDATE requests = requests + 1;
+    END IF;
+    IF NOT (NEW.status <=> OLD.status) THEN
+        /* A renewed request is the student's doing, a decision the professor's */
+        INSERT IGNORE INTO user_daily_activity (day, user_id)
+        VALUES (CURRENT_DATE, IF(NEW.status = 'pending', NEW.student_id, NEW.professor_id));
+    END IF;
+END //
+
+CREATE TRIGGER trg_requests_rollup_delete AFTER DELETE ON collaboration_requests FOR EACH ROW
+BEGIN
+    UPDATE request_daily_rollup SET requests = GREATEST(requests - 1, 0)
+    WHERE day = DATE(OLD.request_date) AND status = OLD.status
+      AND department = COALESCE((SELECT department FROM users WHERE user_id = OLD.professor_id), '');
+END //
+
+CREATE TRIGGER trg_posts_rollup_insert AFTER INSERT ON forum_posts FOR EACH ROW
+BEGIN
+    INSERT INTO post_daily_rollup (day, category, posts)
+    VALUES (DATE(NEW.created_at), COALESCE(NEW.category, ''), 1)
+    ON DUPLICATE KEY UPDATE posts = posts + 1;
+    IF NEW.author_id IS NOT NULL THEN
+        INSERT IGNORE INTO user_daily_activity (day, user_id) VALUES (CURRENT_DATE, NEW.author_id);
+    END IF;
+END //
+
+CREATE TRIGGER trg_posts_rollup_delete AFTER DELETE ON forum_posts FOR EACH ROW
+BEGIN
+    UPDATE post_daily_rollup SET posts = GREATEST(posts - 1, 0)
+    WHERE day = DATE(OLD.created_at) AND category = COALESCE(OLD.category, '');
+END //
+
+DELIMITER ;
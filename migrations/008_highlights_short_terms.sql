@@ -0,0 +1,14 @@
+/* search_research_highlights: words shorter than innodb_ft_min_token_size
+   ("AI", "ML", the "x" of "x-ray") are not in ft_highlights_text. An ngram
+   index (ngram_token_size, default 2) over the same text finds them without
+   a LIKE scan. It needs its own column: MATCH picks the index by its columns.
+   Stopwords are off for this index only; with them the ngram parser drops
+   every bigram containing a stopword such as "a" or "i". */
+SET SESSION innodb_ft_enable_stopword = OFF;
+
+ALTER TABLE research_highlights
+    ADD COLUMN search_text TEXT
+        GENERATED ALWAYS AS (CONCAT_WS(' ', title, summary, contributors)) STORED INVISIBLE,
+    ADD FULLTEXT INDEX ft_highlights_ngram (search_text) WITH PARSER ngram;
+
+SET SESSION innodb_ft_enable_stopword = ON;
@@ -0,0 +1,31 @@
+import streamlit as st
+
+
+# Keyset pagination state for a feed, kept in the session as a stack of cursors.
+# stack[-1] is the cursor of the page being shown (None for the first page).
+def _pager_state(key, scope):
+    state_key = f"_pager_{key}"
+    state = st.session_state.get(state_key)
+    # Start over from the first page when the feed's filter changes
+    if state is None or state["scope"] != scope:
+        state = {"scope": scope, "stack": [None]}
+        st.session_state[state_key] = state
+    return state
+
+
+def current_page_cursor(key, scope=None):
+    return _pager_state(key, scope)["stack"][-1]
+
+
+def page_controls(key, next_cursor, scope=None, labels=("← Newer", "Older →")):
+    state = _pager_state(key, scope)
+    stack = state["stack"]
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    if col1.button(labels[0], key=f"{key}_newer", disabled=len(stack) == 1):
+        stack.pop()
+        st.rerun()
+    col2.caption(f"Page {len(stack)}")
+    if col3.button(labels[1], key=f"{key}_older", disabled=next_cursor is None):
+        stack.append(next_cursor)
+        st.rerun()
@@ -0,0 +1,177 @@
+"""Content-addressed storage for profile photos.
+
+Uploaded photos are stored on local disk under their SHA-256 digest, so
+identical uploads are stored once, and a thumbnail is generated on upload.
+The users row only keeps the digest (users.photo_hash); pages render the
+thumbnail straight from disk.
+
+Moving photos out of an existing users.profile_photo BLOB column:
+    python photo_store.py migrate-blobs [--keep-column]
+"""
+import argparse
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+from PIL import Image, UnidentifiedImageError
+
+PHOTO_DIR = os.environ.get(
+    "RESEARCH_HUB_PHOTO_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "media", "photos")
+)
+THUMBNAIL_SIZE = (150, 150)  # the dashboards render photos at width=150
+MAX_PHOTO_BYTES = 10 * 1024 * 1024
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class PhotoStore:
+    def __init__(self, root=PHOTO_DIR, thumbnail_size=THUMBNAIL_SIZE):
+        self.root = root
+        self.thumbnail_size = thumbnail_size
+
+    def _path(self, digest, suffix):
+        # Fan out over 256 directories so no single directory grows huge
+        return os.path.join(self.root, digest[:2], digest + suffix)
+
+    def original_path(self, digest):
+        return self._path(digest, ".orig")
+
+    def thumbnail_path(self, digest):
+        path = self._path(digest, ".thumb.jpg")
+        return path if os.path.exists(path) else None
+
+    def contains(self, digest):
+        return self.thumbnail_path(digest) is not None and os.path.exists(self.original_path(digest))
+
+    def delete(self, digest):
+        """Remove a photo and its thumbnail (missing files are ignored)."""
+        for path in (self.original_path(digest), self._path(digest, ".thumb.jpg")):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _thumbnail(self, data):
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail(self.thumbnail_size)
+            out = io.BytesIO()
+            image.convert("RGB").save(out, format="JPEG", quality=85, optimize=True)
+        return out.getvalue()
+
+    def put(self, data):
+        """Store a photo and its thumbnail. Returns the content hash."""
+        if len(data) > MAX_PHOTO_BYTES:
+            raise ValueError("Profile photo is larger than %d MB" % (MAX_PHOTO_BYTES // (1024 * 1024)))
+        digest = content_hash(data)
+
+        # Already stored (same photo uploaded before, possibly by someone else)
+        if self.contains(digest):
+            return digest
+
+        try:
+            thumbnail = self._thumbnail(data)
+        except (UnidentifiedImageError, OSError) as e:
+            raise ValueError("Uploaded file is not a readable image") from e
+        except Image.DecompressionBombError as e:
+            # Small file, huge pixel count: decoding it would exhaust memory
+            raise ValueError("Uploaded image has too many pixels") from e
+
+        self._write_atomic(self.original_path(digest), data)
+        self._write_atomic(self._path(digest, ".thumb.jpg"), thumbnail)
+        return digest
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_photo_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PhotoStore()
+    return _store
+
+
+def migrate_blobs(batch_size=200, drop_column=True):
+    """Move users.profile_photo BLOBs into the store and record their hashes."""
+    from db_connection import db_session
+
+    with db_session() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*) AS found FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'users' AND column_name = 'profile_photo'
+        """)
+        if not cursor.fetchone()["found"]:
+            print("users.profile_photo does not exist, nothing to migrate.")
+            return 0
+
+    store = get_photo_store()
+    moved = 0
+    skipped = 0
+    last_id = 0
+    while True:
+        with db_session() as cursor:
+            cursor.execute("""
+                SELECT user_id, profile_photo FROM users
+                WHERE user_id > %s AND profile_photo IS NOT NULL
+                ORDER BY user_id LIMIT %s
+            """, (last_id, batch_size))
+            rows = cursor.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            try:
+                updates.append((store.put(bytes(row["profile_photo"])), row["user_id"]))
+            except ValueError as e:
+                skipped += 1
+                print("Skipping photo of user %s: %s" % (row["user_id"], e))
+        with db_session() as cursor:
+            cursor.executemany("UPDATE users SET photo_hash = %s WHERE user_id = %s", updates)
+        moved += len(updates)
+        last_id = rows[-1]["user_id"]
+
+    if drop_column and skipped:
+        # Dropping the column would lose the photos that could not be moved
+        print("Warning: %d photos were skipped; keeping users.profile_photo. "
+              "Fix or clear them and run the migration again." % skipped)
+    elif drop_column:
+        with db_session() as cursor:
+            cursor.execute("ALTER TABLE users DROP COLUMN profile_photo")
+    print("Moved %d photos into %s" % (moved, store.root))
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile photo store maintenance")
+    parser.add_argument("command", choices=["migrate-blobs"])
+    parser.add_argument("--keep-column", action="store_true",
+                        help="leave users.profile_photo in place after copying the photos")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate-blobs":
+        migrate_blobs(drop_column=not args.keep_column)
+
+
+if __name__ == "__main__":
+    main()
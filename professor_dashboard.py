@@ -1,27 +1,36 @@
 import streamlit as st
 from db_connection import (
-    get_db_connection, update_user_profile, update_request_status,
-    get_active_collaborations, delete_collaboration
+    update_user_profile, update_request_statuses, get_dashboard_snapshot,
+    delete_collaboration, search_unrequested_students, professor_scores_tags
 )
+import async_db
+from user_session import current_user, update_profile, logout
+from dashboard_sections import section_selector, section_data, gather_section_data
+from pagination import current_page_cursor, page_controls
+
+INBOX_PAGE_SIZE = 25
 
 
 def show():
     st.title(" Professor Dashboard")
 
-    user = st.session_state.get("user")
+    user = current_user()
     if not user:
         st.error("Unauthorized access. Please log in.")
         return
 
 
-    tab1, tab2, tab3 = st.tabs([
+    # Only the selected section runs, so a rerun only loads that section's data
+    tab1, tab2, tab3 = SECTIONS = [
         "👤 Profile",
         "📩 Collaboration Requests",
         "🤝 Active Collaborations"
-    ])
+    ]
+    section = section_selector("professor", SECTIONS)
+    snapshot_tags = ["collaborations:%s" % user["user_id"], "projects:%s" % user["user_id"]]
 
     # Profile Section
-    with tab1:
+    if section == tab1:
         if not user.get("department") or not user.get("research_interests"):
             st.warning("⚠️ Your profile is incomplete! Please fill in the required details.")
             department = st.text_input("Department", value=user.get("department", ""))
@@ -30,10 +39,7 @@ def show():
             if st.button("Save Profile"):
                 success = update_user_profile(user["user_id"], department, research_interests)
                 if success:
-                    st.session_state["user"].update({
-                        "department": department,
-                        "research_interests": research_interests
-                    })
+                    update_profile(department=department, research_interests=research_interests)
                     st.success("Profile updated successfully!")
                     st.rerun()
         else:
@@ -42,54 +48,53 @@ def show():
 
             if st.button("Edit Profile", key="edit_profile"):
                 # Reset profile completion flags to allow editing
-                st.session_state["user"].update({
-                    "department": "",
-                    "research_interests": ""
-                })
+                update_profile(department="", research_interests="")
                 st.rerun()
 
     # Collaboration Requests Section
-    with tab2:
-        st.subheader("📩 Pending Collaboration Requests")
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT r.request_id, u.user_id AS student_id, u.name AS student_name, 
-                   u.research_interests, u.department, u.experience_level
-            FROM collaboration_requests r 
-            JOIN users u ON r.student_id = u.user_id 
-            WHERE r.professor_id = %s AND r.status = 'pending'
-        """, (user["user_id"],))
+    if section == tab2:
+        # The counts and the inbox page are independent, so they load concurrently
+        # (the sort radio below is read from the session before it is drawn)
+        order = "score" if st.session_state.get("inbox_sort", "Best match") == "Best match" else "date"
+        after = current_page_cursor("inbox", scope=order)
+        snapshot, (requests, next_cursor) = gather_section_data(
+            ("snapshot", snapshot_tags, async_db.get_dashboard_snapshot, user["user_id"], "professor"),
+            ("inbox", snapshot_tags + professor_scores_tags(user["user_id"]), async_db.get_request_inbox,
+             user["user_id"], order, INBOX_PAGE_SIZE, after),
+        )
+        st.subheader(f"📩 Pending Collaboration Requests ({snapshot['counts']['pending']})")
 
-        requests = cursor.fetchall()
+        # Paged inbox; decisions are ticked in a form and applied together
+        st.radio("Sort by", ["Best match", "Newest"], horizontal=True, key="inbox_sort")
 
         if requests:
-            for req in requests:
-                st.markdown(f"### 🎓 Request from: {req['student_name']}")
-                st.write(f"🏛️ **Department:** {req['department']}")
-                st.write(f"🔬 **Research Interests:** {req['research_interests']}")
-                st.write(
-                    f"📈 **Experience Level:** {req['experience_level'].capitalize() if req['experience_level'] else 'Not specified'}")
+            with st.form("inbox_form"):
+                selected = []
+                for req in requests:
+                    if st.checkbox(f"🎓 **{req['student_name']}** · {req['score']}% match",
+                                   key=f"inbox_{req['request_id']}"):
+                        selected.append(req['request_id'])
+                    st.write(f"🏛️ **Department:** {req['department']}")
+                    st.write(f"🔬 **Research Interests:** {req['research_interests']}")
+                    st.write(
+                        f"📈 **Experience Level:** {req['experience_level'].capitalize() if req['experience_level'] else 'Not specified'}")
+                    st.caption(f"Requested on {req['request_date']:%Y-%m-%d}")
+                    st.divider()
 
                 col1, col2 = st.columns(2)
-                if col1.button("✅ Accept", key=f"accept_{req['request_id']}"):
-                    success = update_request_status(req['request_id'], 'accepted')
-                    if success:
-                        st.success("Collaboration Accepted!")
-                    else:
-                        st.error("Failed to accept collaboration.")
-                    st.rerun()
+                accept = col1.form_submit_button("✅ Accept selected")
+                reject = col2.form_submit_button("❌ Reject selected")
 
-                if col2.button("❌ Reject", key=f"reject_{req['request_id']}"):
-                    success = update_request_status(req['request_id'], 'rejected')
-                    if success:
-                        st.error("Collaboration Rejected!")
-                    else:
-                        st.error("Failed to reject collaboration.")
+            if accept or reject:
+                if not selected:
+                    st.warning("Select at least one request.")
+                else:
+                    status = 'accepted' if accept else 'rejected'
+                    updated = update_request_statuses(user["user_id"], [(rid, status) for rid in selected])
+                    st.toast(f"{updated} request(s) {status}.")
                     st.rerun()
 
-                st.divider()
+            page_controls("inbox", next_cursor, scope=order, labels=("← Previous", "Next →"))
         else:
             st.info("No pending requests.")
 
@@ -99,15 +104,7 @@ def show():
 
         if search_term:
             # Get all students with matching research interests who haven't sent requests
-            cursor.execute("""
-                SELECT u.user_id, u.name, u.department, u.research_interests, u.experience_level
-                FROM users u
-                LEFT JOIN collaboration_requests cr ON cr.student_id = u.user_id AND cr.professor_id = %s
-                WHERE u.role = 'student' AND u.research_interests LIKE %s AND cr.request_id IS NULL
-                ORDER BY u.name
-            """, (user["user_id"], f'%{search_term}%'))
-
-            students = cursor.fetchall()
+            students = search_unrequested_students(user["user_id"], search_term)
 
             if students:
                 for student in students:
@@ -120,12 +117,11 @@ def show():
             else:
                 st.info(f"No students found with research interests matching '{search_term}'.")
 
-        conn.close()
-
     # Active Collaborations Section
-    with tab3:
-        st.subheader("🤝 Active Collaborations")
-        collaborations = get_active_collaborations(user["user_id"], "professor")
+    if section == tab3:
+        snapshot = section_data("snapshot", snapshot_tags, get_dashboard_snapshot, user["user_id"], "professor")
+        collaborations = snapshot["requests"]["accepted"]
+        st.subheader(f"🤝 Active Collaborations ({snapshot['counts']['accepted']})")
 
         if not collaborations:
             st.info("You don't have any active collaborations yet.")
@@ -148,7 +144,7 @@ def show():
 
     # Logout Button (at the bottom of the dashboard)
     if st.button("Logout", key="logout_button"):
-        st.session_state["user"] = None
+        logout()
         st.rerun()
 
 
@@ -1,16 +1,20 @@
+import argparse
 
+from message_bus import MessageBus
 
-import paho.mqtt.client as mqtt
+parser = argparse.ArgumentParser(description="Send chat messages over the message bus")
+parser.add_argument("--broker", default="broker.emqx.io")
+parser.add_argument("--port", type=int, default=1883)
+parser.add_argument("--topic", default="bk/chat")
+args = parser.parse_args()
 
-broker_ip = "broker.emqx.io"
-topic = "bk/chat"
-
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, "laptopB_pub")
-client.connect(broker_ip, 1883, 60)
+bus = MessageBus(args.broker, args.port, prefix="")
 
 print("Type your message and press Enter. Type 'exit' to quit.")
 while True:
     msg = input("You: ")
     if msg.lower() == "exit":
         break
-    client.publish(topic, msg)
+    bus.publish(args.topic, msg)
+
+bus.close()
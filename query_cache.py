@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """Thread-safe, size-bounded LRU cache with a TTL and tag-based invalidation.
+
+    Every entry carries a set of tags (e.g. "forum", "projects:12"); writes call
+    invalidate() with the tags they affect, which evicts exactly the entries
+    carrying those tags. Each tag's generation is the sequence number of its
+    last invalidation; it keeps a read that raced with a write from storing its
+    (possibly stale) result.
+    """
+
+    def __init__(self, max_entries=1000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._tag_keys = {}  # tag -> set of keys
+        self._generations = {}  # tag -> sequence number of its last invalidation
+        self._sequence = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key):
+        """Returns (True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, value
+
+    def generation(self, tags):
+        """Snapshot to pass to put(), taken before running the query."""
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def sequence(self):
+        """The latest invalidation; tags whose generation is above it changed since."""
+        with self._lock:
+            return self._sequence
+
+    def put(self, key, value, tags, generation=None):
+        tags = tuple(tags)
+        with self._lock:
+            if generation is not None and generation != tuple(self._generations.get(tag, 0) for tag in tags):
+                return False  # invalidated while the query was running
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+            return True
+
+    def invalidate(self, *tags):
+        """Evict every entry carrying any of ``tags``. Returns the number evicted."""
+        evicted = 0
+        with self._lock:
+            self._sequence += 1
+            for tag in tags:
+                self._generations[tag] = self._sequence
+                for key in list(self._tag_keys.get(tag, ())):
+                    self._remove(key)
+                    evicted += 1
+            self._stats["invalidations"] += evicted
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -1,5 +1,7 @@
 import streamlit as st
-from db_connection import recommend_professors, find_research_partners, send_collaboration_request
+from db_connection import get_top_partner_matches, send_collaboration_request, match_scores_tags
+from user_session import current_user
+from dashboard_sections import section_data
 
 
 def display_person_details(person, match_percentage):
@@ -19,16 +21,37 @@ def display_person_details(person, match_percentage):
     st.divider()
 
 
-def show_professor_recommendations():
+def show_request_action(student_id, prof, status, key):
+    """Request button for a professor, or the state of the existing request."""
+    if status == "accepted":
+        st.info("You're already collaborating with this professor.")
+        return
+    if status == "pending":
+        st.info("Your collaboration request is waiting for a reply.")
+        return
+    if status == "rejected":
+        st.caption("Your previous request was declined; you can send a new one.")
+
+    if st.button(f"Request Collaboration with {prof['name']}", key=key):
+        success = send_collaboration_request(student_id, prof['user_id'])
+        if success:
+            st.success(f"✅ Collaboration request sent to {prof['name']}!")
+        else:
+            st.info("You've already sent a request to this professor.")
+
+
+# professors: the student's top matches (get_top_professor_matches), None
+# when the profile has no research interests; statuses: their request
+# statuses (get_collaboration_statuses). The caller loads both, so they can
+# share queries with the rest of its page.
+def show_professor_recommendations(professors, statuses):
     st.subheader(" Professor Recommendations")
 
-    user = st.session_state.get("user")
+    user = current_user()
     if not user or not user.get("research_interests"):
         st.warning("Please complete your profile with research interests to get recommendations.")
         return
 
-    professors = recommend_professors(user["research_interests"])
-
     if not professors:
         st.info("No matching professors found. Update your research interests for better recommendations.")
         return
@@ -38,24 +61,20 @@ def show_professor_recommendations():
     for prof in professors:
         with st.container():
             display_person_details(prof, prof["compatibility"])
-
-            if st.button(f"Request Collaboration", key=f"rec_req_{prof['user_id']}"):
-                success = send_collaboration_request(user["user_id"], prof['user_id'])
-                if success:
-                    st.success(f"✅ Collaboration request sent to {prof['name']}!")
-                else:
-                    st.info("You've already sent a request to this professor.")
+            show_request_action(user["user_id"], prof, statuses.get(prof['user_id']), f"rec_req_{prof['user_id']}")
 
 
 def show_research_partners():
     st.subheader(" Find Research Partners")
 
-    user = st.session_state.get("user")
+    user = current_user()
     if not user or not user.get("research_interests") or not user.get("department"):
         st.warning("Please complete your profile with department and research interests to find partners.")
         return
 
-    partners = find_research_partners(user["user_id"], user["department"], user["research_interests"])
+    partners = section_data(
+        "partner_matches", match_scores_tags(user["user_id"]), get_top_partner_matches, user["user_id"]
+    )
 
     if not partners:
         st.info("No matching student partners found. Try updating your research interests.")
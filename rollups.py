@@ -0,0 +1,35 @@
+"""Rebuild the admin dashboard's activity rollups from the base tables.
+
+Triggers keep the rollups current on every write; run this once after
+applying migration 007, then periodically (e.g. nightly from cron) to correct
+drift from cascaded deletes and department changes.
+
+Usage:
+    python rollups.py                  # rebuild once
+    python rollups.py --every 3600     # keep running, rebuilding every hour
+"""
+import argparse
+import time
+
+from db_connection import rebuild_rollups
+
+
+def rebuild():
+    started = time.perf_counter()
+    rebuild_rollups()
+    print("Rebuilt activity rollups in %.1fs" % (time.perf_counter() - started))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the activity rollup tables")
+    parser.add_argument("--every", type=int, metavar="SECONDS", help="rebuild repeatedly at this interval")
+    args = parser.parse_args(argv)
+
+    rebuild()
+    while args.every:
+        time.sleep(args.every)
+        rebuild()
+
+
+if __name__ == "__main__":
+    main()
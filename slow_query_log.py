@@ -0,0 +1,330 @@
+"""Slow query log for the data layer.
+
+db_session() hands out cursors wrapped in SlowQueryCursor (AsyncSlowQueryCursor
+for async_db's sessions). Any statement slower than SLOW_QUERY_MS is written
+as one JSON line to a rotating log with its SQL, normalized fingerprint,
+redacted parameters, the data-access function, page and call site that ran
+it, and the EXPLAIN plan (captured at most once per fingerprint every
+EXPLAIN_INTERVAL seconds).
+
+Totals per fingerprint are kept in memory (top_fingerprints(), shown on the
+admin dashboard) and can be rebuilt from the log files:
+    python slow_query_log.py report [--limit 20] [--log PATH]
+"""
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import threading
+import time
+
+import metrics
+
+SLOW_QUERY_MS = float(os.environ.get("RESEARCH_HUB_SLOW_QUERY_MS", 200))  # negative disables the log
+SLOW_QUERY_LOG = os.environ.get(
+    "RESEARCH_HUB_SLOW_QUERY_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "slow_queries.log")
+)
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+EXPLAIN_INTERVAL = 300
+MAX_SQL_LENGTH = 4000
+
+# Frames skipped when looking for the code that issued a statement
+_INTERNAL_FILES = {os.path.basename(__file__), "db_connection.py", "async_db.py", "metrics.py", "contextlib.py"}
+
+# One pass, so a quote inside a comment or a # or -- inside a string literal
+# can't swallow the rest of the statement
+_STRING_OR_COMMENT = re.compile(
+    r"(?P<string>'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\")|/\*.*?\*/|--[^\n]*|#[^\n]*", re.S)
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(values\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_SPACE = re.compile(r"\s+")
+_EXPLAINABLE = re.compile(r"^\s*(select|update|delete|insert|replace|with)\b", re.I)
+
+
+def normalize(sql):
+    """Query shape: literals and placeholders become ?, lists collapse, case and spacing are folded."""
+    text = _STRING_OR_COMMENT.sub(lambda match: "?" if match.group("string") else " ", sql)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _SPACE.sub(" ", text).strip().lower()
+    text = _IN_LIST.sub("(?+)", text)
+    return _VALUES_LIST.sub(r"\1, ...", text)
+
+
+def fingerprint(sql):
+    normalized = normalize(sql)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16], normalized
+
+
+def _redact_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes, bytearray)):
+        return "<%s:%d>" % (type(value).__name__, len(value))
+    return "<%s>" % type(value).__name__
+
+
+def redact(params, many=False):
+    """Parameter types and sizes only; values (passwords, emails, ...) never reach the log."""
+    if params is None:
+        return None
+    if many:
+        params = list(params)
+        return {"rows": len(params), "first": redact(params[0]) if params else None}
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    return [_redact_value(value) for value in params]
+
+
+def caller_site():
+    frame = sys._getframe(1)
+    while frame is not None:
+        if os.path.basename(frame.f_code.co_filename) not in _INTERNAL_FILES:
+            return "%s:%s in %s" % (os.path.basename(frame.f_code.co_filename), frame.f_lineno,
+                                    frame.f_code.co_name)
+        frame = frame.f_back
+    return "unknown"
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, path=SLOW_QUERY_LOG):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self._lock = threading.Lock()
+        self._logger = None
+        self._explained = {}  # fingerprint -> monotonic time of the last EXPLAIN
+        self._totals = {}  # fingerprint -> aggregate
+
+    def _get_logger(self):
+        # Created on the first slow statement, so importing never touches the disk
+        if self._logger is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            logger = logging.getLogger("research_hub.slow_queries")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def is_slow(self, elapsed_ms):
+        return 0 <= self.threshold_ms <= elapsed_ms
+
+    def _should_explain(self, digest, sql):
+        if not _EXPLAINABLE.match(sql):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(digest)
+            if last is not None and now - last < EXPLAIN_INTERVAL:
+                return False
+            self._explained[digest] = now
+        return True
+
+    def record(self, sql, params, elapsed_ms, conn=None, many=False, rows=None, explain=None, caller=None):
+        digest, normalized = fingerprint(sql)
+        if conn is not None and not many and self._should_explain(digest, sql):
+            explain = _explain(conn, sql, params)
+
+        entry = {
+            "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "duration_ms": round(elapsed_ms, 3),
+            "fingerprint": digest,
+            "normalized": normalized,
+            "sql": sql if len(sql) <= MAX_SQL_LENGTH else sql[:MAX_SQL_LENGTH] + "...",
+            "params": redact(params, many),
+            "rows": rows,
+            "function": metrics.current_function(),
+            "page": metrics.current_page(),
+            "caller": caller or caller_site(),
+            "explain": explain,
+        }
+        with self._lock:
+            total = self._totals.setdefault(digest, {
+                "fingerprint": digest, "normalized": normalized, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "functions": set()})
+            total["count"] += 1
+            total["total_ms"] += elapsed_ms
+            total["max_ms"] = max(total["max_ms"], elapsed_ms)
+            if entry["function"]:
+                total["functions"].add(entry["function"])
+        try:
+            self._get_logger().info(json.dumps(entry, default=str))
+        except OSError:
+            pass  # never fail a page because the log can't be written
+        return entry
+
+    def top_fingerprints(self, limit=20):
+        """Slow query shapes seen by this process, most total time first."""
+        with self._lock:
+            totals = [dict(total, functions=sorted(total["functions"])) for total in self._totals.values()]
+        totals.sort(key=lambda total: total["total_ms"], reverse=True)
+        return totals[:limit]
+
+
+def _explain(conn, sql, params):
+    cursor = None
+    try:
+        # Same connection (and transaction) as the statement; the session's
+        # cursors are buffered, so their unread rows are not in the way
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        cursor.execute("EXPLAIN " + sql, params)
+        return cursor.fetchall()
+    except Exception as e:
+        return "EXPLAIN failed: %s" % e
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+slow_log = SlowQueryLog()
+
+
+class SlowQueryCursor:
+    """Cursor proxy that times execute/executemany/callproc and logs slow statements."""
+
+    def __init__(self, cursor, conn, log=None):
+        self._cursor = cursor
+        self._conn = conn
+        self._log = log or slow_log
+
+    def _run(self, sql, params, many, call):
+        started = time.perf_counter()
+        result = call()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self._log.is_slow(elapsed_ms):
+            self._log.record(sql, params, elapsed_ms, self._conn, many, self._cursor.rowcount)
+        return result
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(operation, params, False,
+                         lambda: self._cursor.execute(operation, params, *args, **kwargs))
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        return self._run(operation, seq_params, True,
+                         lambda: self._cursor.executemany(operation, seq_params, *args, **kwargs))
+
+    def callproc(self, procname, args=()):
+        sql = "CALL %s(%s)" % (procname, ", ".join(["%s"] * len(args)))
+        return self._run(sql, args, False, lambda: self._cursor.callproc(procname, args))
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class AsyncSlowQueryCursor:
+    """SlowQueryCursor for the aiomysql cursors of async_db.
+
+    ``caller`` is the call site that submitted the query to the event loop,
+    since the loop thread's own stack says nothing about it.
+    """
+
+    def __init__(self, cursor, conn, log=None, caller=None):
+        self._cursor = cursor
+        self._conn = conn
+        self._log = log or slow_log
+        self._caller = caller
+
+    async def _run(self, sql, params, many, call):
+        started = time.perf_counter()
+        result = await call()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self._log.is_slow(elapsed_ms):
+            explain = None
+            if not many and self._log._should_explain(fingerprint(sql)[0], sql):
+                explain = await _explain_async(self._conn, sql, params)
+            self._log.record(sql, params, elapsed_ms, None, many, self._cursor.rowcount, explain, self._caller)
+        return result
+
+    async def execute(self, operation, params=None):
+        return await self._run(operation, params, False, lambda: self._cursor.execute(operation, params))
+
+    async def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        return await self._run(operation, seq_params, True,
+                               lambda: self._cursor.executemany(operation, seq_params))
+
+    async def callproc(self, procname, args=()):
+        sql = "CALL %s(%s)" % (procname, ", ".join(["%s"] * len(args)))
+        return await self._run(sql, args, False, lambda: self._cursor.callproc(procname, args))
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+async def _explain_async(conn, sql, params):
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute("EXPLAIN " + sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in await cursor.fetchall()]
+    except Exception as e:
+        return "EXPLAIN failed: %s" % e
+
+
+def report(paths, limit=20):
+    """Aggregate slow statements in the log files by fingerprint."""
+    totals = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                total = totals.setdefault(entry["fingerprint"], {
+                    "normalized": entry["normalized"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "callers": {}})
+                total["count"] += 1
+                total["total_ms"] += entry["duration_ms"]
+                total["max_ms"] = max(total["max_ms"], entry["duration_ms"])
+                caller = entry.get("function") or entry.get("caller")
+                total["callers"][caller] = total["callers"].get(caller, 0) + 1
+
+    ranked = sorted(totals.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:limit]
+    for digest, total in ranked:
+        callers = ", ".join("%s (%d)" % item for item in sorted(total["callers"].items(), key=lambda i: -i[1]))
+        print("%s  %6d calls  %10.1f ms total  %8.1f ms mean  %8.1f ms max" % (
+            digest, total["count"], total["total_ms"], total["total_ms"] / total["count"], total["max_ms"]))
+        print("    %s" % total["normalized"][:300])
+        print("    from: %s" % callers)
+    return ranked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Slow query log tools")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--log", default=SLOW_QUERY_LOG, help="log file (rotated backups are included)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(args.log + ".*"), reverse=True) + [args.log]
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        print("No slow query log at %s" % args.log)
+        return 0
+    report(paths, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,44 @@
 import streamlit as st
 from db_connection import (
-    get_db_connection, update_user_profile, send_collaboration_request,
-    get_active_collaborations, get_user_projects, add_new_project,
-    delete_collaboration, update_project, get_project_by_id
+    update_user_profile, get_dashboard_snapshot, add_new_project, delete_collaboration, update_project,
+    get_collaboration_statuses, match_scores_tags
 )
+import async_db
 import research_matching
+from dashboard_sections import section_selector, section_data, gather_section_data
+from user_session import current_user, update_profile, logout
+from photo_store import content_hash, get_photo_store
 
 
 def show():
     st.title("🎓 Student Dashboard")
 
-    user = st.session_state.get("user")
+    user = current_user()
     if not user:
         st.error("Unauthorized access. Please log in.")
         return
 
 
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    # Only the selected section runs, so a rerun only loads that section's data
+    tab1, tab2, tab3, tab4, tab5 = SECTIONS = [
         "👤 Profile",
         "🔍 Find Professors",
         "👥 Research Partners",
         "🤝 My Collaborations",
         "📊 My Projects"
-    ])
+    ]
+    section = section_selector("student", SECTIONS)
+    snapshot_tags = ["collaborations:%s" % user["user_id"], "projects:%s" % user["user_id"]]
 
     # Profile Section
-    with tab1:
+    if section == tab1:
         col1, col2 = st.columns([1, 3])
 
         with col1:
-            # Display profile photo if it exists
-            if user.get("profile_photo"):
-                st.image(user["profile_photo"], width=150)
+            # Display the profile photo thumbnail if there is one
+            thumbnail = get_photo_store().thumbnail_path(user["photo_hash"]) if user.get("photo_hash") else None
+            if thumbnail:
+                st.image(thumbnail, width=150)
             else:
                 # Show placeholder
                 st.markdown("### 👤")
@@ -64,22 +71,27 @@ def show():
                         # Convert the file to bytes for storage
                         photo_data = profile_photo.getvalue()
 
-                    success = update_user_profile(
-                        user["user_id"],
-                        department,
-                        research_interests,
-                        experience_level,
-                        photo_data
-                    )
+                    try:
+                        success = update_user_profile(
+                            user["user_id"],
+                            department,
+                            research_interests,
+                            experience_level,
+                            photo_data
+                        )
+                    except ValueError as e:
+                        st.error(f"⚠️ {e}")
+                        success = False
 
                     if success:
-                        #  Update session state
-                        st.session_state["user"].update({
-                            "department": department,
-                            "research_interests": research_interests,
-                            "experience_level": experience_level,
-                            "profile_photo": photo_data
-                        })
+                        #  Update session state (only the photo's hash, not the image)
+                        update_profile(
+                            department=department,
+                            research_interests=research_interests,
+                            experience_level=experience_level,
+                        )
+                        if photo_data is not None:
+                            update_profile(photo_hash=content_hash(photo_data))
                         st.success("✅ Profile updated successfully!")
                         st.rerun()  #  Updated rerun method
             else:
@@ -89,34 +101,37 @@ def show():
 
                 if st.button("Edit Profile", key="edit_profile"):
                     # Reset profile completion flags to allow editing
-                    st.session_state["user"].update({
-                        "department": "",
-                        "research_interests": "",
-                        "experience_level": "beginner"
-                        # Don't reset profile_photo here to maintain it during editing
-                    })
+                    # (photo_hash is kept so the photo stays visible while editing)
+                    update_profile(department="", research_interests="", experience_level="beginner")
                     st.rerun()
 
     # Search Professors Section
-    with tab2:
+    if section == tab2:
+        # The recommendations and the search results are independent, so they
+        # load concurrently (the search box is read from the session before it
+        # is drawn; searches are not kept between reruns). The request statuses
+        # of both lists then come from one query.
+        search_query = st.session_state.get("professor_search", "")
+        recommended, professors = gather_section_data(
+            ("professor_matches", match_scores_tags(user["user_id"]), async_db.get_top_professor_matches,
+             user["user_id"]) if user.get("research_interests") else None,
+            ("professor_search", None, async_db.search_professors, search_query) if search_query else None,
+        )
+        statuses = section_data(
+            "professor_statuses", ["collaborations:%s" % user["user_id"]], get_collaboration_statuses,
+            user["user_id"], tuple(prof['user_id'] for rows in (recommended, professors) if rows for prof in rows)
+        )
+
         # Show professor recommendations
-        research_matching.show_professor_recommendations()
+        research_matching.show_professor_recommendations(recommended, statuses)
 
         st.divider()
 
         # Manual search
         st.subheader("🔍 Search for Professors")
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
 
-        search_query = st.text_input("Enter Research Field or Professor Name")
+        search_query = st.text_input("Enter Research Field or Professor Name", key="professor_search")
         if search_query:
-            cursor.execute(
-                "SELECT * FROM users WHERE role='professor' AND (name LIKE %s OR research_interests LIKE %s)",
-                ('%' + search_query + '%', '%' + search_query + '%')
-            )
-            professors = cursor.fetchall()
-
             if professors:
                 for prof in professors:
                     with st.container():
@@ -124,36 +139,21 @@ def show():
                         st.write(f"🏛️ **Department:** {prof['department']}")
                         st.write(f"🔬 **Research Interests:** {prof['research_interests']}")
 
-                        # Check if there's already an active collaboration
-                        cursor.execute(
-                            "SELECT * FROM collaboration_requests WHERE student_id = %s AND professor_id = %s AND status = 'accepted'",
-                            (user["user_id"], prof['user_id'])
+                        research_matching.show_request_action(
+                            user["user_id"], prof, statuses.get(prof['user_id']), f"req_{prof['user_id']}"
                         )
-                        existing_collab = cursor.fetchone()
-
-                        if existing_collab:
-                            st.info("You're already collaborating with this professor.")
-                        else:
-                            if st.button(f"Request Collaboration with {prof['name']}", key=f"req_{prof['user_id']}"):
-                                success = send_collaboration_request(user["user_id"], prof['user_id'])
-                                if success:
-                                    st.success(f"✅ Collaboration request sent to {prof['name']}!")
-                                else:
-                                    st.info("You've already sent a request to this professor.")
             else:
                 st.warning("⚠️ No matching professors found.")
 
-        cursor.close()
-        conn.close()  #  Close DB connection after fetching
-
     # Find Research Partners Tab
-    with tab3:
+    if section == tab3:
         research_matching.show_research_partners()
 
     # My Collaborations Tab
-    with tab4:
-        st.subheader("🤝 My Active Collaborations")
-        collaborations = get_active_collaborations(user["user_id"], "student")
+    if section == tab4:
+        snapshot = section_data("snapshot", snapshot_tags, get_dashboard_snapshot, user["user_id"], "student")
+        collaborations = snapshot["requests"]["accepted"]
+        st.subheader(f"🤝 My Active Collaborations ({snapshot['counts']['accepted']})")
 
         if not collaborations:
             st.info(
@@ -174,18 +174,8 @@ def show():
                     st.divider()
 
         # Pending Requests
-        st.subheader("⏳ Pending Collaboration Requests")
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT cr.request_id, u.name, u.department, u.research_interests 
-            FROM collaboration_requests cr 
-            JOIN users u ON cr.professor_id = u.user_id 
-            WHERE cr.student_id = %s AND cr.status = 'pending'
-        """, (user["user_id"],))
-
-        pending = cursor.fetchall()
+        st.subheader(f"⏳ Pending Collaboration Requests ({snapshot['counts']['pending']})")
+        pending = snapshot["requests"]["pending"]
 
         if not pending:
             st.info("You don't have any pending collaboration requests.")
@@ -198,19 +188,17 @@ def show():
                     st.write("**Status:** Pending")
                     st.divider()
 
-        cursor.close()  # Close cursor after fetching
-        conn.close()  #  Close DB connection after fetching
-
     # Projects Tab
-    with tab5:
+    if section == tab5:
         st.subheader(" My Research Projects")
 
         # State for editing project
         if "editing_project" not in st.session_state:
             st.session_state.editing_project = None
 
-        # Fetch user projects
-        user_projects = get_user_projects(user["user_id"])
+        # Fetch user projects (same snapshot as the collaborations section)
+        snapshot = section_data("snapshot", snapshot_tags, get_dashboard_snapshot, user["user_id"], "student")
+        user_projects = snapshot["projects"]
 
         if user_projects:
             for proj in user_projects:
@@ -231,7 +219,7 @@ def show():
 
         # Edit project form
         if st.session_state.editing_project:
-            project = get_project_by_id(st.session_state.editing_project)
+            project = next((p for p in user_projects if p['project_id'] == st.session_state.editing_project), None)
             if project:
                 st.markdown("## ✏️ Edit Project")
                 with st.form("edit_project_form"):
@@ -278,7 +266,7 @@ def show():
 
     # Logout Button (at the bottom of the dashboard)
     if st.button("🚪 Logout", key="logout_button"):
-        st.session_state["user"] = None
+        logout()
         st.rerun()
 
 
@@ -1,18 +1,24 @@
-import paho.mqtt.client as mqtt
+import argparse
+import threading
 
-broker_ip = "broker.emqx.io"
-topic = "bk/chat"
+from message_bus import MessageBus
 
-def on_connect(client, userdata, flags, reason_code, properties=None):
-    print("Connected with result code " + str(reason_code))
-    client.subscribe(topic)
+parser = argparse.ArgumentParser(description="Print chat messages received over the message bus")
+parser.add_argument("--broker", default="broker.emqx.io")
+parser.add_argument("--port", type=int, default=1883)
+parser.add_argument("--topic", default="bk/chat")
+args = parser.parse_args()
 
-def on_message(client, userdata, msg):
-    print(f"[{msg.topic}] {msg.payload.decode()}")
 
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, "sub")
-client.on_connect = on_connect
-client.on_message = on_message
+def on_message(topic, msg):
+    print(f"[{topic}] {msg}")
 
-client.connect(broker_ip, 1883, 60)
-client.loop_forever()
\ No newline at end of file
+
+bus = MessageBus(args.broker, args.port, prefix="")
+bus.subscribe(args.topic, on_message)
+
+# The bus connects, reconnects and resubscribes in the background
+try:
+    threading.Event().wait()
+except KeyboardInterrupt:
+    bus.close()
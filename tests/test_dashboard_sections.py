@@ -0,0 +1,44 @@
+"""gather_section_data keeps sections until their tags are invalidated."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("streamlit")
+db = pytest.importorskip("db_connection")
+import dashboard_sections  # noqa: E402
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    monkeypatch.setattr(dashboard_sections.st, "session_state", {})
+    monkeypatch.setattr(dashboard_sections.async_db, "gather", lambda *coroutines: [
+        asyncio.run(coroutine) for coroutine in coroutines])
+    monkeypatch.setattr(db.cache_sync, "broadcast", lambda tags: False)
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        return value * 2
+
+    return calls, load
+
+
+def test_sections_are_kept_until_their_tags_change(loads):
+    calls, load = loads
+    sections = [("a", ["section:a"], load, 1), ("b", ["section:b"], load, 2)]
+    assert dashboard_sections.gather_section_data(*sections) == [2, 4]
+    assert dashboard_sections.gather_section_data(*sections) == [2, 4]
+    assert calls == [1, 2]
+
+    db.invalidate_cache("section:b")
+    assert dashboard_sections.gather_section_data(*sections) == [2, 4]
+    assert calls == [1, 2, 2]
+
+
+def test_untagged_sections_load_every_time_and_none_is_skipped(loads):
+    calls, load = loads
+    sections = [("a", ["section:a"], load, 1), None, ("search", None, load, 3)]
+    assert dashboard_sections.gather_section_data(*sections) == [2, None, 6]
+    assert dashboard_sections.gather_section_data(*sections) == [2, None, 6]
+    assert calls == [1, 3, 3]
+    assert list(dashboard_sections.st.session_state["section_data"]) == [("a", 1)]
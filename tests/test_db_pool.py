@@ -0,0 +1,199 @@
+"""ConnectionPool checkout, recycling and leak handling against a fake connector."""
+import gc
+import threading
+import time
+import types
+
+import pytest
+
+connector = pytest.importorskip("mysql.connector")
+import db_pool  # noqa: E402
+from db_pool import ConnectionPool, PoolTimeoutError  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.pings = 0
+        self.ping_fails = False
+        self.unread_result = False
+        self.in_transaction = False
+        self.rollback_fails = False
+        self.calls = []
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if self.ping_fails:
+            raise connector.Error("gone away")
+
+    def consume_results(self):
+        self.calls.append("consume_results")
+        self.unread_result = False
+
+    def rollback(self):
+        self.calls.append("rollback")
+        if self.rollback_fails:
+            raise connector.Error("lost connection")
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**config):
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+
+    monkeypatch.setattr(db_pool.mysql.connector, "connect", connect)
+    return opened
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_pool, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def make_pool(**options):
+    options = {"min_size": 0, "max_size": 2, "checkout_timeout": 1, **options}
+    return ConnectionPool({"host": "db"}, **options)
+
+
+def test_invalid_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        make_pool(min_size=3, max_size=2)
+    with pytest.raises(ValueError):
+        make_pool(max_size=0)
+
+
+def test_min_size_connections_are_opened_up_front(connections):
+    pool = make_pool(min_size=2)
+    assert len(connections) == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_closed_connections_are_reused(connections):
+    pool = make_pool()
+    conn = pool.get_connection()
+    conn.close()
+    conn.close()
+    with pool.get_connection() as again:
+        assert again.number == 0
+    stats = pool.stats()
+    assert (stats["connections_created"], stats["checkouts"], stats["idle"], stats["in_use"]) == (1, 2, 1, 0)
+
+
+def test_checkout_times_out_when_the_pool_is_saturated(connections):
+    pool = make_pool(max_size=1, checkout_timeout=0.05)
+    held = pool.get_connection(acquired_by="report")
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection()
+    stats = pool.stats()
+    assert (stats["saturated"], stats["timeouts"], stats["size"]) == (1, 1, 1)
+    assert [holder["acquired_by"] for holder in pool.checked_out()] == ["report"]
+    held.close()
+
+
+def test_waiting_checkout_gets_the_released_connection(connections):
+    pool = make_pool(max_size=1)
+    held = pool.get_connection()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.get_connection()))
+    waiter.start()
+    time.sleep(0.05)
+    held.close()
+    waiter.join(1)
+    assert got and got[0].number == 0
+    stats = pool.stats()
+    assert (stats["saturated"], stats["waits"], stats["timeouts"], stats["peak_in_use"]) == (1, 1, 0, 1)
+    assert stats["wait_time_max"] > 0
+    assert stats["wait_time_avg"] == stats["wait_time_total"]
+
+
+def test_connections_are_recycled_after_their_lifetime(connections, clock):
+    pool = make_pool(max_lifetime=100)
+    pool.get_connection().close()
+    clock[0] += 101
+    with pool.get_connection() as conn:
+        assert conn.number == 1
+    assert connections[0].closed
+    stats = pool.stats()
+    assert (stats["connections_recycled"], stats["connections_created"], stats["size"]) == (1, 2, 1)
+
+
+def test_idle_connections_are_pinged_before_reuse(connections, clock):
+    pool = make_pool(validate_idle=5)
+    pool.get_connection().close()
+    clock[0] += 1
+    pool.get_connection().close()
+    assert connections[0].pings == 0
+    clock[0] += 6
+    pool.get_connection().close()
+    assert connections[0].pings == 1
+
+
+def test_connections_failing_the_ping_are_replaced(connections, clock):
+    pool = make_pool(validate_idle=5)
+    pool.get_connection().close()
+    connections[0].ping_fails = True
+    clock[0] += 6
+    with pool.get_connection() as conn:
+        assert conn.number == 1
+    assert connections[0].closed
+    stats = pool.stats()
+    assert (stats["validation_failures"], stats["size"]) == (1, 1)
+
+
+def test_release_drops_unread_results_and_open_transactions(connections):
+    pool = make_pool()
+    conn = pool.get_connection()
+    connections[0].unread_result = True
+    connections[0].in_transaction = True
+    conn.close()
+    assert connections[0].calls == ["consume_results", "rollback"]
+    assert not connections[0].closed
+    assert pool.stats()["idle"] == 1
+
+
+def test_connections_that_fail_the_reset_are_closed(connections):
+    pool = make_pool()
+    conn = pool.get_connection()
+    connections[0].in_transaction = True
+    connections[0].rollback_fails = True
+    conn.close()
+    assert connections[0].closed
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["in_use"]) == (0, 0, 0)
+
+
+def test_discarded_connections_free_their_slot(connections):
+    pool = make_pool(max_size=1, checkout_timeout=0.05)
+    pool.get_connection().discard()
+    assert connections[0].closed
+    with pool.get_connection() as conn:
+        assert conn.number == 1
+
+
+def test_leaked_connections_are_reported_and_reclaimed(connections, caplog):
+    pool = make_pool()
+    conn = pool.get_connection(acquired_by="get_forum_posts")
+    del conn
+    gc.collect()
+    stats = pool.stats()
+    assert (stats["leaked"], stats["in_use"], stats["idle"]) == (1, 0, 1)
+    assert "get_forum_posts" in caplog.text
+
+
+def test_close_all_closes_idle_connections(connections):
+    pool = make_pool(min_size=2)
+    held = pool.get_connection()  # the most recently used idle connection
+    pool.close_all()
+    assert [c.closed for c in connections] == [True, False]
+    assert pool.stats()["size"] == 1
+    held.close()
@@ -0,0 +1,132 @@
+"""Forum post events and the per-process live feed, on a fake bus."""
+import datetime
+
+import pytest
+
+pytest.importorskip("paho.mqtt.client")
+
+from forum_live import LiveFeed, decode_post, encode_post, new_posts  # noqa: E402
+from message_bus import BusFull, decode, encode  # noqa: E402
+
+
+def _post(post_id, category="Funding"):
+    return {
+        "post_id": post_id, "title": "Post %d" % post_id, "content": "Content of %d" % post_id,
+        "category": category, "author_name": "Author", "author_role": "student",
+        "created_at": datetime.datetime(2024, 3, 1, 9, 30, post_id % 60),
+    }
+
+
+class FakeBus:
+    def __init__(self, enabled=True, full=False):
+        self.enabled = enabled
+        self.full = full
+        self.handlers = {}
+        self.published = []
+
+    def subscribe(self, topic, handler):
+        self.handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic, message, key=None, timeout=None):
+        if self.full:
+            raise BusFull("full")
+        self.published.append((topic, message, timeout))
+        return True
+
+    def deliver(self, topic, message):
+        for handler in self.handlers.get(topic, []):
+            handler(topic, message)
+
+
+def test_post_event_round_trip():
+    post = _post(7)
+    event = encode_post(post)
+    assert decode_post(event) == post
+    # ...and through the bus codec, datetimes included
+    assert decode_post(decode(encode(event))) == post
+
+
+def test_post_events_are_compact():
+    assert set(encode_post(_post(1))) == {"i", "t", "c", "g", "a", "r", "d"}
+
+
+def test_post_events_drop_extra_columns():
+    assert decode_post(encode_post(dict(_post(1), extra="x"))) == _post(1)
+
+
+@pytest.mark.parametrize("event", [None, [], "post", {"i": 1, "t": "only a title"}], ids=repr)
+def test_decode_post_rejects_other_messages(event):
+    with pytest.raises(ValueError):
+        decode_post(event)
+
+
+def test_start_subscribes_once():
+    bus = FakeBus()
+    feed = LiveFeed(bus)
+    assert feed.start() is True
+    assert feed.start() is True
+    assert len(bus.handlers[feed.topic]) == 1
+
+
+def test_start_does_nothing_while_the_bus_is_off():
+    bus = FakeBus(enabled=False)
+    feed = LiveFeed(bus)
+    assert feed.start() is False
+    assert bus.handlers == {}
+
+
+def test_publish_does_not_wait_for_the_bus():
+    bus = FakeBus()
+    assert LiveFeed(bus).publish(_post(1)) is True
+    topic, event, timeout = bus.published[0]
+    assert decode_post(event) == _post(1)
+    assert timeout == 0
+
+
+def test_publish_survives_a_full_bus():
+    assert LiveFeed(FakeBus(full=True)).publish(_post(1)) is False
+
+
+def test_posts_since_returns_posts_after_the_position_oldest_first():
+    bus = FakeBus()
+    feed = LiveFeed(bus)
+    feed.start()
+    bus.deliver(feed.topic, encode_post(_post(1)))
+    position = feed.position()
+    for post_id in (2, 3):
+        bus.deliver(feed.topic, encode_post(_post(post_id)))
+
+    new_position, posts = feed.posts_since(position)
+    assert [post["post_id"] for post in posts] == [2, 3]
+    assert new_position == feed.position()
+    assert feed.posts_since(new_position) == (new_position, [])
+
+
+def test_feed_ignores_malformed_events():
+    bus = FakeBus()
+    feed = LiveFeed(bus)
+    feed.start()
+    bus.deliver(feed.topic, {"not": "a post"})
+    assert feed.position() == 0
+    assert feed.posts_since(0) == (0, [])
+
+
+def test_feed_keeps_only_the_newest_posts():
+    bus = FakeBus()
+    feed = LiveFeed(bus, size=3)
+    feed.start()
+    for post_id in range(1, 6):
+        bus.deliver(feed.topic, encode_post(_post(post_id)))
+    position, posts = feed.posts_since(0)
+    assert position == 5
+    assert [post["post_id"] for post in posts] == [3, 4, 5]
+
+
+def test_new_posts_filters_by_category_and_skips_seen_posts():
+    received = [_post(1, "Funding"), _post(2, "Research Groups"), _post(3, "Funding")]
+    seen = {3}
+    assert [post["post_id"] for post in new_posts(received, "Funding", seen)] == [1]
+    assert seen == {1, 3}
+    # Already shown now, so a second delivery adds nothing
+    assert new_posts(received, "Funding", seen) == []
+    assert [post["post_id"] for post in new_posts(received, "All", seen)] == [2]
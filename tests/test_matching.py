@@ -0,0 +1,168 @@
+"""The keyword matchers score exactly like the original nested loops.
+
+old_recommend_professors() and old_find_research_partners() are the loops
+the app shipped with (kept commented out at the end of db_connection.py),
+minus the database access.
+"""
+import random
+
+import pytest
+
+from matching import KeywordMatcher, PartnerIndex, join_keywords, split_keywords
+
+KEYWORDS = ["machine learning", "learning", "ml", "ai", "nlp", "computer vision", "vision", "robotics",
+            "databases", "data", "security", "bio", "bioinformatics", "quantum computing", "hci", "", "a"]
+DEPARTMENTS = ["CSE", "ECE", "ME", None]
+
+
+def old_recommend_professors(student_interests, professors):
+    recommendations = []
+    interests_lower = student_interests.lower()
+
+    for prof in professors:
+        if prof['research_interests']:
+            prof_interests_lower = prof['research_interests'].lower()
+            interests_keywords = [keyword.strip() for keyword in interests_lower.split(',')]
+            prof_keywords = [keyword.strip() for keyword in prof_interests_lower.split(',')]
+
+            matches = sum(1 for keyword in interests_keywords if any(keyword in prof_kw for prof_kw in prof_keywords))
+            if matches > 0:
+                score = min(int((matches / len(interests_keywords)) * 100), 100)
+                recommendations.append(dict(prof, compatibility=score))
+
+    recommendations.sort(key=lambda x: x['compatibility'], reverse=True)
+    return recommendations
+
+
+def old_find_research_partners(student_id, department, interests, students):
+    students = [student for student in students
+                if student['user_id'] != student_id and student['research_interests'] is not None]
+    partners = []
+    interests_lower = interests.lower()
+
+    for student in students:
+        if student['research_interests']:
+            student_interests_lower = student['research_interests'].lower()
+            dept_match = 30 if student['department'] == department else 0
+
+            interests_keywords = [keyword.strip() for keyword in interests_lower.split(',')]
+            student_keywords = [keyword.strip() for keyword in student_interests_lower.split(',')]
+
+            matches = sum(
+                1 for keyword in interests_keywords if any(keyword in student_kw for student_kw in student_keywords))
+            interest_score = min(int((matches / max(len(interests_keywords), 1)) * 70), 70)
+
+            total_score = dept_match + interest_score
+            if total_score > 0:
+                partners.append(dict(student, compatibility=total_score))
+
+    partners.sort(key=lambda x: x['compatibility'], reverse=True)
+    return partners
+
+
+def _interests(rng):
+    count = rng.randint(0, 5)
+    if count == 0:
+        return rng.choice([None, ""])
+    # Mixed case, padding and duplicates, as users type them
+    words = [rng.choice(KEYWORDS) for _ in range(count)]
+    return ",".join(rng.choice(["%s", " %s ", "%s  "]) % rng.choice([w, w.upper(), w.title()]) for w in words)
+
+
+def _users(rng, count, first_id=1):
+    return [{"user_id": user_id, "name": "User %d" % user_id, "department": rng.choice(DEPARTMENTS),
+             "research_interests": _interests(rng)}
+            for user_id in range(first_id, first_id + count)]
+
+
+def _queries(rng, count=40):
+    queries = [_interests(rng) for _ in range(count)]
+    return [query for query in queries if query] + ["ai", "AI, ml", ",", "learning, learning", "zzz"]
+
+
+def _ranked(rows):
+    return [(row['user_id'], row['compatibility']) for row in rows]
+
+
+@pytest.fixture
+def rng():
+    return random.Random(1234)
+
+
+def test_keyword_matcher_counts_like_the_nested_loop(rng):
+    for _ in range(300):
+        mine = split_keywords(_interests(rng) or "x")
+        theirs = split_keywords(_interests(rng) or "y")
+        expected = sum(1 for keyword in mine if any(keyword in other for other in theirs))
+        assert KeywordMatcher(mine).count_matches(join_keywords(theirs)) == expected
+
+
+def test_professor_scores_match_the_original(rng):
+    db = pytest.importorskip("db_connection")
+    professors = [professor for professor in _users(rng, 80) if professor['research_interests'] is not None]
+    for interests in _queries(rng):
+        assert (_ranked(db._recommend_professors(professors, interests))
+                == _ranked(old_recommend_professors(interests, professors)))
+
+
+def test_partner_scores_match_the_original(rng):
+    students = _users(rng, 150)
+    index = PartnerIndex([student for student in students if student['research_interests'] is not None])
+    for interests in _queries(rng):
+        student_id = rng.randint(1, 150)
+        department = rng.choice(DEPARTMENTS)
+        expected = _ranked(old_find_research_partners(student_id, department, interests, students))
+        assert _ranked(index.score(student_id, department, interests)) == expected
+        assert _ranked(index.score(student_id, department, interests, limit=10)) == expected[:10]
+
+
+def test_reverse_partner_scores_match_each_students_own_list(rng):
+    students = _users(rng, 120)
+    index = PartnerIndex(students)
+    for target in _users(rng, 30, first_id=1000):
+        if not target['research_interests']:
+            continue
+        expected = {}
+        for student in index.rows:
+            partners = old_find_research_partners(
+                student['user_id'], student['department'], student['research_interests'], students + [target])
+            for partner in partners:
+                if partner['user_id'] == target['user_id']:
+                    expected[student['user_id']] = partner['compatibility']
+        reverse = index.reverse_partner_scores(target['user_id'], target['department'], target['research_interests'])
+        assert dict(reverse) == expected
+
+
+def test_reverse_professor_scores_match_each_students_recommendations(rng):
+    students = _users(rng, 120)
+    index = PartnerIndex(students)
+    for professor in _users(rng, 30, first_id=1000):
+        if not professor['research_interests']:
+            continue
+        expected = {}
+        for student in index.rows:
+            for match in old_recommend_professors(student['research_interests'], [professor]):
+                expected[student['user_id']] = match['compatibility']
+        assert dict(index.reverse_professor_scores(professor['research_interests'])) == expected
+
+
+def test_updated_index_scores_like_a_rebuilt_one(rng):
+    students = {student['user_id']: student for student in _users(rng, 60)}
+    index = PartnerIndex([students[user_id] for user_id in sorted(students)])
+    for _ in range(200):
+        user_id = rng.randint(1, 80)
+        if rng.random() < 0.2:
+            students.pop(user_id, None)
+            index = index.updated(user_id, None)
+        else:
+            students[user_id] = _users(rng, 1, first_id=user_id)[0]
+            index = index.updated(user_id, students[user_id])
+
+        rebuilt = PartnerIndex([students[user_id] for user_id in sorted(students)])
+        assert index.user_ids.tolist() == rebuilt.user_ids.tolist()
+        interests = rng.choice(_queries(rng, 5))
+        department = rng.choice(DEPARTMENTS)
+        assert _ranked(index.score(user_id, department, interests)) == _ranked(rebuilt.score(user_id, department, interests))
+        assert (index.reverse_partner_scores(user_id, department, interests)
+                == rebuilt.reverse_partner_scores(user_id, department, interests))
+        assert index.reverse_professor_scores(interests) == rebuilt.reverse_professor_scores(interests)
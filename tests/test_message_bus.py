@@ -0,0 +1,133 @@
+"""Bus payload codec and framing, and a publish/subscribe round trip.
+
+The round trip needs an MQTT broker: it uses RESEARCH_HUB_MQTT_HOST
+(default 127.0.0.1) and is skipped when nothing listens there.
+"""
+import datetime
+import decimal
+import os
+import socket
+import threading
+import uuid
+
+import pytest
+
+pytest.importorskip("paho.mqtt.client")
+
+from message_bus import (  # noqa: E402
+    COMPRESS_MIN_BYTES, FLAG_ZLIB, MessageBus, decode, decode_frame, encode, encode_frame
+)
+
+VALUES = [
+    None, True, False, 0, 1, -1, 63, -64, 2 ** 70, -(2 ** 70), 1.5, -0.0, float("inf"),
+    "", "forum post", "ünïcödé ✓", b"", b"\x00\xff" * 100, bytearray(b"abc"),
+    datetime.datetime(2024, 5, 1, 12, 30, 15, 123456), datetime.date(2024, 5, 1),
+    decimal.Decimal("12.340"), [], [1, "two", [3.0, None]],
+    {"i": 42, "t": "Title", "d": datetime.datetime(2024, 1, 2, 3, 4, 5), "tags": ["a", "b"]},
+]
+
+
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_codec_round_trip(value):
+    expected = bytes(value) if isinstance(value, bytearray) else value
+    assert decode(encode(value)) == expected
+
+
+def test_tuples_decode_as_lists():
+    assert decode(encode((1, (2, 3)))) == [1, [2, 3]]
+
+
+def test_encode_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        encode(object())
+
+
+def test_decode_rejects_truncated_and_trailing_bytes():
+    data = encode({"t": "forum post"})
+    with pytest.raises(ValueError):
+        decode(data[:-1])
+    with pytest.raises(ValueError):
+        decode(data + b"N")
+
+
+@pytest.mark.parametrize("messages", [
+    [],
+    [{"o": "a", "t": ["forum"]}],
+    [{"s": seq, "p": "x" * 50} for seq in range(100)],
+], ids=["empty", "one", "compressible"])
+def test_frame_round_trip(messages):
+    payload = encode_frame([encode(message) for message in messages])
+    assert decode_frame(payload) == messages
+
+
+def test_large_frames_are_compressed():
+    messages = [{"s": seq, "p": "x" * 50} for seq in range(100)]
+    encoded = [encode(message) for message in messages]
+    assert sum(map(len, encoded)) >= COMPRESS_MIN_BYTES
+    payload = encode_frame(encoded)
+    assert payload[1] & FLAG_ZLIB
+    assert len(payload) < sum(map(len, encoded))
+
+
+def test_incompressible_frames_are_sent_as_is():
+    payload = encode_frame([encode(os.urandom(COMPRESS_MIN_BYTES))])
+    assert not payload[1] & FLAG_ZLIB
+
+
+@pytest.mark.parametrize("payload", [
+    b"", b"\x01", b"\x02\x00lN", b"\x01\x01not zlib", b"\x01\x00s\x01x", b"\x01\x00l\x05N",
+], ids=repr)
+def test_decode_frame_rejects_garbage(payload):
+    with pytest.raises(ValueError):
+        decode_frame(payload)
+
+
+def _broker():
+    host = os.environ.get("RESEARCH_HUB_MQTT_HOST") or "127.0.0.1"
+    port = int(os.environ.get("RESEARCH_HUB_MQTT_PORT", 1883))
+    try:
+        socket.create_connection((host, port), timeout=1).close()
+    except OSError:
+        pytest.skip("no MQTT broker at %s:%s" % (host, port))
+    return host, port
+
+
+def test_disabled_bus_publishes_nothing():
+    bus = MessageBus("")
+    assert not bus.enabled
+    assert bus.publish("anything", {"a": 1}) is False
+
+
+def test_publish_subscribe_round_trip():
+    host, port = _broker()
+    # A topic prefix of our own, so concurrent runs don't see each other
+    prefix = "research_hub_test/%s" % uuid.uuid4().hex[:12]
+    sender = MessageBus(host, port, prefix=prefix)
+    receiver = MessageBus(host, port, prefix=prefix)
+    received = []
+    done = threading.Event()
+    connected = threading.Event()
+
+    def on_message(topic, message):
+        received.append((topic, message))
+        if len(received) == 20:
+            done.set()
+
+    try:
+        receiver.on_connect(connected.set)
+        receiver.subscribe("events", on_message)
+        assert connected.wait(10), "receiver did not connect"
+        # The subscription goes out from the connect callback; give the broker a moment
+        threading.Event().wait(0.5)
+
+        messages = [{"seq": seq, "at": datetime.datetime(2024, 1, 1, 0, 0, seq)} for seq in range(20)]
+        for message in messages:
+            assert sender.publish("events", message, timeout=5)
+        sender.flush(10)
+        assert done.wait(10), "received %d of 20 messages" % len(received)
+    finally:
+        sender.close(2)
+        receiver.close(2)
+
+    assert [message for _, message in received] == messages
+    assert {topic for topic, _ in received} == {"events"}
@@ -0,0 +1,56 @@
+"""split_statements splits migration scripts the way the mysql client does."""
+import pytest
+
+migrate = pytest.importorskip("migrate")
+
+
+def test_statements_are_split_on_semicolons():
+    assert migrate.split_statements("CREATE TABLE t (a INT);\n\nINSERT INTO t VALUES (1);  ") == [
+        "CREATE TABLE t (a INT)", "INSERT INTO t VALUES (1)"]
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("INSERT INTO t VALUES ('a;b');", ["INSERT INTO t VALUES ('a;b')"]),
+    ('INSERT INTO t VALUES ("it\'s; fine");', ['INSERT INTO t VALUES ("it\'s; fine")']),
+    ("INSERT INTO t VALUES ('a\\';b');", ["INSERT INTO t VALUES ('a\\';b')"]),
+    ("SELECT `a;b` FROM t;", ["SELECT `a;b` FROM t"]),
+    ("INSERT INTO t VALUES ('-- not a comment');", ["INSERT INTO t VALUES ('-- not a comment')"]),
+])
+def test_delimiters_in_quotes_are_kept(sql, expected):
+    assert migrate.split_statements(sql) == expected
+
+
+def test_comments_are_dropped():
+    sql = """/* header; with a semicolon */
+        SELECT 1; -- trailing; comment
+        # hash; comment
+        SELECT /* inline; */ 2;"""
+    assert migrate.split_statements(sql) == ["SELECT 1", "SELECT  2"]
+
+
+def test_delimiter_blocks_keep_the_body_together():
+    sql = """DROP PROCEDURE IF EXISTS p;
+
+DELIMITER //
+CREATE PROCEDURE p(IN x INT)
+BEGIN
+    SELECT x;
+    SELECT ';' FROM t;
+END //
+delimiter ;
+CREATE TRIGGER t_ai AFTER INSERT ON t FOR EACH ROW SET @n = 1;
+"""
+    statements = migrate.split_statements(sql)
+    assert len(statements) == 3
+    assert statements[0] == "DROP PROCEDURE IF EXISTS p"
+    assert statements[1].startswith("CREATE PROCEDURE p(IN x INT)")
+    assert statements[1].endswith("SELECT ';' FROM t;\nEND")
+    assert statements[2] == "CREATE TRIGGER t_ai AFTER INSERT ON t FOR EACH ROW SET @n = 1"
+
+
+def test_every_migration_splits_into_statements():
+    for _, name, path in migrate.list_migrations():
+        with open(path) as f:
+            statements = migrate.split_statements(f.read())
+        assert statements, name
+        assert not any(statement.upper().startswith("DELIMITER") for statement in statements), name
@@ -0,0 +1,80 @@
+"""Profile photos only stay in the store when the profile update commits."""
+import contextlib
+import io
+
+import pytest
+from PIL import Image
+
+db = pytest.importorskip("db_connection")
+from photo_store import PhotoStore, content_hash  # noqa: E402
+
+
+def png(color):
+    out = io.BytesIO()
+    Image.new("RGB", (400, 300), color).save(out, format="PNG")
+    return out.getvalue()
+
+
+class FakeCursor:
+    def __init__(self, fail):
+        self.fail = fail
+        self.executed = []
+
+    def execute(self, query, params=()):
+        if self.fail == "update":
+            raise RuntimeError("update failed")
+        self.executed.append((query, params))
+
+
+@pytest.fixture
+def profile(monkeypatch, tmp_path):
+    store = PhotoStore(root=str(tmp_path))
+    state = {"fail": None, "cursors": []}
+
+    @contextlib.contextmanager
+    def session(dictionary=True):
+        cursor = FakeCursor(state["fail"])
+        state["cursors"].append(cursor)
+        yield cursor
+        if state["fail"] == "commit":
+            raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(db, "get_photo_store", lambda: store)
+    monkeypatch.setattr(db, "db_session", session)
+    for name in ("update_partner_index", "invalidate_cache", "refresh_match_scores"):
+        monkeypatch.setattr(db, name, lambda *args: None)
+    state["store"] = store
+    return state
+
+
+def test_photo_is_stored_with_the_update(profile):
+    photo = png("red")
+    assert db.update_user_profile(1, "CSE", "ml", photo_data=photo)
+    digest = content_hash(photo)
+    assert profile["store"].contains(digest)
+    query, params = profile["cursors"][0].executed[0]
+    assert "photo_hash=%s" in query and digest in params
+
+
+@pytest.mark.parametrize("fail", ["update", "commit"])
+def test_failed_update_leaves_no_files(profile, fail):
+    profile["fail"] = fail
+    photo = png("green")
+    with pytest.raises(RuntimeError):
+        db.update_user_profile(1, "CSE", "ml", photo_data=photo)
+    assert not profile["store"].contains(content_hash(photo))
+
+
+def test_failed_update_keeps_photos_stored_before(profile):
+    photo = png("blue")
+    profile["store"].put(photo)
+    profile["fail"] = "commit"
+    with pytest.raises(RuntimeError):
+        db.update_user_profile(2, "CSE", "ml", photo_data=photo)
+    assert profile["store"].contains(content_hash(photo))
+
+
+def test_unreadable_image_rolls_the_update_back(profile):
+    with pytest.raises(ValueError):
+        db.update_user_profile(1, "CSE", "ml", photo_data=b"not an image")
+    assert profile["cursors"][0].executed  # the UPDATE ran first; db_session rolls it back
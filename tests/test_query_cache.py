@@ -0,0 +1,181 @@
+"""QueryCache eviction, expiry and invalidation, and the cached decorator."""
+import types
+
+import pytest
+
+import query_cache
+from query_cache import QueryCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_get_misses_then_hits():
+    cache = QueryCache()
+    assert cache.get("a") == (False, None)
+    cache.put("a", 1, ["t"])
+    assert cache.get("a") == (True, 1)
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1, [])
+    cache.put("b", 2, [])
+    cache.get("a")
+    cache.put("c", 3, [])
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_replacing_an_entry_does_not_evict():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1, ["old"])
+    cache.put("b", 2, [])
+    cache.put("a", 3, ["new"])
+    assert cache.stats()["evictions"] == 0
+    assert cache.invalidate("old") == 0
+    assert cache.get("a") == (True, 3)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = QueryCache(ttl=60)
+    cache.put("a", 1, ["t"])
+    clock[0] += 59
+    assert cache.get("a") == (True, 1)
+    clock[0] += 1
+    assert cache.get("a") == (False, None)
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+    assert cache.invalidate("t") == 0
+
+
+def test_invalidate_evicts_only_entries_carrying_the_tags():
+    cache = QueryCache()
+    cache.put("forum", 1, ["forum"])
+    cache.put("forum:ai", 2, ["forum", "forum:ai"])
+    cache.put("projects", 3, ["projects:12"])
+    assert cache.invalidate("forum:ai") == 1
+    assert cache.get("forum") == (True, 1)
+    assert cache.invalidate("forum", "missing") == 1
+    assert cache.get("forum") == (False, None)
+    assert cache.get("projects") == (True, 3)
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_put_is_refused_when_a_tag_was_invalidated_since_the_snapshot():
+    cache = QueryCache()
+    generation = cache.generation(["user:1", "forum"])
+    cache.invalidate("user:1")
+    assert not cache.put("a", "stale", ["user:1", "forum"], generation)
+    assert cache.get("a") == (False, None)
+    assert cache.put("a", "fresh", ["user:1", "forum"], cache.generation(["user:1", "forum"]))
+    assert cache.get("a") == (True, "fresh")
+
+
+def test_other_tags_do_not_change_a_generation():
+    cache = QueryCache()
+    generation = cache.generation(["user:1"])
+    cache.invalidate("user:2")
+    assert cache.generation(["user:1"]) == generation
+    assert cache.put("a", 1, ["user:1"], generation)
+
+
+def test_generations_follow_the_invalidation_sequence():
+    cache = QueryCache()
+    sequence = cache.sequence()
+    cache.invalidate("a")
+    cache.invalidate("b")
+    assert cache.sequence() == sequence + 2
+    assert cache.generation(["a", "b", "c"]) == (sequence + 1, sequence + 2, 0)
+
+
+def test_clear_drops_entries_but_keeps_generations():
+    cache = QueryCache()
+    cache.put("a", 1, ["t"])
+    cache.invalidate("u")
+    generation = cache.generation(["t", "u"])
+    cache.clear()
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["entries"] == 0
+    assert cache.invalidate("t") == 0
+    assert cache.generation(["u"]) == generation[1:]
+
+
+def test_stats_count_hits_misses_and_ratio():
+    cache = QueryCache(max_entries=5)
+    cache.put("a", 1, [])
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_ratio"] == pytest.approx(2 / 3)
+    assert stats["max_entries"] == 5
+    assert QueryCache().stats()["hit_ratio"] == 0.0
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = pytest.importorskip("db_connection")
+    monkeypatch.setattr(db, "_query_cache", QueryCache())
+    monkeypatch.setattr(db.cache_sync, "broadcast", lambda tags: False)
+    return db
+
+
+def test_cached_reads_through_and_copies_rows(db):
+    calls = []
+
+    @db.cached(lambda user_id: ["user:%s" % user_id])
+    def load(user_id):
+        calls.append(user_id)
+        return [{"user_id": user_id}]
+
+    first = load(1)
+    first[0]["user_id"] = 2
+    assert load(user_id=1) == [{"user_id": 1}]
+    assert calls == [1]
+    db.invalidate_cache("user:1")
+    load(1)
+    assert calls == [1, 1]
+
+
+def test_cached_result_tags_evict_on_a_row_change(db):
+    @db.cached(lambda: ["inbox"], lambda rows: ["user:%s" % row["user_id"] for row in rows])
+    def inbox():
+        return [{"user_id": 7}]
+
+    inbox()
+    assert db._query_cache.stats()["entries"] == 1
+    db.invalidate_cache("user:7")
+    assert db._query_cache.stats()["entries"] == 0
+
+
+def test_cached_does_not_store_a_result_whose_rows_changed_while_it_ran(db):
+    calls = []
+
+    @db.cached(lambda: ["inbox"], lambda rows: ["user:%s" % row["user_id"] for row in rows])
+    def inbox():
+        calls.append(1)
+        if len(calls) == 1:
+            db.invalidate_cache("user:7")  # a profile save racing with the read
+        return [{"user_id": 7}]
+
+    inbox()
+    inbox()
+    assert len(calls) == 2
+    inbox()
+    assert len(calls) == 2
+
+
+def test_clear_cache_starts_a_new_epoch(db):
+    epoch, generation = db.cache_generation("forum")
+    db.clear_cache()
+    assert db.cache_generation("forum") == (epoch + 1, generation)
@@ -0,0 +1,66 @@
+"""parse_search_query builds safe boolean-mode queries for both full-text indexes."""
+import re
+
+import pytest
+
+db = pytest.importorskip("db_connection")
+
+
+@pytest.mark.parametrize("text, word_query, ngram_query, terms", [
+    ("machine learning", "+machine* +learning*", "", ["machine", "learning"]),
+    ("AI in healthcare", "+healthcare*", "+AI*", ["AI", "healthcare"]),
+    ("ML", "", "+ML*", ["ML"]),
+    ("C++ compilers", "+compilers*", "+C*", ["C", "compilers"]),
+    ("x-ray imaging", "+ray* +imaging*", "+x*", ["x", "ray", "imaging"]),
+    ("real-time", "+real* +time*", "", ["real", "time"]),
+])
+def test_words(text, word_query, ngram_query, terms):
+    assert db.parse_search_query(text) == (word_query, ngram_query, terms)
+
+
+@pytest.mark.parametrize("text, word_query, ngram_query, terms", [
+    ('"graph neural networks"', '+"graph neural networks"', "", ["graph neural networks"]),
+    ('"state of the art" ai', '+"state of the art"', "+ai*", ["state of the art", "ai"]),
+    ('"AI ethics"', "", '+"AI ethics"', ["AI ethics"]),
+    ('"the"', "", "", []),
+    ('"of the" vision', "+vision*", "", ["vision"]),
+    ('""', "", "", []),
+])
+def test_phrases(text, word_query, ngram_query, terms):
+    assert db.parse_search_query(text) == (word_query, ngram_query, terms)
+
+
+def test_stopwords_are_dropped():
+    assert db.parse_search_query("the a of who") == ("", "", [])
+
+
+# Every clause is a required word prefix or a phrase of plain words
+CLAUSES = re.compile(r'(\+(\w+\*|"\w+( \w+)*")( |$))*')
+
+
+@pytest.mark.parametrize("text", ['+bio -data* ~x <y >z (w) @3', 'ops" "', "'); DROP TABLE users; --"])
+def test_operators_in_user_input_are_not_passed_through(text):
+    word_query, ngram_query, _ = db.parse_search_query(text)
+    assert CLAUSES.fullmatch(word_query)
+    assert CLAUSES.fullmatch(ngram_query)
+
+
+def test_search_query_uses_the_indexes_it_needs():
+    query, params = db._search_highlights_query("seed", 10)
+    assert "rh.search_text" not in query
+    assert params == ("+seed*", "+seed*", 10)
+
+    query, params = db._search_highlights_query("AI seed", 10)
+    assert "MATCH (rh.search_text)" in query
+    assert params == ("+seed*", "+AI*", "+seed*", "+AI*", 10)
+    assert query.count("%s") == len(params)
+
+    query, params = db._search_highlights_query("ML", 10)
+    assert "MATCH (rh.title" not in query
+    assert params == ("+ML*", "+ML*", 10)
+
+
+def test_nothing_to_search_skips_the_query(monkeypatch):
+    assert db._search_highlights_query("the", 10) is None
+    monkeypatch.setattr(db, "db_session", None)
+    assert db.search_research_highlights('"of"') == []
@@ -0,0 +1,46 @@
+"""Slow query fingerprints and parameter redaction."""
+import pytest
+
+from slow_query_log import fingerprint, normalize, redact
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM t WHERE b='x#y' AND c=1", "select * from t where b=? and c=?"),
+    ("SELECT * FROM t WHERE b = 'a -- b' AND c = 2", "select * from t where b = ? and c = ?"),
+    ("SELECT * FROM t WHERE b = '/* x */' AND c = 3", "select * from t where b = ? and c = ?"),
+    ("SELECT 1 -- don't\nFROM t WHERE a = 'it''s'", "select ? from t where a = ?"),
+    ("SELECT a /* it's */ FROM t # owner's note", "select a from t"),
+    ("SELECT 'a\\'b', \"c\" FROM t", "select ?, ? from t"),
+    ("SELECT name\n  FROM   users\n WHERE user_id = %s", "select name from users where user_id = ?"),
+    ("SELECT * FROM t WHERE id = %(user_id)s LIMIT 10", "select * from t where id = ? limit ?"),
+    ("SELECT * FROM t WHERE id IN (%s, %s, %s)", "select * from t where id in (?+)"),
+    ("SELECT * FROM t WHERE id IN (1,2)", "select * from t where id in (?+)"),
+    ("SELECT * FROM t2 WHERE score >= 2.5", "select * from t2 where score >= ?"),
+])
+def test_normalize(sql, expected):
+    assert normalize(sql) == expected
+
+
+def test_multi_row_inserts_share_a_fingerprint_whatever_the_row_count():
+    two = fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)")
+    three = fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)")
+    assert two == three
+    assert three[1] == "insert into t (a, b) values (?+), ..."
+
+
+def test_fingerprints_ignore_literals_comments_and_spacing():
+    assert fingerprint("SELECT * FROM t WHERE a = 'x' -- first")[0] == \
+        fingerprint("select *\nfrom t where a = 'y#z'")[0]
+    assert fingerprint("SELECT * FROM t WHERE a = 1")[0] != fingerprint("SELECT * FROM u WHERE a = 1")[0]
+
+
+def test_redact_keeps_only_types_and_sizes():
+    assert redact(("secret", b"\x00\x01", 42, None, 1.5)) == ["<str:6>", "<bytes:2>", "<int>", None, "<float>"]
+    assert redact({"email": "a@b.c", "id": 7}) == {"email": "<str:5>", "id": "<int>"}
+    assert redact(None) is None
+
+
+def test_redact_many_summarizes_the_rows():
+    rows = iter([("alice", "pw1"), ("bob", "pw2")])
+    assert redact(rows, many=True) == {"rows": 2, "first": ["<str:5>", "<str:3>"]}
+    assert redact([], many=True) == {"rows": 0, "first": None}
@@ -0,0 +1,40 @@
+import streamlit as st
+from db_connection import get_user_profile
+
+# Session-side view of the logged-in user.
+# Login only stores the identity columns in st.session_state["user"]; the
+# heavier profile fields are loaded the first time a page asks for them and
+# kept in st.session_state["profile"] until they change or the user logs out.
+
+
+def get_profile(force=False):
+    user = st.session_state.get("user")
+    if not user:
+        return None
+
+    profile = st.session_state.get("profile")
+    if force or profile is None or profile.get("user_id") != user["user_id"]:
+        profile = get_user_profile(user["user_id"]) or {"user_id": user["user_id"]}
+        st.session_state["profile"] = profile
+    return profile
+
+
+# Identity plus profile fields, for pages that show or match on the profile
+def current_user():
+    user = st.session_state.get("user")
+    if not user:
+        return None
+    return {**get_profile(), **user}
+
+
+# Update the cached profile after a successful write (or an edit-form reset)
+def update_profile(**fields):
+    profile = get_profile()
+    if profile is not None:
+        profile.update(fields)
+
+
+def logout():
+    st.session_state["user"] = None
+    st.session_state["profile"] = None
+    st.session_state.pop("section_data", None)